@@ -0,0 +1,304 @@
+"""Bulk export and import of the predictions, to archive a season or replay it.
+
+    python archive.py export predictions-2025.parquet   # or .csv
+    python archive.py import predictions-2025.csv [--replace]
+
+Files hold the EXPORT_COLUMNS, one row per prediction (ids are not kept).
+Submission timestamps are in UTC, timestamps without an offset are read as UTC.
+Parquet needs pyarrow (``pip install "sra[parquet]"``). On Postgres, CSV goes
+through COPY in both directions; an import is copied into a temporary staging
+table and merged with INSERT ... ON CONFLICT. On SQLite rows are upserted with
+executemany in chunks. Either way the latest submission of a (user, category,
+type) wins. Loading into an empty table drops the secondary indexes and builds
+them again at the end, which is much faster than updating them row by row.
+Imports rebuild the materialized prediction counts and link the predictions to
+the athlete registry.
+"""
+
+import argparse
+import csv
+import importlib.util
+import io
+import re
+import time
+from datetime import UTC, datetime
+from pathlib import Path
+
+from sqlalchemy import String, select, text, type_coerce
+from sqlmodel import Session
+
+from athletes import link_predictions
+from models import QuizPrediction, get_engine, rebuild_prediction_counts
+
+EXPORT_COLUMNS = [
+    "user_name",
+    "event_category",
+    "prediction_type",
+    "predicted_value",
+    "submission_timestamp",
+]
+KEY_COLUMNS = ["user_name", "event_category", "prediction_type"]
+CHUNK_ROWS = 50_000
+# How SQLAlchemy stores datetimes on SQLite: naive UTC text with microseconds
+SQLITE_TIMESTAMP = re.compile(r"\d{4}-\d\d-\d\d \d\d:\d\d:\d\d\.\d{6}")
+
+UPSERT_SQL = """
+INSERT INTO quizprediction ({columns}) {source}
+ON CONFLICT (user_name, event_category, prediction_type) DO UPDATE SET
+    predicted_value = excluded.predicted_value,
+    athlete_id = NULL,
+    submission_timestamp = excluded.submission_timestamp
+WHERE excluded.submission_timestamp >= quizprediction.submission_timestamp
+"""
+
+
+def _format(path, format=None):
+    format = format or Path(path).suffix.lstrip(".").lower()
+    if format not in ("csv", "parquet"):
+        raise ValueError(f"Unknown format {format!r}, use csv or parquet.")
+    if format == "parquet" and importlib.util.find_spec("pyarrow") is None:
+        raise ImportError('Parquet needs pyarrow: pip install "sra[parquet]".')
+    return format
+
+
+def _copy_cursor(connection):
+    # COPY is only reachable through the DBAPI cursor (psycopg2)
+    cursor = connection.connection.driver_connection.cursor()
+    if not hasattr(cursor, "copy_expert"):
+        raise NotImplementedError("COPY needs the psycopg2 driver.")
+    return cursor
+
+
+# --- Export ---
+def _iter_chunks(connection):
+    table = QuizPrediction.__table__
+    columns = [table.c[column] for column in EXPORT_COLUMNS]
+    if connection.dialect.name == "sqlite":
+        # The stored UTC text as is, parsing a datetime per row is the slow part
+        columns[-1] = type_coerce(columns[-1], String)
+    result = connection.execution_options(yield_per=CHUNK_ROWS).execute(
+        select(*columns).order_by(table.c.id)
+    )
+    yield from result.partitions()
+
+
+def _parquet_table(chunk, schema):
+    import pyarrow as pa
+
+    columns = [pa.array(values) for values in zip(*chunk)]
+    # UTC text (SQLite) or aware datetimes
+    if pa.types.is_string(columns[-1].type):
+        columns[-1] = columns[-1].cast(pa.timestamp("us"))
+    columns[-1] = columns[-1].cast(schema.field("submission_timestamp").type)
+    return pa.Table.from_arrays(columns, schema=schema)
+
+
+def export_predictions(path, format=None, bind=None):
+    """Write every prediction to ``path``, returns the number of rows."""
+    format = _format(path, format)
+    bind = bind or get_engine()
+    rows = 0
+    with bind.connect() as connection:
+        if format == "csv" and bind.dialect.name == "postgresql":
+            connection.execute(text("SET LOCAL TIME ZONE 'UTC'"))
+            with open(path, "w", newline="") as file:
+                _copy_cursor(connection).copy_expert(
+                    f"COPY (SELECT {', '.join(EXPORT_COLUMNS)} FROM quizprediction "
+                    "ORDER BY id) TO STDOUT WITH (FORMAT csv, HEADER)",
+                    file,
+                )
+            with open(path) as file:
+                return sum(1 for _ in csv.reader(file)) - 1
+        if format == "csv":
+            with open(path, "w", newline="") as file:
+                writer = csv.writer(file)
+                writer.writerow(EXPORT_COLUMNS)
+                for chunk in _iter_chunks(connection):
+                    writer.writerows(chunk)
+                    rows += len(chunk)
+            return rows
+
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        schema = pa.schema(
+            [(column, pa.string()) for column in EXPORT_COLUMNS[:-1]]
+            + [("submission_timestamp", pa.timestamp("us", tz="UTC"))]
+        )
+        with pq.ParquetWriter(path, schema) as writer:
+            for chunk in _iter_chunks(connection):
+                writer.write_table(_parquet_table(chunk, schema))
+                rows += len(chunk)
+    return rows
+
+
+# --- Import ---
+def _csv_chunks(path):
+    # Header, then lists of row tuples in the header's column order
+    with open(path, newline="") as file:
+        reader = csv.reader(file)
+        header = next(reader)
+        chunk = []
+        for row in reader:
+            chunk.append(tuple(row))
+            if len(chunk) == CHUNK_ROWS:
+                yield header, chunk
+                chunk = []
+        if chunk:
+            yield header, chunk
+
+
+def _parquet_chunks(path):
+    # Same as _csv_chunks, timestamps as naive UTC text
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    parquet = pq.ParquetFile(path)
+    header = parquet.schema_arrow.names
+    for batch in parquet.iter_batches(batch_size=CHUNK_ROWS):
+        columns = []
+        for column in batch.columns:
+            if pa.types.is_timestamp(column.type):
+                column = column.cast(pa.timestamp("us")).cast(pa.string())
+            columns.append(column.to_pylist())
+        yield header, list(zip(*columns))
+
+
+def _sqlite_timestamp(value):
+    if SQLITE_TIMESTAMP.fullmatch(value):
+        return value
+    value = datetime.fromisoformat(value)
+    if value.utcoffset() is not None:
+        value = value.astimezone(UTC).replace(tzinfo=None)
+    return value.isoformat(sep=" ", timespec="microseconds")
+
+
+def _check_header(header):
+    if sorted(header) != sorted(EXPORT_COLUMNS):
+        raise ValueError(f"Expected the columns {EXPORT_COLUMNS}, got {header}.")
+
+
+def _import_postgres(connection, path, format):
+    connection.execute(text("SET LOCAL TIME ZONE 'UTC'"))
+    connection.execute(
+        text(
+            "CREATE TEMP TABLE quizprediction_staging (user_name text, "
+            "event_category text, prediction_type text, predicted_value text, "
+            "submission_timestamp timestamptz) ON COMMIT DROP"
+        )
+    )
+    cursor = _copy_cursor(connection)
+    if format == "csv":
+        with open(path, newline="") as file:
+            header = next(csv.reader([file.readline()]))
+            _check_header(header)
+            file.seek(0)
+            cursor.copy_expert(
+                f"COPY quizprediction_staging ({', '.join(header)}) "
+                "FROM STDIN WITH (FORMAT csv, HEADER)",
+                file,
+            )
+    else:
+        for header, chunk in _parquet_chunks(path):
+            _check_header(header)
+            buffer = io.StringIO()
+            csv.writer(buffer).writerows(chunk)
+            buffer.seek(0)
+            cursor.copy_expert(
+                f"COPY quizprediction_staging ({', '.join(header)}) "
+                "FROM STDIN WITH (FORMAT csv)",
+                buffer,
+            )
+    # One row per key, the latest submission wins
+    columns = ", ".join(EXPORT_COLUMNS)
+    keys = ", ".join(KEY_COLUMNS)
+    source = (
+        f"SELECT DISTINCT ON ({keys}) {columns} FROM quizprediction_staging "
+        f"ORDER BY {keys}, submission_timestamp DESC"
+    )
+    connection.execute(text(UPSERT_SQL.format(columns=columns, source=source)))
+
+
+def _import_executemany(connection, path, format):
+    chunks = _csv_chunks(path) if format == "csv" else _parquet_chunks(path)
+    for header, chunk in chunks:
+        _check_header(header)
+        sql = UPSERT_SQL.format(
+            columns=", ".join(header),
+            source=f"VALUES ({', '.join('?' * len(header))})",
+        )
+        timestamp = header.index("submission_timestamp")
+        connection.exec_driver_sql(
+            sql,
+            [
+                row[:timestamp]
+                + (_sqlite_timestamp(row[timestamp]),)
+                + row[timestamp + 1 :]
+                for row in chunk
+            ],
+        )
+
+
+def _secondary_indexes(connection):
+    # All but the unique index the upserts resolve conflicts on
+    table = QuizPrediction.__table__
+    if connection.execute(select(table.c.id).limit(1)).first() is not None:
+        return []
+    return [index for index in table.indexes if not index.unique]
+
+
+def import_predictions(path, format=None, replace=False, bind=None):
+    """Upsert the predictions of ``path``, returns the predictions count after."""
+    format = _format(path, format)
+    bind = bind or get_engine()
+    with Session(bind) as session:
+        connection = session.connection()
+        if replace:
+            connection.execute(QuizPrediction.__table__.delete())
+        indexes = _secondary_indexes(connection)
+        for index in indexes:
+            index.drop(connection)
+        if bind.dialect.name == "postgresql":
+            _import_postgres(connection, path, format)
+        elif bind.dialect.name == "sqlite":
+            _import_executemany(connection, path, format)
+        else:
+            raise NotImplementedError(
+                f"Imports are not supported on {bind.dialect.name}."
+            )
+        for index in indexes:
+            index.create(connection)
+        rebuild_prediction_counts(session)
+        link_predictions(session)
+        session.commit()
+        return session.execute(text("SELECT count(*) FROM quizprediction")).scalar()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Bulk export/import of predictions.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    export_parser = subparsers.add_parser("export", help="Write the predictions.")
+    export_parser.add_argument("path")
+    export_parser.add_argument("--format", choices=["csv", "parquet"])
+    import_parser = subparsers.add_parser("import", help="Upsert predictions.")
+    import_parser.add_argument("path")
+    import_parser.add_argument("--format", choices=["csv", "parquet"])
+    import_parser.add_argument(
+        "--replace",
+        action="store_true",
+        help="Delete the existing predictions first.",
+    )
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    if args.command == "export":
+        rows = export_predictions(args.path, args.format)
+        print(f"Exported {rows} predictions to {args.path}", end="")
+    else:
+        rows = import_predictions(args.path, args.format, args.replace)
+        print(f"Imported {args.path}, {rows} predictions in the database", end="")
+    print(f" in {time.perf_counter() - start:.1f}s.")
+
+
+if __name__ == "__main__":
+    main()
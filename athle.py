@@ -0,0 +1,259 @@
+"""Download and parse competition result pages from bases.athle.fr."""
+
+import io
+import re
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+from lxml import etree
+
+# Concurrent requests sent to athle.fr; kept low to stay a polite client
+MAX_WORKERS = 4
+RETRIES = 3
+RETRY_BACKOFF = 0.5  # Seconds, doubled after each failed attempt
+TIMEOUT = 20
+
+USER_AGENT = "Mozilla/5.0 (compatible; pronostics-sra)"
+
+# Part of the cache key of parsed pages: bump whenever a parser's output changes
+PARSER_VERSION = 2
+
+
+def _fetch(url, headers=None, retries=RETRIES, backoff=RETRY_BACKOFF, timeout=TIMEOUT):
+    # (body, response headers), retrying on network errors and 5xx responses
+    request = urllib.request.Request(
+        url, headers={"User-Agent": USER_AGENT, **(headers or {})}
+    )
+    for attempt in range(retries + 1):
+        try:
+            with urllib.request.urlopen(request, timeout=timeout) as response:
+                return response.read(), response.headers
+        except urllib.error.HTTPError as e:
+            if e.code < 500 or attempt == retries:
+                raise
+        except (urllib.error.URLError, TimeoutError):
+            if attempt == retries:
+                raise
+        time.sleep(backoff * 2**attempt)
+
+
+def fetch_html(url, **fetch_kwargs):
+    """Raw bytes of a page."""
+    return _fetch(url, **fetch_kwargs)[0]
+
+
+def fetch_page(url, cache=None, max_age=None, **fetch_kwargs):
+    """Raw bytes of a page, going through ``cache`` (a PageCache) when given.
+
+    A cached copy younger than ``max_age`` seconds is used without any request.
+    Otherwise the page is revalidated with If-None-Match/If-Modified-Since when
+    the server sent validators, and only downloaded again if it changed.
+    """
+    if cache is None:
+        return fetch_html(url, **fetch_kwargs)
+
+    html, meta = cache.get_page(url)
+    headers = {}
+    if meta is not None:
+        if max_age is not None and time.time() - meta["fetched_at"] < max_age:
+            return html
+        if meta["etag"]:
+            headers["If-None-Match"] = meta["etag"]
+        if meta["last_modified"]:
+            headers["If-Modified-Since"] = meta["last_modified"]
+
+    try:
+        body, response_headers = _fetch(url, headers=headers, **fetch_kwargs)
+    except urllib.error.HTTPError as e:
+        if e.code == 304 and meta is not None:
+            return cache.revalidated(url)
+        raise
+    cache.put_page(
+        url,
+        body,
+        etag=response_headers.get("ETag"),
+        last_modified=response_headers.get("Last-Modified"),
+    )
+    return body
+
+
+def fetch_pages(
+    urls, max_workers=MAX_WORKERS, cache=None, max_age=None, **fetch_kwargs
+):
+    """Download all ``urls`` concurrently, returned in the same order."""
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        pages = list(
+            executor.map(
+                lambda url: fetch_page(url, cache, max_age, **fetch_kwargs), urls
+            )
+        )
+    if cache is not None:
+        cache.evict()
+    return pages
+
+
+def _parse(html, name, parse, cache=None):
+    if cache is None:
+        return parse(html)
+    return cache.parsed(html, name, PARSER_VERSION, parse)
+
+
+def parse_club_ranking(html):
+    # The club ranking tables follow the results table on the first page
+    return pd.concat(pd.read_html(io.BytesIO(html), skiprows=1)[1:], ignore_index=True)
+
+
+def parse_total_points(html, cache=None):
+    df = _parse(html, "ranking", parse_club_ranking, cache)
+    return int(
+        df[df[1].str.contains("STADE RENNAIS ATHLETISME*")][2]
+        .iloc[0][:-3]
+        .replace(" ", "")
+    )
+
+
+# Cells of the results table kept, by column position once colspans are expanded
+RESULT_COLUMNS = {
+    1: "Discipline",
+    2: "Performance",
+    4: "Athlète",
+    6: "Club",
+    14: "Cotation",
+    16: "Points",
+}
+
+# Same whitespace cleanup as pd.read_html
+_WHITESPACE = re.compile(r"[\r\n]+|\s{2,}")
+
+
+def _cell_text(cell):
+    text = "".join(cell.itertext()) if len(cell) else cell.text
+    if not text:
+        return None
+    return _WHITESPACE.sub(" ", text).strip() or None
+
+
+def _points(text):
+    points = text.replace(" ", "") if text else ""
+    return int(points) if points.isdigit() else None
+
+
+def _spanned_cells(element, spans):
+    """{position: text} of a row's kept cells, and the spans left for the next.
+
+    ``spans`` lists (position, text, rows left) of the cells spanning down from
+    the rows above, in position order; they are placed like read_html does.
+    Only the text of the kept cells, and of those spanning rows, is extracted.
+    """
+    cells = {}
+    below = []
+    position = 0
+    for cell in element.iterchildren("td", "th"):
+        while spans and spans[0][0] <= position:
+            start, text, left = spans.pop(0)
+            cells[position] = text
+            if left > 1:
+                below.append((start, text, left - 1))
+            position += 1
+        colspan = cell.get("colspan")
+        span = range(position, position + int(colspan)) if colspan else (position,)
+        kept = [column for column in span if column in RESULT_COLUMNS]
+        rowspan = cell.get("rowspan")
+        if rowspan and int(rowspan) > 1:
+            # It can land in a kept column of a shorter row below
+            text = _cell_text(cell)
+            below.extend((column, text, int(rowspan) - 1) for column in span)
+            cells.update(dict.fromkeys(kept, text))
+        elif kept:
+            cells.update(dict.fromkeys(kept, _cell_text(cell)))
+        position += len(span)
+    # The spans past the row's last cell are appended after it
+    for start, text, left in spans:
+        cells[position] = text
+        if left > 1:
+            below.append((start, text, left - 1))
+        position += 1
+    return cells, below
+
+
+def parse_results_table(html, skiprows):
+    """Kept columns of the first table of a results page, as {name: list}.
+
+    Rows are read one at a time and dropped from the tree once their cells are
+    extracted, and parsing stops at the end of the results table. Like
+    read_html, a header cell spanning the whole row fills every column with its
+    text, and a cell spanning rows repeats its text in the rows below.
+    """
+    columns = {name: [] for name in RESULT_COLUMNS.values()}
+
+    def add_row(cells):
+        for position, name in RESULT_COLUMNS.items():
+            columns[name].append(cells.get(position))
+
+    depth = 0
+    rows = 0
+    spans = []
+    for event, element in etree.iterparse(
+        io.BytesIO(html), events=("start", "end"), tag=("table", "tr"), html=True
+    ):
+        if element.tag == "table":
+            depth += 1 if event == "start" else -1
+            if depth == 0:
+                break
+            continue
+        # Rows of nested tables are part of their parent row's cells
+        if event == "start" or depth != 1:
+            continue
+        rows += 1
+        # Skipped rows too can span down into the kept ones
+        cells, spans = _spanned_cells(element, spans)
+        if rows > skiprows:
+            add_row(cells)
+        element.clear()
+        while element.getprevious() is not None:
+            del element.getparent()[0]
+    # Spans running past the last row make rows of their own, as in read_html
+    while spans:
+        cells, spans = _spanned_cells(etree.Element("tr"), spans)
+        rows += 1
+        if rows > skiprows:
+            add_row(cells)
+    columns["Points"] = [_points(points) for points in columns["Points"]]
+    return columns
+
+
+def parse_results_pages(pages, max_workers=MAX_WORKERS, cache=None):
+    """Results tables of all pages, parsed in parallel and kept in page order.
+
+    Only the Discipline, Performance, Athlète, Club, Cotation (strings) and
+    Points (Int64) columns are kept; discipline headers ("... | Finale") show
+    up as rows whose Club column holds the header text.
+    """
+    # The first page has one more header row before the results
+    skiprows = [3 if i == 0 else 2 for i in range(len(pages))]
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        tables = list(
+            executor.map(
+                lambda html, n: _parse(
+                    html,
+                    f"rows-{n}",
+                    lambda h: parse_results_table(h, n),
+                    cache,
+                ),
+                pages,
+                skiprows,
+            )
+        )
+
+    return pd.DataFrame(
+        {
+            name: pd.array(
+                [value for table in tables for value in table[name]],
+                dtype="Int64" if name == "Points" else "str",
+            )
+            for name in RESULT_COLUMNS.values()
+        }
+    )
@@ -0,0 +1,136 @@
+"""Search over the registered athletes for the quiz's podium pickers.
+
+The pickers only send the best matches of what the player typed to the
+browser, whatever the size of the roster. Names are matched on their folded
+form (see models.fold_name): first on the start of any word, so "cla" finds
+"PHILIPPE Clara" and "LE CALVE Clara", then anywhere in the name.
+
+A page searches the athletes known to compete in its category (recorded by
+``athletes.py refresh``). When none of them match, it searches the athletes of
+the page's gender, along with those not seen in any category yet: an athlete
+only known in the other gender's categories is never offered. As long as no
+category is recorded (constants.py only lists names), that is the whole roster.
+"""
+
+import bisect
+
+import streamlit as st
+from sqlalchemy import select
+from sqlmodel import Session
+
+from models import Athlete, AthleteCategory, fold_name, get_engine
+
+SEARCH_LIMIT = 30
+SEARCH_TTL = 300  # Seconds before registry changes reach the pickers
+
+
+class AthleteSearch:
+    """Sorted word-start index of the athletes' names, per quiz category."""
+
+    def __init__(self, names, categories=()):
+        # names: {athlete id: canonical name}, categories: (athlete id, category)
+        self.names = sorted(
+            set(names.values()), key=lambda name: (fold_name(name), name)
+        )
+        self._folded = [fold_name(name) for name in self.names]
+        self._ranks = {name: rank for rank, name in enumerate(self.names)}
+        by_category = {}
+        for athlete_id, category in categories:
+            if athlete_id in names:
+                rank = self._ranks[names[athlete_id]]
+                by_category.setdefault(category, set()).add(rank)
+        self._scopes = {None: self._scope(range(len(self.names)))}
+        for category, category_ranks in by_category.items():
+            self._scopes[category] = self._scope(sorted(category_ranks))
+
+        # Fallbacks per gender: its athletes, and those of no known category
+        by_gender = {}
+        for category, category_ranks in by_category.items():
+            by_gender.setdefault(_gender(category), set()).update(category_ranks)
+        uncategorized = set(range(len(self.names))).difference(*by_category.values())
+        self._uncategorized = self._scope(sorted(uncategorized))
+        self._genders = {
+            gender: self._scope(sorted(gender_ranks | uncategorized))
+            for gender, gender_ranks in by_gender.items()
+        }
+
+    def _scope(self, ranks):
+        # (suffix from each word start, rank) sorted, for prefix range lookups
+        starts = sorted(
+            (folded[i:], rank)
+            for rank in ranks
+            for folded in [self._folded[rank]]
+            for i in [0] + [j + 1 for j, c in enumerate(folded) if c == " "]
+        )
+        # The folded names joined, for substring scans in a single str.find
+        ranks = list(ranks)
+        offsets = []
+        offset = 0
+        for rank in ranks:
+            offsets.append(offset)
+            offset += len(self._folded[rank]) + 1
+        joined = "\n".join(self._folded[rank] for rank in ranks)
+        return ranks, [s for s, _ in starts], [r for _, r in starts], joined, offsets
+
+    def __contains__(self, name):
+        return name in self._ranks
+
+    def search(self, query="", category=None, limit=SEARCH_LIMIT):
+        """Up to ``limit`` names matching ``query``, in ``category`` if any match.
+
+        Otherwise in the category's gender (see the module docstring).
+        """
+        query = fold_name(query)
+        if category is None:
+            scopes = [self._scopes[None]]
+        else:
+            scopes = [
+                self._scopes.get(category),
+                self._genders.get(_gender(category), self._uncategorized),
+            ]
+        ranks = []
+        for scope in scopes:
+            if scope is not None:
+                ranks = self._search(scope, query, limit)
+                if ranks:
+                    break
+        return [self.names[rank] for rank in ranks]
+
+    def _search(self, scope, query, limit):
+        ranks, suffixes, suffix_ranks, joined, offsets = scope
+        if not query:
+            return ranks[:limit]
+        found = {}  # rank -> None, an ordered set
+        for i in range(bisect.bisect_left(suffixes, query), len(suffixes)):
+            if len(found) == limit or not suffixes[i].startswith(query):
+                break
+            found[suffix_ranks[i]] = None
+        # Then anywhere in the name, stopping at ``limit`` names
+        start = joined.find(query) if len(found) < limit else -1
+        while start != -1:
+            i = bisect.bisect_right(offsets, start) - 1
+            found.setdefault(ranks[i])
+            if len(found) == limit or i + 1 == len(offsets):
+                break
+            start = joined.find(query, offsets[i + 1])
+        return list(found)
+
+
+def _gender(category):
+    # "LANCERS FEMME" -> "FEMME"
+    return category.rsplit(" ", 1)[-1]
+
+
+def fetch_athlete_search(bind=None):
+    with Session(bind or get_engine()) as session:
+        names = dict(session.execute(select(Athlete.id, Athlete.name)).all())
+        categories = session.execute(
+            select(AthleteCategory.athlete_id, AthleteCategory.event_category)
+        ).all()
+    return AthleteSearch(names, categories)
+
+
+@st.cache_resource(ttl=SEARCH_TTL, show_spinner=False)
+def get_athlete_search():
+    # One index for the whole server, rebuilt every SEARCH_TTL seconds
+    return fetch_athlete_search()
@@ -0,0 +1,364 @@
+"""Registry of the athletes: integer ids, canonical names and aliases.
+
+Predictions reference athletes by ``QuizPrediction.athlete_id``, set when a
+page is saved, so scoring matches podiums and groups cotes on integers. Scraped
+names and names typed with "Autre" are resolved through an ``AthleteIndex``
+once per distinct name, never per comparison: an exact alias first, then the
+same name up to accents, case, hyphens and word order, then the closest
+registered name by trigram similarity.
+
+migrate.py seeds the registry from constants.athletes. It is refreshed from the
+club's athletes found in scraped results, along with the quiz categories they
+compete in (the podium pickers list those, see athlete_search.py), and other
+spellings can be added as aliases; predictions naming them are linked to the
+athlete:
+
+    python athletes.py refresh "<athle.fr results url>" --pages 5
+    python athletes.py alias "DESSENNES-VOLTINE Kris" "DESSENNES Kris"
+"""
+
+import argparse
+import threading
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import bindparam, func, select
+from sqlmodel import Session
+
+from models import (
+    Athlete,
+    AthleteAlias,
+    AthleteCategory,
+    QuizPrediction,
+    athlete_key,
+    bump_predictions_revision,
+    fold_name,
+    get_engine,
+)
+
+# A fuzzy match needs this trigram similarity (Dice coefficient) and to beat
+# the best other athlete by MIN_MARGIN, so that "BEAUGENDRE Alexis" does not
+# resolve to "BEAUGENDRE Adrien"
+MIN_SIMILARITY = 0.7
+MIN_MARGIN = 0.1
+# Aliases less similar than this can neither match nor be the runner-up that
+# blocks a match, so match() does not score them
+CANDIDATE_SIMILARITY = MIN_SIMILARITY - MIN_MARGIN
+
+
+def name_trigrams(folded):
+    # Per word, like pg_trgm: word order does not matter
+    return {
+        padded[i : i + 3]
+        for word in folded.split()
+        for padded in [f"  {word} "]
+        for i in range(len(padded) - 2)
+    }
+
+
+class AthleteIndex:
+    """Alias key -> athlete id, with a trigram index for the other spellings.
+
+    Names outside the registry get negative ids, the same for every name with
+    the same folded form, so that they can still be matched against each
+    other. Resolutions are remembered, each distinct name is only looked up
+    once per index.
+    """
+
+    def __init__(self, aliases=(), names=None):
+        self.ids = dict(aliases)
+        self.names = names or {}  # id -> canonical name
+        self._lock = threading.Lock()
+        self._resolved = {}  # key -> id, for keys that are not aliases
+        self._unknown = {}  # folded name -> negative id
+        # Word order sorted so that "Kris DESSENNES" folds like "DESSENNES Kris"
+        self._folded = {}
+        postings = {}  # trigram -> positions of the aliases that have it
+        sizes = []  # Trigram count per alias position
+        for position, (key, athlete_id) in enumerate(self.ids.items()):
+            folded = fold_name(key)
+            self._folded.setdefault(" ".join(sorted(folded.split())), athlete_id)
+            trigrams = name_trigrams(folded)
+            for trigram in trigrams:
+                postings.setdefault(trigram, []).append(position)
+            sizes.append(len(trigrams))
+        self._postings = {t: np.array(p) for t, p in postings.items()}
+        self._sizes = np.array(sizes)
+        self._alias_ids = np.array(list(self.ids.values()), dtype=int)
+
+    def __len__(self):
+        return len(self.names)
+
+    def match(self, name):
+        """Registered athlete id closest to ``name``, None if none is close enough."""
+        folded = fold_name(name)
+        athlete_id = self._folded.get(" ".join(sorted(folded.split())))
+        if athlete_id is not None:
+            return athlete_id
+        trigrams = name_trigrams(folded)
+        postings = [self._postings[t] for t in trigrams if t in self._postings]
+        if not postings:
+            return None
+        # Shared trigrams with every alias at once, then the Dice coefficient
+        shared = np.bincount(np.concatenate(postings), minlength=len(self._sizes))
+        similarities = 2 * shared / (len(trigrams) + self._sizes)
+        best = {}  # athlete id -> best similarity over its aliases
+        for position in np.flatnonzero(similarities >= CANDIDATE_SIMILARITY):
+            athlete_id = int(self._alias_ids[position])
+            similarity = similarities[position]
+            if similarity > best.get(athlete_id, 0):
+                best[athlete_id] = similarity
+        ranked = sorted(best.items(), key=lambda item: -item[1]) + [(None, 0)] * 2
+        (athlete_id, similarity), (_, runner_up) = ranked[:2]
+        if similarity >= MIN_SIMILARITY and similarity - runner_up >= MIN_MARGIN:
+            return athlete_id
+        return None
+
+    def lookup(self, name):
+        """Registered athlete id of ``name``, None if there is none close."""
+        athlete_id = self.ids.get(athlete_key(name))
+        return self.match(name) if athlete_id is None else athlete_id
+
+    def resolve_name(self, name):
+        """Like lookup, with a negative id for names outside the registry."""
+        key = athlete_key(name)
+        athlete_id = self.ids.get(key)
+        if athlete_id is None:
+            athlete_id = self._resolved.get(key)
+        if athlete_id is None:
+            athlete_id = self.match(name)
+            with self._lock:
+                if athlete_id is None:
+                    athlete_id = self._unknown.setdefault(
+                        fold_name(name), -len(self._unknown) - 1
+                    )
+                self._resolved[key] = athlete_id
+        return athlete_id
+
+    def resolve(self, names: pd.Series) -> np.ndarray:
+        """Ids of ``names``, 0 for missing names."""
+        codes, uniques = pd.factorize(names)
+        ids = np.array([self.resolve_name(name) for name in uniques] + [0])
+        return ids[codes]  # Code -1 (missing) picks the trailing 0
+
+
+def get_registry_version(bind=None):
+    statement = select(func.count(), func.max(AthleteAlias.athlete_id))
+    with Session(bind or get_engine()) as session:
+        return tuple(session.execute(statement).one())
+
+
+def read_athlete_index(session: Session):
+    aliases = session.execute(select(AthleteAlias.key, AthleteAlias.athlete_id))
+    aliases = aliases.all()
+    names = dict(session.execute(select(Athlete.id, Athlete.name)).all())
+    return AthleteIndex(aliases, names)
+
+
+def fetch_athlete_index(bind=None):
+    with Session(bind or get_engine()) as session:
+        return read_athlete_index(session)
+
+
+_index_lock = threading.Lock()
+_index = (None, AthleteIndex())
+
+
+def load_athlete_index():
+    """The registry's AthleteIndex, rebuilt only when the registry changed.
+
+    Kept at module level rather than in a Streamlit cache since the live
+    poller thread calls it outside of any script run.
+    """
+    global _index
+    version = get_registry_version()
+    with _index_lock:
+        if _index[0] != version:
+            _index = (version, fetch_athlete_index())
+        return _index[1]
+
+
+# --- Registry updates ---
+def register_athletes(session: Session, names):
+    """Add the names the registry does not know yet, returns how many."""
+    athletes = Athlete.__table__
+    aliases = AthleteAlias.__table__
+    new = {}
+    for name in names:
+        if isinstance(name, str) and name.strip():
+            new.setdefault(athlete_key(name), " ".join(name.split()))
+    known = session.execute(select(aliases.c.key).where(aliases.c.key.in_(list(new))))
+    for key in known.scalars():
+        del new[key]
+    if new:
+        session.execute(
+            athletes.insert(), [{"name": n, "key": k} for k, n in new.items()]
+        )
+        session.execute(
+            aliases.insert().from_select(
+                ["key", "athlete_id"],
+                select(athletes.c.key, athletes.c.id).where(
+                    athletes.c.key.in_(list(new))
+                ),
+            )
+        )
+    return len(new)
+
+
+def add_alias(session: Session, name, alias):
+    """Make ``alias`` another spelling of the registered athlete ``name``."""
+    aliases = AthleteAlias.__table__
+    athlete_id = session.execute(
+        select(aliases.c.athlete_id).where(aliases.c.key == athlete_key(name))
+    ).scalar()
+    if athlete_id is None:
+        raise ValueError(f"{name!r} is not a registered athlete.")
+    session.execute(
+        aliases.insert(), [{"key": athlete_key(alias), "athlete_id": athlete_id}]
+    )
+    return athlete_id
+
+
+def link_predictions(session: Session):
+    """Set athlete_id on the predictions naming a registered athlete.
+
+    For predictions saved before their athlete (or its alias) was registered,
+    and for spellings only AthleteIndex.match recognizes: page saves link
+    exact aliases only. Returns the number of distinct values linked.
+    """
+    table = QuizPrediction.__table__
+    values = (
+        session.execute(
+            select(table.c.predicted_value)
+            .distinct()
+            .where(table.c.athlete_id.is_(None))
+            .where(table.c.prediction_type.like("Place %"))
+        )
+        .scalars()
+        .all()
+    )
+    index = read_athlete_index(session)
+    updates = [
+        {"value": value, "new_id": athlete_id}
+        for value in values
+        if (athlete_id := index.lookup(value)) is not None
+    ]
+    if updates:
+        session.execute(
+            table.update()
+            .where(table.c.predicted_value == bindparam("value"))
+            .where(table.c.athlete_id.is_(None))
+            .values(athlete_id=bindparam("new_id")),
+            updates,
+        )
+        bump_predictions_revision(session)
+    return len(updates)
+
+
+def add_categories(session: Session, roster):
+    """Record the quiz categories of registered athletes, returns how many are new.
+
+    ``roster`` maps names to categories, as returned by roster_from_results.
+    """
+    aliases = AthleteAlias.__table__
+    table = AthleteCategory.__table__
+    keys = {athlete_key(name): categories for name, categories in roster.items()}
+    ids = dict(
+        session.execute(
+            select(aliases.c.key, aliases.c.athlete_id).where(
+                aliases.c.key.in_(list(keys))
+            )
+        ).all()
+    )
+    known = session.execute(
+        select(table.c.athlete_id, table.c.event_category).where(
+            table.c.athlete_id.in_(set(ids.values()))
+        )
+    )
+    new = {
+        (ids[key], category)
+        for key, categories in keys.items()
+        if key in ids
+        for category in categories
+    } - set(known.all())
+    if new:
+        session.execute(
+            table.insert(),
+            [{"athlete_id": a, "event_category": c} for a, c in sorted(new)],
+        )
+    return len(new)
+
+
+def roster_from_results(df):
+    """{name: quiz categories} of the club's athletes in parsed results.
+
+    ``df`` comes from athle.parse_results_pages. Relay runners are listed
+    without a category.
+    """
+    from results_pipeline import CLUB_PREFIX, discipline_category, iter_blocks
+
+    club = df["Club"].str.lower().str.startswith(CLUB_PREFIX, na=False).to_numpy()
+    names = df["Athlète"].to_numpy()
+    roster = {}
+    for _, sport, start, stop in iter_blocks(df):
+        category = discipline_category(sport)
+        for name in names[start:stop][club[start:stop]]:
+            if isinstance(name, str):
+                categories = roster.setdefault(name, set())
+                if category is not None:
+                    categories.add(category)
+    return roster
+
+
+def refresh_from_results(url, page_nb):
+    """Register the club's athletes of a competition and their categories.
+
+    Returns (athletes found, new athletes, new categories).
+    """
+    from athle import fetch_pages, parse_results_pages
+
+    pages = fetch_pages([url.format(i) for i in range(page_nb)])
+    roster = roster_from_results(parse_results_pages(pages))
+    with Session(get_engine()) as session:
+        added = register_athletes(session, roster)
+        categorized = add_categories(session, roster)
+        link_predictions(session)
+        session.commit()
+    return len(roster), added, categorized
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Manage the athlete registry.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    refresh_parser = subparsers.add_parser(
+        "refresh",
+        help="Register the club's athletes found in results pages, with the "
+        "categories they compete in.",
+    )
+    refresh_parser.add_argument("url", help="Results URL, without frmposition")
+    refresh_parser.add_argument("--pages", type=int, default=5)
+    alias_parser = subparsers.add_parser(
+        "alias", help="Add another spelling of a registered athlete."
+    )
+    alias_parser.add_argument("name")
+    alias_parser.add_argument("alias")
+    args = parser.parse_args()
+
+    if args.command == "refresh":
+        found, added, categorized = refresh_from_results(
+            args.url + "&frmposition={}", args.pages
+        )
+        print(
+            f"{found} club athletes in the results, {added} new, "
+            f"{categorized} new categories."
+        )
+    else:
+        with Session(get_engine()) as session:
+            athlete_id = add_alias(session, args.name, args.alias)
+            linked = link_predictions(session)
+            session.commit()
+        print(f"{args.alias!r} is now athlete {athlete_id}, {linked} value(s) linked.")
+
+
+if __name__ == "__main__":
+    main()
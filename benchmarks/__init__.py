@@ -0,0 +1,17 @@
+"""Benchmarks for the quiz app, run from the repository root with
+``python -m benchmarks.<name>``.
+
+They use ``DATABASE_URL`` when it is set (e.g. a local Postgres) and fall back
+to a throwaway SQLite file otherwise.
+"""
+
+import os
+import tempfile
+
+
+def use_benchmark_database():
+    # Must run before the engine is first used, models.get_engine caches it
+    if not os.getenv("DATABASE_URL"):
+        path = os.path.join(tempfile.mkdtemp(prefix="sra-bench-"), "bench.db")
+        os.environ["DATABASE_URL"] = f"sqlite:///{path}"
+    return os.environ["DATABASE_URL"]
@@ -0,0 +1,104 @@
+"""Splitting the results table into discipline blocks: concat loop vs one pass.
+
+The former results page grew ``perfs`` with one ``pd.concat`` per discipline
+block, which is quadratic in the number of blocks. This compares it with
+``results_pipeline.club_performances`` on large synthetic championships
+(tests/test_blocks.py checks that both give the same rows):
+
+    python -m benchmarks.blocks --disciplines 40 200 800
+"""
+
+import argparse
+import time
+
+import pandas as pd
+
+from athle import parse_results_pages
+from benchmarks.fixtures import make_meeting
+from results_pipeline import categorize_discipline, club_performances, iter_blocks
+
+
+def legacy_club_performances(df):
+    # Verbatim from the former pages/results.py
+    perfs = pd.DataFrame()
+
+    sports = df.loc[df.Club.str.contains("Finale")]
+    for idx in range(len(sports.index)):
+        sport = df.iloc[sports.index[idx]].Club.split("|")[0]
+
+        if idx == len(sports.index) - 1:
+            results = df.iloc[sports.index[idx] + 1 :].copy()
+        else:
+            results = df.iloc[sports.index[idx] + 1 : sports.index[idx + 1]].copy()
+
+        if "4 X" in sport:
+            continue
+        if (
+            "Javelot" in sport
+            or "Hauteur" in sport
+            or "Perche" in sport
+            or "Triple" in sport
+            or "Longueur" in sport
+            or "Poids" in sport
+            or "Disque" in sport
+            or "Marteau" in sport
+        ):
+            results = results.loc[~results.Performance.isna()]
+        results["Discipline"] = [sport] * len(results)
+        perfs = pd.concat([perfs, results], ignore_index=True)
+
+    perfs_club = perfs.loc[
+        perfs.Club.str.lower().str.startswith("stade rennais athletisme")
+    ].copy()
+
+    perfs_club.Points = perfs_club.Points.fillna(0)
+    perfs_club.Points = perfs_club.Points.astype(int)
+
+    perfs_club = perfs_club.drop(columns=["Cotation"])
+
+    perfs_club["Sexe"] = (
+        perfs_club["Discipline"].str.split("/").str.get(1).str.strip().str.get(2)
+    )
+
+    perfs_club["Discipline_Type"] = perfs_club["Discipline"].apply(
+        categorize_discipline
+    )
+    return perfs_club
+
+
+def one_pass_club_performances(df):
+    return club_performances(df, iter_blocks(df)).drop(columns="block")
+
+
+def best_of(function, df, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function(df)
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--disciplines", type=int, nargs="+", default=[40, 200, 800])
+    parser.add_argument("--entries", type=int, default=16)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    for disciplines in args.disciplines:
+        df = parse_results_pages(
+            make_meeting(disciplines=disciplines, entries=args.entries, pages=5)
+        )
+        legacy_time = best_of(legacy_club_performances, df, args.repeat)
+        one_pass_time = best_of(one_pass_club_performances, df, args.repeat)
+        print(
+            f"{disciplines:>4} disciplines ({len(df)} rows): "
+            f"concat loop {legacy_time * 1000:8.1f} ms, "
+            f"one pass {one_pass_time * 1000:6.1f} ms "
+            f"(x{legacy_time / one_pass_time:.1f})"
+        )
+
+
+if __name__ == "__main__":
+    main()
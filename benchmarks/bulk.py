@@ -0,0 +1,125 @@
+"""Bulk import/export of predictions (archive.py) against ORM inserts.
+
+Generates a CSV of synthetic predictions, imports it, exports it back to CSV
+and Parquet, re-imports the Parquet file, and checks the round trip and the
+rebuilt counts. The ORM baseline (add_all, one INSERT per row) only loads
+``--orm-rows`` rows and its rate is extrapolated:
+
+    python -m benchmarks.bulk --rows 1000000
+"""
+
+import argparse
+import csv
+import os
+import random
+import tempfile
+import time
+from datetime import UTC, datetime, timedelta
+
+from sqlmodel import Session, SQLModel
+
+from archive import EXPORT_COLUMNS, export_predictions, import_predictions
+from benchmarks import use_benchmark_database
+from benchmarks.save_page import CATEGORIES, PLACES, check_counts
+from constants import athletes
+from models import QuizPrediction, get_engine
+
+PAGES = [(category, place) for category in CATEGORIES for place in PLACES]
+
+
+def synthetic_rows(rows, seed=0):
+    # Timestamps as exported from SQLite, so that the round trip is comparable
+    rng = random.Random(seed)
+    start = datetime(2025, 6, 1)
+    for i in range(rows):
+        category, place = PAGES[i % len(PAGES)]
+        yield (
+            f"user{i // len(PAGES):07d}",
+            category,
+            place,
+            rng.choice(athletes),
+            str(start + timedelta(seconds=i, microseconds=1 + rng.randrange(999_999))),
+        )
+
+
+def reset_database():
+    engine = get_engine()
+    SQLModel.metadata.drop_all(engine)
+    SQLModel.metadata.create_all(engine)
+
+
+def orm_insert(rows):
+    reset_database()
+    start = time.perf_counter()
+    with Session(get_engine()) as session:
+        session.add_all(
+            QuizPrediction(
+                **dict(zip(EXPORT_COLUMNS, row[:-1])),
+                submission_timestamp=datetime.fromisoformat(row[-1]).replace(
+                    tzinfo=UTC
+                ),
+            )
+            for row in synthetic_rows(rows)
+        )
+        session.commit()
+    return time.perf_counter() - start
+
+
+def timed(function, *args, **kwargs):
+    start = time.perf_counter()
+    result = function(*args, **kwargs)
+    return result, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--orm-rows", type=int, default=20_000)
+    args = parser.parse_args()
+    use_benchmark_database()  # Before the engine is first used
+
+    directory = tempfile.mkdtemp(prefix="sra-bulk-")
+    source = os.path.join(directory, "source.csv")
+    with open(source, "w", newline="") as file:
+        writer = csv.writer(file)
+        writer.writerow(EXPORT_COLUMNS)
+        writer.writerows(synthetic_rows(args.rows))
+    print(f"{get_engine().url.render_as_string(hide_password=True)}: {args.rows} rows")
+
+    orm_time = orm_insert(args.orm_rows)
+    print(
+        f"ORM add_all:    {args.orm_rows / orm_time:9.0f} rows/s "
+        f"(~{args.rows / args.orm_rows * orm_time:.1f}s for {args.rows} rows)"
+    )
+
+    reset_database()
+    count, import_time = timed(import_predictions, source)
+    assert count == args.rows, f"{count} predictions after the import"
+    check_counts()
+    print(f"import CSV:     {args.rows / import_time:9.0f} rows/s ({import_time:.1f}s)")
+
+    exported = {}
+    for format in ("csv", "parquet"):
+        path = os.path.join(directory, f"export.{format}")
+        rows, export_time = timed(export_predictions, path)
+        assert rows == args.rows, f"{rows} rows exported to {format}"
+        exported[format] = path
+        print(
+            f"export {format:8}{args.rows / export_time:9.0f} rows/s "
+            f"({export_time:.1f}s, {os.path.getsize(path) / 2**20:.0f} MiB)"
+        )
+
+    with open(source, newline="") as a, open(exported["csv"], newline="") as b:
+        assert list(csv.reader(a)) == list(csv.reader(b)), "CSV round trip differs"
+
+    count, import_time = timed(import_predictions, exported["parquet"], replace=True)
+    assert count == args.rows, f"{count} predictions after the Parquet import"
+    check_counts()
+    export_predictions(exported["csv"])
+    with open(source, newline="") as a, open(exported["csv"], newline="") as b:
+        assert list(csv.reader(a)) == list(csv.reader(b)), "Parquet round trip differs"
+    print(f"import Parquet: {args.rows / import_time:9.0f} rows/s ({import_time:.1f}s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+"""Wall-clock time of downloading and parsing a meeting, by page count.
+
+Compares the former sequential ``pd.read_html(url)`` calls with the concurrent
+fetcher, against a local server that adds a fixed latency to every request:
+
+    python -m benchmarks.fetch --pages 1 5 10 20 --latency 0.3
+"""
+
+import argparse
+import time
+
+import pandas as pd
+
+from athle import fetch_pages, parse_results_pages, parse_total_points
+from benchmarks.fixtures import make_meeting, serve_meeting
+
+
+def sequential(url, page_nb):
+    # What the results page used to do: page 0 twice, then one page at a time
+    df = pd.DataFrame()
+    for elt in pd.read_html(url.format(0), skiprows=1)[1:]:
+        df = pd.concat([df, elt], ignore_index=True)
+    total_points = int(
+        df[df[1].str.contains("STADE RENNAIS ATHLETISME*")][2]
+        .iloc[0][:-3]
+        .replace(" ", "")
+    )
+    df = pd.concat(
+        [
+            pd.read_html(url.format(i), skiprows=3 if i == 0 else 2)[0]
+            for i in range(page_nb)
+        ],
+        ignore_index=True,
+    )
+    return total_points, df
+
+
+def concurrent(url, page_nb):
+    pages = fetch_pages([url.format(i) for i in range(page_nb)])
+    return parse_total_points(pages[0]), parse_results_pages(pages)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--pages", type=int, nargs="+", default=[1, 5, 10, 20])
+    parser.add_argument("--latency", type=float, default=0.3)
+    parser.add_argument("--disciplines", type=int, default=40)
+    args = parser.parse_args()
+
+    for page_nb in args.pages:
+        pages = make_meeting(disciplines=args.disciplines, pages=page_nb)
+        with serve_meeting(pages, latency=args.latency) as base_url:
+            url = base_url + "&frmposition={}"
+            start = time.perf_counter()
+            expected_total, expected = sequential(url, page_nb)
+            sequential_time = time.perf_counter() - start
+            start = time.perf_counter()
+            total, df = concurrent(url, page_nb)
+            concurrent_time = time.perf_counter() - start
+
+        assert total == expected_total
+        assert df.shape[0] == expected.shape[0]
+        print(
+            f"{page_nb:>3} pages: sequential {sequential_time:6.2f}s, "
+            f"concurrent {concurrent_time:6.2f}s "
+            f"(x{sequential_time / concurrent_time:.1f})"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,190 @@
+"""Synthetic bases.athle.fr result pages and a local HTTP server to serve them.
+
+The pages mimic the layout the results page relies on: a 17-column results
+table whose discipline headers are full-width rows ("100m / TCM | Finale"),
+with separator cells between the data columns, and on the first page the club
+ranking tables after the results table.
+"""
+
+import contextlib
+import hashlib
+import random
+import threading
+import time
+from html import escape
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+from constants import athletes
+
+CLUB = "STADE RENNAIS ATHLETISME*"
+OTHER_CLUBS = ["A.C. BREST", "U.S. GUINGAMP", "CAEN ATHLETIC CLUB", "STADE LAVALLOIS"]
+
+EVENTS = [
+    "100m",
+    "200m",
+    "400m",
+    "800m",
+    "1500m",
+    "5000m",
+    "110m Haies",
+    "400m Haies",
+    "3000m Steeple",
+    "Hauteur",
+    "Perche",
+    "Longueur",
+    "Triple Saut",
+    "Poids",
+    "Disque",
+    "Marteau",
+    "Javelot",
+    "4 X 100m",
+    "4 X 400m",
+    "Marche",
+]
+FIELD_EVENTS = (
+    "Hauteur",
+    "Perche",
+    "Longueur",
+    "Triple",
+    "Poids",
+    "Disque",
+    "Marteau",
+    "Javelot",
+)
+
+
+def _row(cells):
+    return "<tr>" + "".join(f"<td>{escape(str(c))}</td>" for c in cells) + "</tr>"
+
+
+def _header(text):
+    return f'<tr><td colspan="17">{escape(text)}</td></tr>'
+
+
+def make_disciplines(count=20, entries=12, seed=0):
+    """``count`` discipline blocks of ``entries`` results, as (header, rows)."""
+    rng = random.Random(seed)
+    blocks = []
+    for i in range(count):
+        event = EVENTS[i % len(EVENTS)]
+        gender = "M" if (i // len(EVENTS)) % 2 == 0 else "F"
+        header = f"{event} / TC{gender} | Finale | Série {i // len(EVENTS) + 1}"
+        rows = []
+        for place in range(1, entries + 1):
+            club = CLUB if rng.random() < 0.3 else rng.choice(OTHER_CLUBS)
+            points = rng.randint(600, 1200)
+            # Field events list athletes without a mark (no valid attempt)
+            performance = (
+                ""
+                if (event.startswith(FIELD_EVENTS) and rng.random() < 0.1)
+                else f"{rng.uniform(1, 80):.2f}"
+            )
+            rows.append(
+                [
+                    "",
+                    place,
+                    performance,
+                    "",
+                    rng.choice(athletes),
+                    "",
+                    club,
+                    "",
+                    "SE",
+                    "BRE",
+                    "035",
+                    "",
+                    "",
+                    "",
+                    f"{points} pts",
+                    "",
+                    points,
+                ]
+            )
+        blocks.append((header, rows))
+    return blocks
+
+
+def make_meeting(disciplines=20, entries=12, pages=5, seed=0):
+    """HTML bytes of the ``pages`` result pages of a synthetic meeting."""
+    rows = []
+    for header, block_rows in make_disciplines(disciplines, entries, seed):
+        rows.append(_header(header))
+        rows.extend(_row(r) for r in block_rows)
+
+    per_page = -(-len(rows) // pages)
+    html_pages = []
+    for i in range(pages):
+        # Banner rows skipped by the parser: 3 on the first page, 2 after
+        banner = [_header("Résultats"), _header("Interclubs")]
+        if i == 0:
+            banner.insert(0, _header("bases.athle.fr"))
+        body = "".join(banner + rows[i * per_page : (i + 1) * per_page])
+        tables = [f"<table>{body}</table>"]
+        if i == 0:
+            ranking = [(CLUB, "52 345 pts")] + [
+                (club, f"{48000 - 1000 * n} pts") for n, club in enumerate(OTHER_CLUBS)
+            ]
+            tables.append(
+                "<table>"
+                + _header("Classement des clubs")
+                + "".join(
+                    _row([rank, club, pts])
+                    for rank, (club, pts) in enumerate(ranking, 1)
+                )
+                + "</table>"
+            )
+        html_pages.append(
+            (
+                '<html><head><meta charset="utf-8"></head><body>'
+                + "".join(tables)
+                + "</body></html>"
+            ).encode("utf-8")
+        )
+    return html_pages
+
+
+@contextlib.contextmanager
+def serve_meeting(pages, latency=0.0):
+    """Serve ``pages`` on localhost, selected by the ``frmposition`` parameter.
+
+    Responses carry an ETag and conditional requests get a 304 when the page
+    is unchanged. ``pages`` may be mutated while serving to simulate updates.
+
+    Yields the base URL to give to the results page (without frmposition).
+    """
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            query = parse_qs(urlparse(self.path).query)
+            position = int(query.get("frmposition", ["0"])[0])
+            time.sleep(latency)
+            if position >= len(pages):
+                self.send_error(404)
+                return
+            body = pages[position]
+            etag = '"' + hashlib.sha1(body).hexdigest() + '"'
+            if self.headers.get("If-None-Match") == etag:
+                self.send_response(304)
+                self.send_header("ETag", etag)
+                self.end_headers()
+                return
+            self.send_response(200)
+            self.send_header("ETag", etag)
+            self.send_header("Content-Type", "text/html; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        host, port = server.server_address
+        yield f"http://{host}:{port}/liste.aspx?frmbase=resultats&frmcompetition=1"
+    finally:
+        server.shutdown()
+        server.server_close()
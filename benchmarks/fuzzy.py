@@ -0,0 +1,187 @@
+"""Lookup time and accuracy of the athlete name index.
+
+The index holds the roster plus synthetic names up to --size aliases. Each
+registered name is looked up as typed by users: folded (accents, case,
+hyphens), in the other word order and with one typo; names that are not
+registered must stay unresolved:
+
+    python -m benchmarks.fuzzy --size 5000 --queries 2000
+"""
+
+import argparse
+import random
+import string
+import time
+
+import pandas as pd
+
+from athletes import AthleteIndex
+from constants import athletes
+from models import athlete_key
+
+SYLLABLES = [
+    "ba",
+    "be",
+    "bi",
+    "bo",
+    "bu",
+    "ca",
+    "ce",
+    "ci",
+    "co",
+    "cu",
+    "da",
+    "de",
+    "di",
+    "do",
+    "du",
+    "fa",
+    "fe",
+    "fi",
+    "fo",
+    "ga",
+    "ge",
+    "gi",
+    "go",
+    "la",
+    "le",
+    "li",
+    "lo",
+    "lu",
+    "ma",
+    "me",
+    "mi",
+    "mo",
+    "mu",
+    "na",
+    "ne",
+    "ni",
+    "no",
+    "nu",
+    "pa",
+    "pe",
+    "pi",
+    "po",
+    "ra",
+    "re",
+    "ri",
+    "ro",
+    "sa",
+    "se",
+    "si",
+    "so",
+    "ta",
+    "te",
+    "ti",
+    "to",
+    "va",
+    "ve",
+    "vi",
+    "vo",
+    "dé",
+    "lé",
+    "ré",
+    "ël",
+    "an",
+    "on",
+    "in",
+    "eau",
+    "ier",
+    "mar",
+]
+
+
+def synthetic_name(rng):
+    last = "".join(rng.choices(SYLLABLES, k=rng.randint(2, 4))).upper()
+    first = "".join(rng.choices(SYLLABLES, k=rng.randint(2, 3))).capitalize()
+    return f"{last} {first}"
+
+
+def folded_variant(name, rng):
+    return name.lower().replace(" ", rng.choice([" ", "-", "  "]))
+
+
+def swapped_variant(name, rng):
+    words = name.split()
+    return " ".join(words[1:] + words[:1])
+
+
+def typo_variant(name, rng):
+    # One substitution in the longest word, far enough from its start
+    words = name.split()
+    longest = max(range(len(words)), key=lambda i: len(words[i]))
+    word = words[longest]
+    i = rng.randrange(1, len(word))
+    words[longest] = word[:i] + rng.choice(string.ascii_lowercase) + word[i + 1 :]
+    return " ".join(words)
+
+
+VARIANTS = {
+    "folded": folded_variant,
+    "swapped": swapped_variant,
+    "typo": typo_variant,
+}
+
+
+def per_lookup(lookup, names):
+    start = time.perf_counter()
+    results = [lookup(name) for name in names]
+    return results, (time.perf_counter() - start) / len(names)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--size", type=int, default=5000)
+    parser.add_argument("--queries", type=int, default=2000)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    names = {athlete_key(name): name for name in athletes}
+    roster_size = len(names)
+    while len(names) < args.size:
+        name = synthetic_name(rng)
+        names.setdefault(athlete_key(name), name)
+    ids = {key: i for i, key in enumerate(names, start=1)}
+
+    start = time.perf_counter()
+    index = AthleteIndex(ids.items(), {ids[k]: n for k, n in names.items()})
+    print(f"{len(index)} athletes indexed in {time.perf_counter() - start:.3f}s")
+
+    # Roster names first: the perturbations must resolve them
+    roster, others = list(names)[:roster_size], list(names)[roster_size:]
+    sample = roster + rng.sample(
+        others, min(len(others), max(0, args.queries - roster_size))
+    )
+    unknown = []
+    while len(unknown) < args.queries:
+        name = synthetic_name(rng) + " " + rng.choice(SYLLABLES).upper()
+        if athlete_key(name) not in names:
+            unknown.append(name)
+
+    cases = {"exact": [(names[key], ids[key]) for key in sample]}
+    for label, variant in VARIANTS.items():
+        cases[label] = [(variant(names[key], rng), ids[key]) for key in sample]
+    cases["unknown"] = [(name, None) for name in unknown]
+
+    print(f"{'lookup':8} {'us/lookup':>10} {'cached':>8} {'right':>7} {'wrong':>7}")
+    for label, queries in cases.items():
+        queries_names = [name for name, _ in queries]
+        results, seconds = per_lookup(index.lookup, queries_names)
+        index.resolve(pd.Series(queries_names))  # Warm the per-name cache
+        _, cached = per_lookup(index.resolve_name, queries_names)
+        right = sum(
+            result == expected for result, (_, expected) in zip(results, queries)
+        )
+        wrong = sum(
+            result is not None and result != expected
+            for result, (_, expected) in zip(results, queries)
+        )
+        print(
+            f"{label:8} {seconds * 1e6:10.1f} {cached * 1e6:8.2f} "
+            f"{right / len(queries):7.1%} {wrong / len(queries):7.1%}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+"""Refresh cost of the results pipeline during a live competition.
+
+Disciplines finish one after the other; after each one the results are
+refreshed incrementally and from scratch (tests/test_results_tracker.py checks
+that both give the same leaderboard):
+
+    python -m benchmarks.incremental --disciplines 40 --users 500
+"""
+
+import argparse
+import time
+
+from athle import parse_results_pages
+from benchmarks.fixtures import make_meeting
+from benchmarks.scoring import make_predictions
+from results_pipeline import ResultsTracker
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--disciplines", type=int, default=40)
+    parser.add_argument("--users", type=int, default=500)
+    parser.add_argument("--pages", type=int, default=5)
+    args = parser.parse_args()
+
+    predictions = make_predictions(args.users, seed=0)
+    version = ("bench", len(predictions))
+    total_points = 50000
+    final = parse_results_pages(
+        make_meeting(disciplines=args.disciplines, pages=args.pages)
+    )
+    # Row index of each discipline header: results published up to the n-th one
+    headers = final.index[final.Club.str.contains("Finale", na=False)].tolist()
+    cutoffs = headers[1:] + [len(final)]
+
+    incremental = ResultsTracker()
+    incremental_time = full_time = 0.0
+    for cutoff in cutoffs:
+        df = final.iloc[:cutoff].reset_index(drop=True)
+
+        start = time.perf_counter()
+        incremental.update(df, total_points, predictions, version)
+        incremental_time += time.perf_counter() - start
+
+        start = time.perf_counter()
+        ResultsTracker().update(df, total_points, predictions, version)
+        full_time += time.perf_counter() - start
+
+    refreshes = len(cutoffs)
+    print(f"{refreshes} refreshes, {len(predictions)} predictions")
+    print(f"incremental: {incremental_time / refreshes * 1000:7.1f} ms/refresh")
+    print(f"from scratch: {full_time / refreshes * 1000:7.1f} ms/refresh")
+
+
+if __name__ == "__main__":
+    main()
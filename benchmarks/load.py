@@ -0,0 +1,328 @@
+"""End-to-end load test of the quiz wizard and the results page.
+
+Players go through the quiz while viewers refresh the results. Each player
+thread gets a Streamlit script run context of its own, so it has its own
+st.session_state like a browser session, and calls the wizard's real code:
+load_predictions_from_db ("login"), save_page_data_to_db ("save_page") and the
+final wait for pending saves ("finish"). Viewers run the results page's
+process_competition against a local synthetic meeting ("results"). Players
+pick athletes with Zipf-skewed popularity; some come back in a new session
+and change one page. Everything runs in one process sharing the repository
+and the connection pool, like the server, which follows the usual environment
+(WRITE_BEHIND, DB_ASYNC, DB_POOL_*):
+
+    python -m benchmarks.load --players 500 --concurrency 50 --output run.json
+
+Prints p50/p95/p99 latency and throughput per operation; --output writes
+them as JSON to compare runs.
+
+The per-thread sessions are built from streamlit.runtime internals
+(ScriptRunContext, SafeSessionState, MemoryFragmentStorage, PagesManager),
+which are not a public API: this is written against the streamlit pinned in
+uv.lock (1.45.0) and also runs on 1.66. new_session is the place to adapt
+after an upgrade changes their signatures.
+"""
+
+import argparse
+import json
+import os
+import random
+import statistics
+import tempfile
+import threading
+import time
+import traceback
+from concurrent.futures import ThreadPoolExecutor, wait
+
+import streamlit as st
+from sqlalchemy import select
+from sqlmodel import Session
+from streamlit.runtime.fragment import MemoryFragmentStorage
+from streamlit.runtime.memory_uploaded_file_manager import (
+    MemoryUploadedFileManager,
+)
+from streamlit.runtime.pages_manager import PagesManager
+from streamlit.runtime.scriptrunner_utils.script_run_context import (
+    ScriptRunContext,
+    add_script_run_ctx,
+)
+from streamlit.runtime.state import SafeSessionState, SessionState
+
+from benchmarks import use_benchmark_database
+from benchmarks.fixtures import make_meeting, serve_meeting
+from benchmarks.save_page import check_counts
+from constants import athletes
+from live_leaderboard import process_competition
+from migrate import upgrade
+from models import QuizPrediction, get_engine
+from page_cache import PageCache
+from queries import load_versioned_snapshot
+from quiz_app import (
+    PAGE_POINTS,
+    PREDICTION_TYPE_POINTS,
+    QUIZ_PAGES_FOR_PROGRESS,
+    check_pending_saves,
+    init_session_state,
+    load_predictions_from_db,
+    save_page_data_to_db,
+)
+from results_pipeline import ResultsTracker
+
+EVENT_PAGES = [page for page in QUIZ_PAGES_FOR_PROGRESS if page != PAGE_POINTS]
+ENVIRONMENT = ["WRITE_BEHIND", "WRITE_BEHIND_DURABLE", "DB_ASYNC", "DB_POOL_SIZE"]
+
+
+class Recorder:
+    """Latencies and errors per operation, shared by all the threads."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.latencies = {}
+        self.errors = {}
+
+    def time(self, operation, function, *args):
+        start = time.perf_counter()
+        try:
+            result = function(*args)
+        except Exception:
+            traceback.print_exc()
+            result = error = True
+        else:
+            error = False
+        elapsed = time.perf_counter() - start
+        with self._lock:
+            self.latencies.setdefault(operation, []).append(elapsed)
+            if error:
+                self.errors[operation] = self.errors.get(operation, 0) + 1
+        if error:
+            raise RuntimeError(f"{operation} failed")
+        return result
+
+    def summary(self, wall_time):
+        operations = {}
+        for operation, latencies in self.latencies.items():
+            # 99 cut points: p50, p95 and p99 are the 50th, 95th and 99th.
+            # quantiles needs two samples, a single one is all its percentiles
+            if len(latencies) < 2:
+                cuts = latencies * 99
+            else:
+                cuts = statistics.quantiles(latencies, n=100, method="inclusive")
+            operations[operation] = {
+                "count": len(latencies),
+                "errors": self.errors.get(operation, 0),
+                "throughput": len(latencies) / wall_time,
+                "mean": statistics.fmean(latencies),
+                "p50": cuts[49],
+                "p95": cuts[94],
+                "p99": cuts[98],
+                "max": max(latencies),
+            }
+        return operations
+
+
+def new_session(session_id):
+    """Give the calling thread a fresh session, as a new browser tab would."""
+    ctx = ScriptRunContext(
+        session_id=session_id,
+        _enqueue=lambda msg: None,  # Nothing renders the elements
+        query_string="",
+        session_state=SafeSessionState(SessionState(), lambda: None),
+        uploaded_file_mgr=MemoryUploadedFileManager("/upload"),
+        main_script_path="quiz_app.py",
+        user_info={},
+        fragment_storage=MemoryFragmentStorage(),
+        pages_manager=PagesManager("quiz_app.py"),
+    )
+    add_script_run_ctx(threading.current_thread(), ctx)
+    init_session_state()
+
+
+def popularity(rng, s=1.1):
+    """Per event page, Zipf weights over a shuffled ranking of the athletes."""
+    weights = {}
+    for page in EVENT_PAGES:
+        ranking = rng.sample(athletes, len(athletes))
+        weights[page] = (ranking, [1 / rank**s for rank in range(1, len(ranking) + 1)])
+    return weights
+
+
+def podium(rng, weights):
+    ranking, rank_weights = weights
+    picks = []
+    while len(picks) < 3:
+        athlete = rng.choices(ranking, rank_weights)[0]
+        if athlete not in picks:
+            picks.append(athlete)
+    return {f"place{place}": athlete for place, athlete in enumerate(picks, 1)}
+
+
+def finish():
+    # What "Terminer" does: every page must be saved
+    wait(st.session_state.pending_saves.values())
+    if not check_pending_saves():
+        raise RuntimeError(st.session_state.failed_saves)
+
+
+def play(recorder, user, weights, returning, seed):
+    """One player: login, every page, finish; maybe again changing one page.
+
+    Returns the user name and {(event_category, prediction_type): value}
+    expected in the database, None if an operation failed.
+    """
+    rng = random.Random(seed)
+    user_name = f"PLAYER{user:05d}{user % 10000:04d}"
+    answers = {page: podium(rng, weights[page]) for page in EVENT_PAGES}
+    answers[PAGE_POINTS] = {"points": rng.randint(35000, 65000)}
+    try:
+        for visit in range(2 if rng.random() < returning else 1):
+            new_session(f"{user_name}-{visit}")
+            st.session_state.user_name = user_name
+            recorder.time("login", load_predictions_from_db, user_name)
+            if visit:
+                changed = rng.choice(EVENT_PAGES)
+                answers[changed] = podium(rng, weights[changed])
+            for page in QUIZ_PAGES_FOR_PROGRESS:
+                recorder.time("save_page", save_page_data_to_db, page, answers[page])
+            recorder.time("finish", finish)
+    except RuntimeError:
+        return user_name, None
+
+    expected = {
+        (PAGE_POINTS, PREDICTION_TYPE_POINTS): str(answers[PAGE_POINTS]["points"])
+    }
+    for page in EVENT_PAGES:
+        for place, athlete in answers[page].items():
+            expected[page, f"Place {place[-1]}"] = athlete
+    return user_name, expected
+
+
+def view_results(recorder, url, page_nb, stop, interval):
+    # One cache and tracker for all the viewers, like the results page's
+    # cache_resource ones
+    cache = PageCache(tempfile.mkdtemp(prefix="sra-load-"))
+    tracker = ResultsTracker()
+    while not stop.is_set():
+        try:
+            recorder.time(
+                "results",
+                process_competition,
+                url + "&frmposition={}",
+                page_nb,
+                cache,
+                tracker,
+                load_versioned_snapshot,
+            )
+        except RuntimeError:
+            pass
+        stop.wait(interval)
+
+
+def check_predictions(expected):
+    # Only the players that finished without errors
+    table = QuizPrediction.__table__
+    with Session(get_engine()) as session:
+        rows = session.execute(
+            select(
+                table.c.user_name,
+                table.c.event_category,
+                table.c.prediction_type,
+                table.c.predicted_value,
+            )
+        ).all()
+    stored = {}
+    for user_name, event_category, prediction_type, value in rows:
+        stored.setdefault(user_name, {})[event_category, prediction_type] = value
+    stored = {user_name: stored.get(user_name) for user_name in expected}
+    assert stored == expected, "The database differs from what the players entered"
+    check_counts()
+    return sum(len(values) for values in expected.values())
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--players", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--returning", type=float, default=0.2)
+    parser.add_argument("--viewers", type=int, default=2)
+    parser.add_argument("--viewer-interval", type=float, default=1.0)
+    parser.add_argument("--disciplines", type=int, default=40)
+    parser.add_argument("--pages", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="Write the report as JSON to this file")
+    args = parser.parse_args()
+    use_benchmark_database()  # Before the engine is first used
+
+    upgrade(get_engine())
+    rng = random.Random(args.seed)
+    weights = popularity(rng)
+    recorder = Recorder()
+    stop = threading.Event()
+    database = get_engine().url.render_as_string(hide_password=True)
+    print(
+        f"{database}: {args.players} players, {args.concurrency} at once, "
+        f"{args.viewers} results viewers"
+    )
+
+    meeting = make_meeting(disciplines=args.disciplines, pages=args.pages)
+    with serve_meeting(meeting) as url:
+        viewers = [
+            threading.Thread(
+                target=view_results,
+                args=(recorder, url, args.pages, stop, args.viewer_interval),
+            )
+            for _ in range(args.viewers)
+        ]
+        start = time.perf_counter()
+        for viewer in viewers:
+            viewer.start()
+        with ThreadPoolExecutor(max_workers=args.concurrency) as executor:
+            players = list(
+                executor.map(
+                    lambda user: play(
+                        recorder,
+                        user,
+                        weights,
+                        args.returning,
+                        seed=f"{args.seed}-{user}",
+                    ),
+                    range(args.players),
+                )
+            )
+        stop.set()
+        for viewer in viewers:
+            viewer.join()
+        wall_time = time.perf_counter() - start
+
+    failed = [user_name for user_name, expected in players if expected is None]
+    predictions = check_predictions(
+        {user_name: expected for user_name, expected in players if expected}
+    )
+    report = {
+        "database": database,
+        "environment": {name: os.getenv(name) for name in ENVIRONMENT},
+        "config": vars(args),
+        "wall_time": wall_time,
+        "predictions": predictions,
+        "failed_players": len(failed),
+        "operations": recorder.summary(wall_time),
+    }
+
+    print(f"{'operation':10} {'count':>6} {'errors':>6} {'per s':>7}", end="")
+    print("".join(f"{p:>9}" for p in ("p50 ms", "p95 ms", "p99 ms")))
+    for operation, stats in report["operations"].items():
+        print(
+            f"{operation:10} {stats['count']:6} {stats['errors']:6} "
+            f"{stats['throughput']:7.1f}"
+            + "".join(f"{stats[p] * 1000:9.1f}" for p in ("p50", "p95", "p99"))
+        )
+    print(
+        f"{predictions} predictions checked, {len(failed)} players failed, "
+        f"{wall_time:.1f}s"
+    )
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump(report, file, indent=2)
+
+
+if __name__ == "__main__":
+    main()
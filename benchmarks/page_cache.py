@@ -0,0 +1,64 @@
+"""Time of a "Process results" download + parse with a cold and a warm cache.
+
+python -m benchmarks.page_cache --pages 10 --latency 0.3
+"""
+
+import argparse
+import tempfile
+import time
+
+from athle import fetch_pages, parse_results_pages, parse_total_points
+from benchmarks.fixtures import make_meeting, serve_meeting
+from page_cache import PageCache
+
+
+def process(url, page_nb, cache, max_age=None):
+    start = time.perf_counter()
+    pages = fetch_pages(
+        [url.format(i) for i in range(page_nb)], cache=cache, max_age=max_age
+    )
+    parse_total_points(pages[0], cache=cache)
+    df = parse_results_pages(pages, cache=cache)
+    return time.perf_counter() - start, df
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--pages", type=int, default=10)
+    parser.add_argument("--latency", type=float, default=0.3)
+    parser.add_argument("--disciplines", type=int, default=40)
+    args = parser.parse_args()
+
+    pages = make_meeting(disciplines=args.disciplines, pages=args.pages)
+    with (
+        tempfile.TemporaryDirectory() as directory,
+        serve_meeting(pages, latency=args.latency) as base_url,
+    ):
+        url = base_url + "&frmposition={}"
+        cache = PageCache(directory)
+
+        uncached, expected = process(url, args.pages, None)
+        cold, _ = process(url, args.pages, cache)
+        revalidated, df_revalidated = process(url, args.pages, cache)
+        fresh, df_fresh = process(url, args.pages, cache, max_age=float("inf"))
+        assert df_revalidated.equals(expected) and df_fresh.equals(expected)
+
+        # One page changes: only that page is downloaded and parsed again
+        pages[-1] = make_meeting(
+            disciplines=args.disciplines, pages=args.pages, seed=1
+        )[-1]
+        one_changed, _ = process(url, args.pages, cache)
+
+        # Size cap: shrinking it evicts entries down to the limit
+        cache.max_bytes = 50_000
+        cache.evict()
+
+    print(f"no cache              {uncached:7.3f}s")
+    print(f"cold cache            {cold:7.3f}s")
+    print(f"warm, revalidated     {revalidated:7.3f}s (304 Not Modified)")
+    print(f"warm, no request      {fresh:7.3f}s (max_age)")
+    print(f"warm, 1 page changed  {one_changed:7.3f}s")
+
+
+if __name__ == "__main__":
+    main()
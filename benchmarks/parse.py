@@ -0,0 +1,143 @@
+"""Parsing results pages: pd.read_html vs the streaming lxml parser.
+
+Checks that both give the same table on a synthetic meeting, then compares
+their parse time and peak memory (each parser runs in its own process, the
+peak is its max RSS growth while parsing, read from /proc on Linux). Pages
+are parsed one after the other, so the memory gap grows with the page size:
+
+    python -m benchmarks.parse --disciplines 200 1000 --pages 1
+"""
+
+import argparse
+import io
+import json
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import pandas as pd
+
+from athle import parse_results_pages
+from benchmarks.fixtures import make_meeting
+from results_pipeline import club_performances, iter_blocks
+
+
+def legacy_parse_results_pages(pages):
+    # What parse_results_pages did with pd.read_html
+    df = pd.concat(
+        [
+            pd.read_html(io.BytesIO(html), skiprows=3 if i == 0 else 2)[0]
+            for i, html in enumerate(pages)
+        ],
+        ignore_index=True,
+    )
+    df = df.drop(columns=[0, 3, 5, 7, 8, 9, 10, 11, 12, 13, 15])
+    df.columns = ["Discipline", "Performance", "Athlète", "Club", "Cotation", "Points"]
+    return df
+
+
+def streaming_parse_results_pages(pages):
+    return parse_results_pages(pages, max_workers=1)
+
+
+PARSERS = {
+    "read_html": legacy_parse_results_pages,
+    "lxml": streaming_parse_results_pages,
+}
+
+
+def check(pages):
+    expected = legacy_parse_results_pages(pages)
+    actual = streaming_parse_results_pages(pages)
+    # read_html leaves Points as text ("Finale" headers share the column)
+    expected["Points"] = pd.to_numeric(expected["Points"], errors="coerce").astype(
+        "Int64"
+    )
+    pd.testing.assert_frame_equal(actual, expected, check_dtype=False)
+    pd.testing.assert_frame_equal(
+        club_performances(actual, iter_blocks(actual)),
+        club_performances(expected, iter_blocks(expected)),
+        check_dtype=False,
+    )
+
+
+def _memory_kib(field):
+    with open("/proc/self/status") as status:
+        for line in status:
+            if line.startswith(field + ":"):
+                return int(line.split()[1])
+
+
+def measure(parser, paths, repeat):
+    # Run in a child process so that each parser starts from the same heap
+    PARSERS[parser](make_meeting(disciplines=1, pages=1))  # Lazy imports
+    html = [Path(path).read_bytes() for path in paths]
+    # Reset the RSS high-water mark (Linux) so it only covers the parsing
+    with open("/proc/self/clear_refs", "w") as clear_refs:
+        clear_refs.write("5")
+    before = _memory_kib("VmRSS")
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        PARSERS[parser](html)
+        timings.append(time.perf_counter() - start)
+    return {"seconds": min(timings), "peak_kib": _memory_kib("VmHWM") - before}
+
+
+def run_child(parser, paths, repeat):
+    output = subprocess.run(
+        [
+            sys.executable,
+            "-m",
+            "benchmarks.parse",
+            "--child",
+            parser,
+            "--repeat",
+            str(repeat),
+            *paths,
+        ],
+        check=True,
+        capture_output=True,
+        text=True,
+    ).stdout
+    return json.loads(output)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--disciplines", type=int, nargs="+", default=[200, 1000])
+    parser.add_argument("--pages", type=int, default=1)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--child", choices=PARSERS, help=argparse.SUPPRESS)
+    parser.add_argument("paths", nargs="*", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(measure(args.child, args.paths, args.repeat)))
+        return
+
+    for disciplines in args.disciplines:
+        pages = make_meeting(disciplines=disciplines, pages=args.pages)
+        check(pages)
+        with tempfile.TemporaryDirectory() as directory:
+            paths = []
+            for n, html in enumerate(pages):
+                paths.append(str(Path(directory) / f"{n}.html"))
+                Path(paths[-1]).write_bytes(html)
+            legacy, streaming = (
+                run_child(name, paths, args.repeat) for name in ("read_html", "lxml")
+            )
+        print(
+            f"{disciplines:>4} disciplines: "
+            f"read_html {legacy['seconds'] * 1000:7.1f} ms "
+            f"{legacy['peak_kib'] / 1024:6.1f} MiB, "
+            f"lxml {streaming['seconds'] * 1000:7.1f} ms "
+            f"{streaming['peak_kib'] / 1024:6.1f} MiB "
+            f"(x{legacy['seconds'] / streaming['seconds']:.1f})"
+        )
+
+
+if __name__ == "__main__":
+    main()
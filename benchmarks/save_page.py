@@ -0,0 +1,138 @@
+"""Compare the legacy delete-then-insert page save with the upsert path.
+
+The upsert path also maintains the materialized prediction counts; they are
+checked against a recount from the predictions at the end.
+
+python -m benchmarks.save_page --users 200 --rounds 3
+"""
+
+import argparse
+import random
+import time
+
+from sqlmodel import Session, SQLModel, func, select
+
+from benchmarks import use_benchmark_database
+from constants import athletes
+from models import (
+    CategoryUserCount,
+    PredictionCount,
+    QuizPrediction,
+    get_engine,
+    rebuild_prediction_counts,
+    upsert_predictions,
+)
+
+CATEGORIES = [
+    "LANCERS FEMME",
+    "LANCERS HOMME",
+    "SAUTS FEMME",
+    "SAUTS HOMME",
+    "COURSES FEMME",
+    "COURSES HOMME",
+]
+PLACES = ["Place 1", "Place 2", "Place 3"]
+
+
+def legacy_save(user_name, event_category, values):
+    # The pre-upsert implementation: one DELETE per place, then add_all
+    with Session(get_engine()) as session:
+        for prediction_type in values:
+            session.execute(
+                QuizPrediction.__table__.delete().where(
+                    (QuizPrediction.user_name == user_name)
+                    & (QuizPrediction.event_category == event_category)
+                    & (QuizPrediction.prediction_type == prediction_type)
+                )
+            )
+        session.add_all(
+            [
+                QuizPrediction(
+                    user_name=user_name,
+                    event_category=event_category,
+                    prediction_type=prediction_type,
+                    predicted_value=value,
+                )
+                for prediction_type, value in values.items()
+                if value is not None
+            ]
+        )
+        session.commit()
+
+
+def upsert_save(user_name, event_category, values):
+    with Session(get_engine()) as session:
+        upsert_predictions(session, user_name, event_category, values)
+        session.commit()
+
+
+def make_workload(users, rounds, seed):
+    rng = random.Random(seed)
+    workload = []
+    for _ in range(rounds):
+        for u in range(users):
+            for category in CATEGORIES:
+                picks = rng.sample(athletes, 3)
+                values = dict(zip(PLACES, picks))
+                if rng.random() < 0.1:  # Some players clear a place
+                    values[rng.choice(PLACES)] = None
+                workload.append((f"USER{u:04d}0000", category, values))
+    return workload
+
+
+def run(save, workload):
+    engine = get_engine()
+    SQLModel.metadata.drop_all(engine)
+    SQLModel.metadata.create_all(engine)
+    start = time.perf_counter()
+    for user_name, event_category, values in workload:
+        save(user_name, event_category, values)
+    elapsed = time.perf_counter() - start
+    with Session(get_engine()) as session:
+        rows = session.exec(select(func.count()).select_from(QuizPrediction)).one()
+    return elapsed, rows
+
+
+def read_counts(session):
+    return (
+        set(session.execute(select(PredictionCount.__table__)).all()),
+        set(session.execute(select(CategoryUserCount.__table__)).all()),
+    )
+
+
+def check_counts():
+    with Session(get_engine()) as session:
+        maintained = read_counts(session)
+        rebuild_prediction_counts(session)
+        recounted = read_counts(session)
+        session.rollback()
+    assert maintained == recounted, "Maintained counts differ from a recount"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--users", type=int, default=100)
+    parser.add_argument("--rounds", type=int, default=2)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    use_benchmark_database()  # Before the engine is first used
+
+    workload = make_workload(args.users, args.rounds, args.seed)
+    print(
+        f"{get_engine().url.render_as_string(hide_password=True)}: {len(workload)} page saves"
+    )
+    results = {}
+    for name, save in (("legacy", legacy_save), ("upsert", upsert_save)):
+        elapsed, rows = run(save, workload)
+        results[name] = (elapsed, rows)
+        print(
+            f"{name:>7}: {elapsed:7.3f}s total, "
+            f"{elapsed / len(workload) * 1000:6.3f} ms/save, {rows} rows"
+        )
+    assert results["legacy"][1] == results["upsert"][1], "Paths disagree on row count"
+    check_counts()
+    print(f"speedup: x{results['legacy'][0] / results['upsert'][0]:.2f}")
+
+
+if __name__ == "__main__":
+    main()
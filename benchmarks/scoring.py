@@ -0,0 +1,199 @@
+"""Compare the vectorized scoring engine with the original per-prediction loop.
+
+tests/test_scoring.py checks that both give the same scores.
+
+python -m benchmarks.scoring --users 100 1000 10000
+"""
+
+import argparse
+import random
+import time
+
+import pandas as pd
+
+from constants import athletes
+from scoring import calculate_cote, score_predictions
+
+CATEGORIES = [
+    "LANCERS FEMME",
+    "LANCERS HOMME",
+    "SAUTS FEMME",
+    "SAUTS HOMME",
+    "COURSES FEMME",
+    "COURSES HOMME",
+]
+
+
+def legacy_score(all_db_predictions, podiums, total_points):
+    # The loop formerly inlined in pages/results.py
+    user_scores = {}
+    # --- Pre-calculate Cotes for each athlete in each event place ---
+    athlete_prediction_counts = {}
+    event_place_totals = {}
+    cotes_for_athlete_in_event = {}
+
+    # First loop to populate athlete_prediction_counts and event_place_totals
+    for p_db in all_db_predictions.itertuples(index=False):
+        if "Place " not in p_db.prediction_type:
+            continue
+        event_category = p_db.event_category
+        athlete_name = p_db.predicted_value
+        user_name = p_db.user_name
+        current_athlete_counts = athlete_prediction_counts.get(event_category, {})
+        current_athlete_counts[athlete_name] = (
+            current_athlete_counts.get(athlete_name, 0) + 1
+        )
+        athlete_prediction_counts[event_category] = current_athlete_counts
+        if event_category not in event_place_totals:
+            event_place_totals[event_category] = [user_name]
+        else:
+            event_place_totals[event_category].append(user_name)
+
+    # Calculate cotes based on percentages
+    for (
+        event_place_key,
+        athlete_counts_for_event_place,
+    ) in athlete_prediction_counts.items():
+        total_predictions_for_event_place = event_place_totals.get(event_place_key, 1)
+        total_predictions_for_event_place = len(
+            set(event_place_totals.get(event_place_key, []))
+        )
+        if event_place_key not in cotes_for_athlete_in_event:
+            cotes_for_athlete_in_event[event_place_key] = {}
+
+        for athlete_name, count in athlete_counts_for_event_place.items():
+            percentage = (
+                (count / total_predictions_for_event_place) * 100
+                if total_predictions_for_event_place > 0
+                else 0
+            )
+            cote = calculate_cote(percentage)
+            cotes_for_athlete_in_event[event_place_key][athlete_name] = cote
+    # --- End Pre-calculate Cotes ---
+
+    # Group predictions by user
+    user_predictions = {}
+    for p in all_db_predictions.itertuples(index=False):
+        user_predictions.setdefault(p.user_name, []).append(p)
+
+    for user_name, preds in user_predictions.items():
+        score = 0
+        for pred in preds:
+            # st.write(pred)
+            if "Place " not in pred.prediction_type:
+                distance_from_total_points = (
+                    abs(total_points - int(pred.predicted_value)) // 500
+                )
+                prediction_points = max(10 - distance_from_total_points, 0)
+                score += prediction_points
+                continue
+
+            # CRITICAL: Use actual_podiums_details for scoring, not display podiums
+            actual_event_podium_df = podiums.get(pred.event_category)
+
+            if actual_event_podium_df is not None and not actual_event_podium_df.empty:
+                predicted_place_str = pred.prediction_type.split(" ")[1]
+                if not predicted_place_str.isdigit():
+                    continue
+                predicted_place_index = int(predicted_place_str) - 1
+                predicted_athlete = pred.predicted_value
+
+                cote = cotes_for_athlete_in_event.get(pred.event_category, {}).get(
+                    predicted_athlete, 1
+                )
+
+                if predicted_place_index < len(actual_event_podium_df):
+                    actual_athlete_at_predicted_place = actual_event_podium_df.iloc[
+                        predicted_place_index
+                    ]["Athlète"]
+                    if (
+                        actual_athlete_at_predicted_place.strip().lower()
+                        == predicted_athlete.strip().lower()
+                    ):
+                        score += 3 * cote
+                        continue
+
+                actual_podium_athletes = (
+                    actual_event_podium_df["Athlète"].str.strip().str.lower().tolist()
+                )
+                if predicted_athlete.strip().lower() in actual_podium_athletes:
+                    score += 1 * cote
+
+        user_scores[user_name] = score
+
+    scores_df = pd.DataFrame(
+        list(user_scores.items()), columns=["Utilisateur", "Score"]
+    )
+    return scores_df.sort_values(by="Score", ascending=False)
+
+
+def make_predictions(users, seed):
+    rng = random.Random(seed)
+    # Skewed popularity: a few favourites get most of the votes
+    weights = [1 / (rank + 1) for rank in range(len(athletes))]
+    rows = []
+    for u in range(users):
+        user_name = f"USER{u:05d}1234"
+        for category in CATEGORIES:
+            picks = set()
+            while len(picks) < 3:
+                picks.add(rng.choices(athletes, weights)[0])
+            for place, athlete in enumerate(picks, start=1):
+                if rng.random() < 0.05:  # Free-text "Autre" entries
+                    athlete = f" {athlete.upper()} "
+                rows.append((user_name, category, f"Place {place}", athlete))
+        rows.append(
+            (
+                user_name,
+                "TOTAL DE POINTS EQUIPE 1",
+                "Total Points",
+                str(rng.randint(35000, 65000)),
+            )
+        )
+    return pd.DataFrame(
+        rows,
+        columns=["user_name", "event_category", "prediction_type", "predicted_value"],
+    )
+
+
+def make_podiums(seed):
+    rng = random.Random(seed)
+    podiums = {
+        category: pd.DataFrame({"Athlète": rng.sample(athletes[:20], 3)})
+        for category in CATEGORIES
+    }
+    # Edge cases seen in real meetings: short podiums, an athlete placed twice
+    # (two disciplines of the same family), no results yet
+    podiums["LANCERS FEMME"] = podiums["LANCERS FEMME"].head(2)
+    podiums["SAUTS HOMME"].loc[2, "Athlète"] = podiums["SAUTS HOMME"].loc[0, "Athlète"]
+    podiums["COURSES HOMME"] = podiums["COURSES HOMME"].head(0)
+    return podiums
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--users", type=int, nargs="+", default=[100, 1000, 5000])
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    podiums = make_podiums(args.seed)
+    total_points = 50000
+    for users in args.users:
+        predictions = make_predictions(users, args.seed)
+        timings = {}
+        for name, score in (
+            ("legacy", legacy_score),
+            ("vectorized", score_predictions),
+        ):
+            start = time.perf_counter()
+            score(predictions, podiums, total_points)
+            timings[name] = time.perf_counter() - start
+        print(
+            f"{len(predictions):>8} predictions: legacy {timings['legacy']:8.3f}s, "
+            f"vectorized {timings['vectorized']:8.3f}s "
+            f"(x{timings['legacy'] / timings['vectorized']:.1f})"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+"""Search time and payload of the podium pickers for large rosters.
+
+Each synthetic athlete competes in one quiz category. Queries are the first
+letters of registered names, as typed by players, and a few substrings:
+
+    python -m benchmarks.search --athletes 500 5000 50000
+"""
+
+import argparse
+import json
+import random
+import time
+
+from athlete_search import SEARCH_LIMIT, AthleteSearch
+from benchmarks.fuzzy import synthetic_name
+from benchmarks.scoring import CATEGORIES
+
+
+def make_search(size, rng):
+    names = {}
+    while len(names) < size:
+        names.setdefault(synthetic_name(rng), len(names) + 1)
+    names = {athlete_id: name for name, athlete_id in names.items()}
+    categories = [(athlete_id, rng.choice(CATEGORIES)) for athlete_id in names]
+    return AthleteSearch(names, categories)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--athletes", type=int, nargs="+", default=[500, 5000])
+    parser.add_argument("--queries", type=int, default=2000)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    for size in args.athletes:
+        rng = random.Random(args.seed)
+        start = time.perf_counter()
+        search = make_search(size, rng)
+        built = time.perf_counter() - start
+        queries = []
+        for _ in range(args.queries):
+            name = rng.choice(search.names).lower()
+            if rng.random() < 0.8:  # Start of the last or first name
+                word = rng.choice(name.split())
+                queries.append(word[: rng.randint(1, len(word))])
+            else:
+                i = rng.randrange(len(name) - 3)
+                queries.append(name[i : i + 3])
+        categories = [rng.choice(CATEGORIES) for _ in queries]
+
+        start = time.perf_counter()
+        results = [search.search(q, c) for q, c in zip(queries, categories)]
+        seconds = (time.perf_counter() - start) / len(queries)
+        payload = sum(len(json.dumps(r)) for r in results) / len(results)
+        full = len(json.dumps(search.names))
+        print(
+            f"{size:6} athletes: index built in {built:.2f}s, "
+            f"{seconds * 1e6:6.1f} us/search, {payload:5.0f} bytes of options "
+            f"(top {SEARCH_LIMIT}) instead of {full} for the whole roster"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+"""Cold start of the quiz entry point, as after a redeploy.
+
+Each run is a fresh interpreter started with ``python -X importtime`` that
+imports quiz_app, then checks the schema version twice: the first call is the
+process bootstrap, the second what every later rerun pays. The import must
+not build the engine nor load the heavy libraries the quiz does not use:
+
+    python -m benchmarks.startup --repeat 5 --output startup.json
+
+Prints the median times and the slowest imports under quiz_app (cumulative,
+from the importtime report of the last run).
+"""
+
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+import time
+
+from benchmarks import use_benchmark_database
+from migrate import upgrade
+from models import get_engine
+
+HEAVY_MODULES = ["pandas", "numpy", "plotly.express", "pyarrow"]
+
+PROBE = f"""
+import json, sys, time
+start = time.perf_counter()
+import quiz_app
+imported = time.perf_counter() - start
+from instrumentation import timings
+report = {{
+    "import": imported,
+    "engine_at_import": any(r[1] == "db.create_engine" for r in timings.recent()),
+    "heavy_modules": [m for m in {HEAVY_MODULES!r} if m in sys.modules],
+}}
+for step in ("bootstrap", "rerun_bootstrap"):
+    start = time.perf_counter()
+    quiz_app.check_schema()
+    report[step] = time.perf_counter() - start
+print(json.dumps(report))
+"""
+
+
+def parse_importtime(stderr, parent="quiz_app"):
+    """{module: cumulative seconds} of the direct imports of ``parent``."""
+    # Lines are "import time: self | cumulative | <indent>name", children
+    # come before their parent, two more spaces of indent per level
+    lines = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        _, cumulative, name = line[len("import time:") :].split("|")
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        lines.append((depth, name.strip(), int(cumulative) / 1e6))
+    for index, (depth, name, _) in enumerate(lines):
+        if name == parent:
+            children = {}
+            for child_depth, child, cumulative in reversed(lines[:index]):
+                if child_depth <= depth:
+                    break
+                if child_depth == depth + 1:
+                    children[child] = cumulative
+            return children
+    return {}
+
+
+def run_once():
+    start = time.perf_counter()
+    process = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", PROBE],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    report = json.loads(process.stdout.strip().splitlines()[-1])
+    report["process"] = time.perf_counter() - start
+    return report, parse_importtime(process.stderr)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--top", type=int, default=10)
+    parser.add_argument("--output", help="Write the report as JSON to this file")
+    args = parser.parse_args()
+
+    database = use_benchmark_database()
+    upgrade(get_engine())  # The deploy step, before the app processes start
+    runs = []
+    for _ in range(args.repeat):
+        report, imports = run_once()
+        runs.append(report)
+    medians = {
+        step: statistics.median(run[step] for run in runs)
+        for step in ("process", "import", "bootstrap", "rerun_bootstrap")
+    }
+    slowest = dict(sorted(imports.items(), key=lambda item: -item[1])[: args.top])
+
+    print(f"{database}: {args.repeat} cold starts, medians")
+    for step, seconds in medians.items():
+        print(f"  {step:16} {seconds * 1000:9.1f} ms")
+    print("Slowest imports under quiz_app")
+    for module, seconds in slowest.items():
+        print(f"  {module:16} {seconds * 1000:9.1f} ms")
+    problems = []
+    if any(run["engine_at_import"] for run in runs):
+        problems.append("the engine is built at import")
+    heavy = sorted({module for run in runs for module in run["heavy_modules"]})
+    if heavy:
+        problems.append(f"{', '.join(heavy)} imported by quiz_app")
+    print("; ".join(problems) if problems else "No import-time work found.")
+
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump(
+                {
+                    "database": database,
+                    "config": vars(args),
+                    "medians": medians,
+                    "slowest_imports": slowest,
+                    "problems": problems,
+                    "runs": runs,
+                },
+                file,
+                indent=2,
+            )
+
+
+if __name__ == "__main__":
+    main()
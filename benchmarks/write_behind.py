@@ -0,0 +1,93 @@
+"""Page saves under a burst of players: one commit per save vs write-behind.
+
+Every simulated player saves its pages from its own thread, as concurrent
+Streamlit sessions do. The buffer runs in durable mode, so each save waits
+for its batch to be committed, like a direct save waits for its commit:
+
+    python -m benchmarks.write_behind --users 200 --delay-ms 20
+"""
+
+import argparse
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from sqlalchemy import select
+from sqlmodel import Session, SQLModel
+
+from benchmarks import use_benchmark_database
+from benchmarks.save_page import check_counts, make_workload, upsert_save
+from models import QuizPrediction, get_engine
+from write_behind import WriteBehindBuffer
+
+
+def read_predictions():
+    table = QuizPrediction.__table__
+    with Session(get_engine()) as session:
+        return set(
+            session.execute(
+                select(
+                    table.c.user_name,
+                    table.c.event_category,
+                    table.c.prediction_type,
+                    table.c.predicted_value,
+                )
+            ).all()
+        )
+
+
+def run(save, workload, threads):
+    engine = get_engine()
+    SQLModel.metadata.drop_all(engine)
+    SQLModel.metadata.create_all(engine)
+    # Saves of a player stay in order, players run concurrently
+    by_user = {}
+    for user_name, event_category, values in workload:
+        by_user.setdefault(user_name, []).append((event_category, values))
+
+    def play(user_name):
+        for event_category, values in by_user[user_name]:
+            save(user_name, event_category, values)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        list(executor.map(play, by_user))
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--rounds", type=int, default=1)
+    parser.add_argument("--threads", type=int, default=32)
+    parser.add_argument("--delay-ms", type=float, default=20)
+    parser.add_argument("--max-rows", type=int, default=500)
+    args = parser.parse_args()
+    use_benchmark_database()  # Before the engine is first used
+
+    workload = make_workload(args.users, args.rounds, seed=0)
+    engine = get_engine()
+    print(
+        f"{engine.url.render_as_string(hide_password=True)}: {len(workload)} page "
+        f"saves from {args.threads} concurrent sessions"
+    )
+
+    direct_time = run(upsert_save, workload, args.threads)
+    expected = read_predictions()
+    print(f" direct: {direct_time:7.3f}s, {len(workload)} commits")
+
+    buffer = WriteBehindBuffer(
+        engine, max_delay=args.delay_ms / 1000, max_rows=args.max_rows, durable=True
+    )
+    buffered_time = run(buffer.save, workload, args.threads)
+    buffer.close()
+    assert read_predictions() == expected, "Write-behind saved something else"
+    check_counts()
+    print(
+        f"buffered: {buffered_time:7.3f}s, {buffer.flushes} commits "
+        f"({buffer.flushed_rows / buffer.flushes:.0f} predictions each)"
+    )
+    print(f"speedup: x{direct_time / buffered_time:.2f}")
+
+
+if __name__ == "__main__":
+    main()
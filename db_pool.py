@@ -0,0 +1,149 @@
+"""Connection pool settings and metrics for the database engine.
+
+The pool is sized from the environment so it can be tuned per deployment:
+
+    DB_POOL_SIZE             connections kept open (default 5)
+    DB_MAX_OVERFLOW          extra connections opened under load (default 10)
+    DB_POOL_TIMEOUT          seconds to wait for a free connection (default 30)
+    DB_POOL_RECYCLE          seconds before a connection is replaced (default 1800)
+    DB_POOL_PRE_PING         test connections before use, 0 to disable (default 1)
+    DB_STATEMENT_TIMEOUT_MS  Postgres statement_timeout, 0 for none (default 0)
+
+``MeteredQueuePool`` records how long checkouts wait for a connection, shown
+with the pool state on the admin page.
+"""
+
+import os
+import threading
+import time
+from collections import deque
+
+from sqlalchemy import exc
+from sqlalchemy.engine import make_url
+from sqlalchemy.pool import QueuePool
+
+# Recent checkout waits kept for the percentiles
+WAIT_SAMPLES = 1000
+
+
+def pool_settings():
+    return {
+        "pool_size": int(os.getenv("DB_POOL_SIZE", "5")),
+        "max_overflow": int(os.getenv("DB_MAX_OVERFLOW", "10")),
+        "pool_timeout": float(os.getenv("DB_POOL_TIMEOUT", "30")),
+        "pool_recycle": int(os.getenv("DB_POOL_RECYCLE", "1800")),
+        "pool_pre_ping": os.getenv("DB_POOL_PRE_PING", "1") != "0",
+    }
+
+
+def engine_options(database_url):
+    """Keyword arguments for create_engine from the environment settings."""
+    url = make_url(database_url)
+    options = {}
+    # SQLite in memory uses a single connection per thread, not a queue pool
+    if url.get_dialect().get_pool_class(url) is QueuePool:
+        options.update(pool_settings(), poolclass=MeteredQueuePool)
+    statement_timeout = int(os.getenv("DB_STATEMENT_TIMEOUT_MS", "0"))
+    if statement_timeout and url.get_backend_name() == "postgresql":
+        options["connect_args"] = {
+            "options": f"-c statement_timeout={statement_timeout}"
+        }
+    return options
+
+
+def async_engine_options(database_url):
+    """create_async_engine counterpart of ``engine_options``.
+
+    The async engine keeps SQLAlchemy's own async-adapted pool, so only the
+    sizing settings apply (no checkout metrics).
+    """
+    url = make_url(database_url)
+    options = pool_settings()
+    statement_timeout = int(os.getenv("DB_STATEMENT_TIMEOUT_MS", "0"))
+    if statement_timeout and url.get_backend_name() == "postgresql":
+        options["connect_args"] = {
+            "server_settings": {"statement_timeout": str(statement_timeout)}
+        }
+    return options
+
+
+class PoolMetrics:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.checkouts = 0
+        self.timeouts = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+        self.waits = deque(maxlen=WAIT_SAMPLES)
+
+    def record(self, wait):
+        with self._lock:
+            self.checkouts += 1
+            self.total_wait += wait
+            self.max_wait = max(self.max_wait, wait)
+            self.waits.append(wait)
+
+    def record_timeout(self):
+        with self._lock:
+            self.timeouts += 1
+
+    def snapshot(self):
+        """Checkout counts and waits (in seconds) since the pool was created."""
+        with self._lock:
+            waits = sorted(self.waits)
+            checkouts, timeouts = self.checkouts, self.timeouts
+            total_wait, max_wait = self.total_wait, self.max_wait
+
+        def percentile(q):
+            return waits[min(len(waits) - 1, int(q * len(waits)))] if waits else 0.0
+
+        return {
+            "checkouts": checkouts,
+            "timeouts": timeouts,
+            "mean_wait": total_wait / checkouts if checkouts else 0.0,
+            "p95_wait": percentile(0.95),
+            "max_wait": max_wait,
+        }
+
+
+class MeteredQueuePool(QueuePool):
+    """QueuePool that times how long each checkout waits for a connection.
+
+    The wait includes opening a new connection when the pool has none idle.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.metrics = PoolMetrics()
+
+    def recreate(self):
+        pool = super().recreate()
+        pool.metrics = self.metrics  # Keep the history across a dispose()
+        return pool
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except exc.TimeoutError:
+            self.metrics.record_timeout()
+            raise
+        self.metrics.record(time.perf_counter() - start)
+        return connection
+
+
+def pool_status(engine):
+    """Current pool state and checkout metrics, None for unmetered pools."""
+    pool = engine.pool
+    if not isinstance(pool, MeteredQueuePool):
+        return None
+    return {
+        "size": pool.size(),
+        "checked_out": pool.checkedout(),
+        "checked_in": pool.checkedin(),
+        # Negative until pool_size connections have been opened
+        "overflow": max(pool.overflow(), 0),
+        "max_overflow": pool._max_overflow,
+        "timeout": pool.timeout(),
+        **pool.metrics.snapshot(),
+    }
@@ -0,0 +1,206 @@
+"""Lightweight timing of the hot paths: page sections, database calls, scraping.
+
+    with timed("stats.query"):
+        ...
+
+    @timed("quiz.save_page")
+    def save_page_data_to_db(...):
+
+Every timing goes to a server-wide ring buffer of the last PERF_BUFFER ones,
+shown on the Perf page. Optionally they are also exported:
+
+    PERF_BUFFER           timings kept in memory (default 5000)
+    PERF_JSONL            append every timing to this file, one JSON object a line
+    PERF_PROMETHEUS_PORT  serve the timings in the Prometheus text format on
+                          http://<host>:<port>/metrics
+    PERF_PROMETHEUS_HOST  address the metrics server binds (default 127.0.0.1,
+                          0.0.0.0 for a scraper on another machine)
+
+JSONL lines are written by a background thread holding the file open, the
+timed code only queues them. The metrics server is started once per process
+by get_prometheus_server, which the app's pages call.
+"""
+
+import atexit
+import contextlib
+import json
+import os
+import queue
+import statistics
+import threading
+import time
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import streamlit as st
+
+BUFFER_SIZE = int(os.getenv("PERF_BUFFER", "5000"))
+JSONL_PATH = os.getenv("PERF_JSONL")
+PROMETHEUS_PORT = os.getenv("PERF_PROMETHEUS_PORT")
+PROMETHEUS_HOST = os.getenv("PERF_PROMETHEUS_HOST", "127.0.0.1")
+
+
+class Timings:
+    """Ring buffer of (timestamp, name, seconds, failed), plus running totals."""
+
+    def __init__(self, size=BUFFER_SIZE, jsonl_path=None):
+        self._lock = threading.Lock()
+        self.records = deque(maxlen=size)
+        # name -> [count, total seconds, failures] since the server started,
+        # Prometheus counters must not go down when the buffer wraps
+        self.totals = {}
+        self.jsonl_path = jsonl_path
+        self._lines = None
+        if jsonl_path:
+            self._lines = queue.SimpleQueue()
+            self._writer = threading.Thread(
+                target=self._write_lines, name="perf-jsonl", daemon=True
+            )
+            self._writer.start()
+            atexit.register(self.close)
+
+    def record(self, name, seconds, failed=False):
+        timestamp = time.time()
+        with self._lock:
+            self.records.append((timestamp, name, seconds, failed))
+            totals = self.totals.setdefault(name, [0, 0.0, 0])
+            totals[0] += 1
+            totals[1] += seconds
+            totals[2] += failed
+        if self._lines is not None:
+            self._lines.put((timestamp, name, seconds, failed))
+
+    def _write_lines(self):
+        # One open file for the process, written by this thread only
+        with open(self.jsonl_path, "a") as file:
+            while True:
+                lines = [self._lines.get()]
+                while not self._lines.empty():  # Write what queued up at once
+                    lines.append(self._lines.get())
+                for line in lines:
+                    if line is None:
+                        return
+                    timestamp, name, seconds, failed = line
+                    record = {"ts": timestamp, "name": name, "seconds": seconds}
+                    file.write(json.dumps(record | {"failed": failed}) + "\n")
+                file.flush()
+
+    def close(self):
+        """Write the queued JSONL lines and stop the writer thread."""
+        if self._lines is not None and self._writer.is_alive():
+            self._lines.put(None)
+            self._writer.join()
+
+    def recent(self):
+        with self._lock:
+            return list(self.records)
+
+    def clear(self):
+        with self._lock:
+            self.records.clear()
+
+    def summary(self):
+        """Per name statistics over the buffer, slowest p95 first."""
+        durations = {}
+        failures = {}
+        for _, name, seconds, failed in self.recent():
+            durations.setdefault(name, []).append(seconds)
+            failures[name] = failures.get(name, 0) + failed
+        rows = []
+        for name, values in durations.items():
+            values.sort()
+            rows.append(
+                {
+                    "section": name,
+                    "count": len(values),
+                    "failed": failures[name],
+                    "mean": statistics.fmean(values),
+                    "p50": _quantile(values, 0.5),
+                    "p95": _quantile(values, 0.95),
+                    "max": values[-1],
+                }
+            )
+        return sorted(rows, key=lambda row: row["p95"], reverse=True)
+
+    def prometheus(self):
+        """The timings in the Prometheus text exposition format."""
+        lines = [
+            "# HELP sra_section_seconds Time spent in instrumented sections.",
+            "# TYPE sra_section_seconds summary",
+        ]
+        with self._lock:
+            totals = {name: list(values) for name, values in self.totals.items()}
+        quantiles = {row["section"]: row for row in self.summary()}
+        for name, (count, seconds, _) in sorted(totals.items()):
+            label = f'section="{name}"'
+            if name in quantiles:
+                for quantile, key in (("0.5", "p50"), ("0.95", "p95")):
+                    lines.append(
+                        f'sra_section_seconds{{{label},quantile="{quantile}"}} '
+                        f"{quantiles[name][key]}"
+                    )
+            lines.append(f"sra_section_seconds_sum{{{label}}} {seconds}")
+            lines.append(f"sra_section_seconds_count{{{label}}} {count}")
+        lines += [
+            "# HELP sra_section_failures_total Instrumented sections that raised.",
+            "# TYPE sra_section_failures_total counter",
+        ]
+        for name, (_, _, failed) in sorted(totals.items()):
+            lines.append(f'sra_section_failures_total{{section="{name}"}} {failed}')
+        return "\n".join(lines) + "\n"
+
+
+def _quantile(sorted_values, q):
+    return sorted_values[min(len(sorted_values) - 1, int(q * len(sorted_values)))]
+
+
+timings = Timings(jsonl_path=JSONL_PATH)
+
+
+@contextlib.contextmanager
+def timed(name):
+    """Record how long the block (or the decorated function) takes."""
+    start = time.perf_counter()
+    failed = True
+    try:
+        yield
+        failed = False
+    finally:
+        timings.record(name, time.perf_counter() - start, failed)
+
+
+def serve_prometheus(port, timings=timings, host=PROMETHEUS_HOST):
+    """Serve /metrics from a daemon thread, returns the server."""
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path != "/metrics":
+                self.send_error(404)
+                return
+            body = timings.prometheus().encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, int(port)), Handler)
+    threading.Thread(
+        target=server.serve_forever, name="perf-metrics", daemon=True
+    ).start()
+    return server
+
+
+@st.cache_resource(show_spinner=False)
+def get_prometheus_server():
+    """The /metrics server of PERF_PROMETHEUS_PORT, None when it is not set.
+
+    Cached for the whole server: reloading a page's modules must not bind
+    the port a second time.
+    """
+    if not PROMETHEUS_PORT:
+        return None
+    return serve_prometheus(PROMETHEUS_PORT)
@@ -0,0 +1,137 @@
+"""Live leaderboard: one background poller per server, many viewers.
+
+The poller runs the scrape-and-score pipeline on a schedule and publishes the
+result in memory. Viewer pages only read the latest published ``LiveSnapshot``,
+so the work is done once whatever the number of connected viewers.
+"""
+
+import os
+import threading
+import traceback
+from dataclasses import dataclass, field
+from datetime import UTC, datetime
+
+import pandas as pd
+import streamlit as st
+
+from athle import fetch_pages, parse_results_pages, parse_total_points
+from athletes import load_athlete_index
+from instrumentation import timed
+from page_cache import PageCache
+from queries import fetch_prediction_counts, fetch_predictions, get_predictions_version
+from results_pipeline import ResultsTracker
+
+POLL_INTERVAL = float(os.getenv("LIVE_POLL_INTERVAL", "60"))  # Seconds
+
+
+def process_competition(url, page_nb, cache, tracker, load_predictions, max_age=None):
+    """Download, parse and score a competition into ``tracker``.
+
+    ``url`` has a ``{}`` placeholder for frmposition and ``load_predictions``
+    returns the (version, snapshot) of the predictions. Cotes are derived from
+    the materialized counts, athletes resolved with the registry. Returns the
+    team's total points and the categories whose podium changed.
+    """
+    with timed("results.fetch"):
+        pages = fetch_pages(
+            [url.format(i) for i in range(page_nb)], cache=cache, max_age=max_age
+        )
+    with timed("results.parse"):
+        total_points = parse_total_points(pages[0], cache=cache)
+        df = parse_results_pages(pages, cache=cache)
+    with timed("results.load_predictions"):
+        version, predictions = load_predictions()
+        athletes = load_athlete_index()
+    with timed("results.score"):
+        changed = tracker.update(
+            df, total_points, predictions, version, fetch_prediction_counts, athletes
+        )
+    return total_points, changed
+
+
+@dataclass
+class LiveSnapshot:
+    total_points: int
+    podiums: dict
+    leaderboard: pd.DataFrame
+    changed: set
+    updated_at: datetime = field(default_factory=lambda: datetime.now(UTC))
+
+
+class LivePoller:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread = None
+        self._stopped = True
+        self.url = None
+        self.page_nb = None
+        self.interval = POLL_INTERVAL
+        self.tracker = ResultsTracker()
+        self.cache = PageCache()
+        self.snapshot = None
+        self.error = None
+
+    @property
+    def running(self):
+        return self._thread is not None
+
+    def start(self, url, page_nb, interval=POLL_INTERVAL):
+        """Poll ``url`` (with a ``{}`` frmposition placeholder) every ``interval``."""
+        with self._lock:
+            if url != self.url:
+                self.tracker.reset()
+            self.url, self.page_nb, self.interval = url, page_nb, interval
+            self._stopped = False
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._run, name="live-poller", daemon=True
+                )
+                self._thread.start()
+        self._wake.set()  # Refresh right away with the new settings
+
+    def stop(self):
+        self._stopped = True
+        self._wake.set()
+
+    def _load_predictions(self):
+        # The snapshot is only read again when the table version moved
+        version = get_predictions_version()
+        if version == self.tracker.predictions_version:
+            return version, self.tracker.predictions
+        return version, fetch_predictions()
+
+    def refresh(self):
+        with self._lock:
+            url, page_nb = self.url, self.page_nb
+        total_points, changed = process_competition(
+            url, page_nb, self.cache, self.tracker, self._load_predictions
+        )
+        podiums, _, scores = self.tracker.snapshot()
+        self.snapshot = LiveSnapshot(
+            total_points=total_points,
+            podiums=podiums,
+            leaderboard=scores,
+            changed=changed,
+        )
+        self.error = None
+
+    def _run(self):
+        while True:
+            with self._lock:
+                if self._stopped:
+                    self._thread = None
+                    return
+            self._wake.clear()
+            try:
+                self.refresh()
+            except Exception:
+                # Keep serving the last good snapshot, show what went wrong
+                self.error = traceback.format_exc()
+            self._wake.wait(self.interval)
+
+
+@st.cache_resource
+def get_live_poller():
+    # A single poller for the whole server, whatever the number of sessions
+    return LivePoller()
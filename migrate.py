@@ -0,0 +1,301 @@
+"""Create the database or bring it up to the tables and indexes of models.py.
+
+This is the deploy step: the app itself never runs DDL, it only checks once
+per process that the recorded schema version is at least
+models.SCHEMA_VERSION (see models.check_schema). `SQLModel.metadata.create_all`
+only creates missing tables, so a production table created by an older
+version of the app never gets new columns or indexes. This script adds them in
+place, without dropping data, drops the indexes they made redundant, creates
+the materialized prediction counts and the triggers maintaining them, fills
+the counts when they are missing (or recounts them once duplicated predictions
+are removed), registers the athletes of constants.py, then records the schema
+version:
+
+    python migrate.py --check     # exit with 1 if the schema is out of date
+    python migrate.py --dry-run   # show what would be done
+    python migrate.py
+    python migrate.py --rebuild-counts  # recount from the predictions
+
+On Postgres indexes are built with CREATE INDEX CONCURRENTLY so players can keep
+saving predictions while it runs; one left INVALID by a failed build is dropped
+and built again.
+"""
+
+import argparse
+import sys
+
+from sqlalchemy import MetaData, inspect, text
+from sqlalchemy.schema import CreateIndex
+from sqlmodel import Session, SQLModel
+
+from athletes import link_predictions, register_athletes
+from constants import athletes
+from models import (
+    SCHEMA_VERSION,
+    CategoryUserCount,
+    PagePredictionCount,
+    PredictionCount,
+    QuizPrediction,
+    SchemaVersion,
+    get_engine,
+    get_schema_version,
+    rebuild_prediction_counts,
+)
+
+COUNT_TABLES = [
+    PredictionCount.__table__,
+    PagePredictionCount.__table__,
+    CategoryUserCount.__table__,
+]
+
+
+# Rows sharing a (user, category, type) key would make the unique index fail.
+# They can only come from the old delete-then-insert saves; keep the latest one.
+DEDUPLICATE_SQL = """
+DELETE FROM quizprediction
+WHERE id NOT IN (
+    SELECT max(id) FROM quizprediction
+    GROUP BY user_name, event_category, prediction_type
+)
+"""
+
+
+# Indexes of older versions: user_name leads uq_quizprediction_user_category_type,
+# and stats and cotes read the counts tables instead of grouping the predictions
+OBSOLETE_INDEXES = ["ix_quizprediction_user_name", "ix_quizprediction_category_value"]
+
+
+def invalid_indexes(bind):
+    """Names of the QuizPrediction indexes Postgres marks INVALID.
+
+    A CREATE INDEX CONCURRENTLY that fails (on duplicates, or interrupted)
+    leaves its index behind, unused by queries and unenforced.
+    """
+    if bind.dialect.name != "postgresql":
+        return set()
+    with bind.connect() as connection:
+        return set(
+            connection.execute(
+                text(
+                    "SELECT c.relname FROM pg_index i "
+                    "JOIN pg_class c ON c.oid = i.indexrelid "
+                    "WHERE i.indrelid = to_regclass(:table) AND NOT i.indisvalid"
+                ),
+                {"table": QuizPrediction.__tablename__},
+            ).scalars()
+        )
+
+
+def missing_indexes(bind):
+    """The indexes to create: absent from the table, or left invalid."""
+    table = QuizPrediction.__table__
+    inspector = inspect(bind)
+    if not inspector.has_table(table.name):
+        return []
+    existing = {index["name"] for index in inspector.get_indexes(table.name)}
+    existing |= {
+        constraint["name"]
+        for constraint in inspector.get_unique_constraints(table.name)
+    }
+    existing -= invalid_indexes(bind)
+    return [index for index in table.indexes if index.name not in existing]
+
+
+def concurrent_copy(index):
+    # The same index on a copy of its table, built CONCURRENTLY. The model's
+    # Index is left alone: create_all and the archive import create it inside
+    # a transaction, where CONCURRENTLY is an error.
+    table = index.table.to_metadata(MetaData())
+    copy = next(i for i in table.indexes if i.name == index.name)
+    copy.dialect_options["postgresql"]["concurrently"] = True
+    return copy
+
+
+def missing_columns(bind):
+    # Columns added to QuizPrediction after its table was created
+    table = QuizPrediction.__table__
+    inspector = inspect(bind)
+    if not inspector.has_table(table.name):
+        return []
+    existing = {column["name"] for column in inspector.get_columns(table.name)}
+    return [column for column in table.columns if column.name not in existing]
+
+
+def add_columns(bind, dry_run=False):
+    for column in missing_columns(bind):
+        ddl = (
+            f"ALTER TABLE {column.table.name} ADD COLUMN {column.name} "
+            f"{column.type.compile(bind.dialect)}"
+        )
+        for foreign_key in column.foreign_keys:
+            ddl += (
+                f" REFERENCES {foreign_key.column.table.name} "
+                f"({foreign_key.column.name})"
+            )
+        if dry_run:
+            print(f"Would run: {ddl}")
+            continue
+        print(f"Adding column {column.table.name}.{column.name}...")
+        with bind.begin() as connection:
+            connection.execute(text(ddl))
+
+
+def migrate_athletes(bind, dry_run=False):
+    # Seed the registry and link the predictions saved before it existed
+    if dry_run:
+        print("Would register the athletes of constants.py and link predictions.")
+        return
+    with Session(bind) as session:
+        added = register_athletes(session, athletes)
+        linked = link_predictions(session)
+        session.commit()
+    print(f"Registered {added} athlete(s), linked {linked} predicted value(s).")
+
+
+def missing_count_tables(bind):
+    inspector = inspect(bind)
+    if not inspector.has_table(QuizPrediction.__tablename__):
+        return []  # A new database, there is nothing to count
+    return [table for table in COUNT_TABLES if not inspector.has_table(table.name)]
+
+
+def migrate_counts(bind, dry_run=False):
+    if dry_run:
+        print("Would rebuild the prediction counts.")
+        return
+    with Session(bind) as session:
+        rebuild_prediction_counts(session)
+        session.commit()
+    print("Rebuilt the prediction counts.")
+
+
+def migrate(bind, dry_run=False):
+    """Create the missing indexes, returns how many duplicates were removed."""
+    indexes = missing_indexes(bind)
+    if not indexes:
+        print("Indexes up to date, nothing to do.")
+        return 0
+
+    is_postgres = bind.dialect.name == "postgresql"
+    # CONCURRENTLY cannot run inside a transaction block
+    options = {"isolation_level": "AUTOCOMMIT"} if is_postgres else {}
+
+    invalid = invalid_indexes(bind)
+    removed = 0
+    with bind.connect().execution_options(**options) as connection:
+        if any(index.unique for index in indexes):
+            if dry_run:
+                print("Would remove duplicated predictions before the unique index.")
+            else:
+                removed = connection.execute(text(DEDUPLICATE_SQL)).rowcount
+                print(f"Removed {removed} duplicated prediction(s).")
+
+        for index in indexes:
+            if index.name in invalid:
+                # IF NOT EXISTS would keep the invalid index, build it again
+                drop = f"DROP INDEX CONCURRENTLY IF EXISTS {index.name}"
+                if dry_run:
+                    print(f"Would run: {drop}")
+                else:
+                    print(f"Dropping invalid index {index.name}...")
+                    connection.execute(text(drop))
+            if is_postgres:
+                index = concurrent_copy(index)
+            ddl = CreateIndex(index, if_not_exists=True)
+            if dry_run:
+                print(f"Would run: {ddl.compile(bind=bind)}")
+            else:
+                print(f"Creating index {index.name}...")
+                connection.execute(ddl)
+
+        if not is_postgres and not dry_run:
+            connection.commit()
+    return removed
+
+
+def drop_obsolete_indexes(bind, dry_run=False):
+    inspector = inspect(bind)
+    if not inspector.has_table(QuizPrediction.__tablename__):
+        return
+    existing = {
+        index["name"] for index in inspector.get_indexes(QuizPrediction.__tablename__)
+    }
+    obsolete = [name for name in OBSOLETE_INDEXES if name in existing]
+    if not obsolete:
+        return
+
+    is_postgres = bind.dialect.name == "postgresql"
+    options = {"isolation_level": "AUTOCOMMIT"} if is_postgres else {}
+    with bind.connect().execution_options(**options) as connection:
+        for name in obsolete:
+            concurrently = "CONCURRENTLY " if is_postgres else ""
+            ddl = f"DROP INDEX {concurrently}IF EXISTS {name}"
+            if dry_run:
+                print(f"Would run: {ddl}")
+            else:
+                print(f"Dropping index {name}...")
+                connection.execute(text(ddl))
+        if not is_postgres and not dry_run:
+            connection.commit()
+
+
+def upgrade(bind, dry_run=False, rebuild_counts=False):
+    """Create or upgrade the schema to models.SCHEMA_VERSION and record it."""
+    version = get_schema_version(bind)
+    if version is not None and version > SCHEMA_VERSION:
+        raise RuntimeError(
+            f"The database is at schema version {version}, newer than this "
+            f"code's {SCHEMA_VERSION}."
+        )
+    # Checked before create_all makes them, empty
+    missing_counts = missing_count_tables(bind)
+    if dry_run:
+        print("Would create the missing tables.")
+    else:
+        # A new database gets everything here, an existing one the new tables
+        SQLModel.metadata.create_all(bind)
+    add_columns(bind, dry_run=dry_run)
+    removed = migrate(bind, dry_run=dry_run)
+    drop_obsolete_indexes(bind, dry_run=dry_run)  # Once their replacements exist
+    # After the duplicates are removed, or they would be counted
+    if rebuild_counts or missing_counts or removed:
+        migrate_counts(bind, dry_run=dry_run)
+    migrate_athletes(bind, dry_run=dry_run)
+    if dry_run:
+        print(f"Would record schema version {SCHEMA_VERSION}.")
+        return
+    if version != SCHEMA_VERSION:
+        with Session(bind) as session:
+            session.add(SchemaVersion(version=SCHEMA_VERSION))
+            session.commit()
+    print(f"Schema at version {SCHEMA_VERSION} (was {version}).")
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Create or upgrade the database schema."
+    )
+    parser.add_argument(
+        "--dry-run", action="store_true", help="Print the DDL without running it."
+    )
+    parser.add_argument(
+        "--rebuild-counts",
+        action="store_true",
+        help="Recompute the prediction counts even if their tables exist.",
+    )
+    parser.add_argument(
+        "--check",
+        action="store_true",
+        help="Only compare the recorded schema version with the code's.",
+    )
+    args = parser.parse_args()
+    engine = get_engine()
+    if args.check:
+        version = get_schema_version(engine)
+        print(f"Database schema version {version}, code version {SCHEMA_VERSION}.")
+        sys.exit(0 if version is not None and version >= SCHEMA_VERSION else 1)
+    upgrade(engine, dry_run=args.dry_run, rebuild_counts=args.rebuild_counts)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,15 +1,31 @@
-from typing import Optional
-from datetime import datetime, UTC
-
-from sqlmodel import Field, SQLModel, create_engine
-from dotenv import find_dotenv, load_dotenv
+import functools
 import os
+import re
+import unicodedata
+from datetime import UTC, datetime
+
 import streamlit as st  # Import Streamlit
+from dotenv import find_dotenv, load_dotenv
+from sqlalchemy import (
+    Index,
+    Sequence,
+    bindparam,
+    event,
+    func,
+    select,
+    text,
+    tuple_,
+)
+from sqlalchemy.exc import OperationalError, ProgrammingError
+from sqlalchemy.orm import Session as OrmSession
+from sqlmodel import Field, Session, SQLModel, create_engine
 
+from db_pool import engine_options
+from instrumentation import timed
+from query_profiler import install_profiler
 
-# --- Caching the engine ---
-@st.cache_resource  # Use st.cache_resource for non-data objects like connections
-def get_engine():
+
+def database_url():
     load_dotenv(find_dotenv())
     username = os.getenv("DATABASE_USERNAME")
     password = os.getenv("DATABASE_PASSWORD")
@@ -28,38 +44,502 @@ def get_engine():
         DATABASE_URL = (
             f"postgresql+psycopg2://{username}:{password}@{host}:{port}/{database}"
         )
-
-    print("Creating database engine...")  # For debugging
-    return create_engine(DATABASE_URL)
+    return DATABASE_URL
 
 
-engine = get_engine()
+# --- Caching the engine ---
+# Built on first use rather than at import, so importing the models (and the
+# quiz's first render) does not wait for the database driver and pool
+@st.cache_resource  # Use st.cache_resource for non-data objects like connections
+def get_engine():
+    DATABASE_URL = database_url()
+    # Pool size, recycling, pre-ping and statement timeout, see db_pool.py
+    with timed("db.create_engine"):
+        engine = create_engine(DATABASE_URL, **engine_options(DATABASE_URL))
+    # Statement log and budgets with QUERY_PROFILER=1, see query_profiler.py
+    return install_profiler(engine)
 
 
 # --- Model Definition ---
 class QuizPrediction(SQLModel, table=True):
-    __table_args__ = {"extend_existing": True}
+    # Indexes follow the hot queries. On Postgres the INCLUDE columns make them
+    # covering, so these queries can be answered with index-only scans.
+    __table_args__ = (
+        # Page saves upsert on this key; login loads filter on its prefix
+        Index(
+            "uq_quizprediction_user_category_type",
+            "user_name",
+            "event_category",
+            "prediction_type",
+            unique=True,
+            postgresql_include=["predicted_value"],
+        ),
+        {"extend_existing": True},
+    )
 
-    id: Optional[int] = Field(default=None, primary_key=True)
-    user_name: str = Field(index=True)
+    id: int | None = Field(default=None, primary_key=True)
+    user_name: str  # Leading column of uq_quizprediction_user_category_type
     event_category: str  # e.g., "Lancer Homme", "Points du Jour"
     prediction_type: str  # e.g., "Place 1", "Place 2", "Total Points"
     predicted_value: str  # Athlete's name or points value
+    # The registered athlete the value names, None for points and unknown names
+    athlete_id: int | None = Field(default=None, foreign_key="athlete.id")
     submission_timestamp: datetime = Field(
         default_factory=lambda: datetime.now(UTC), nullable=False
     )
 
 
-# --- Table Creation ---
-_tables_created = False
+# --- Athlete registry ---
+# Names are matched on their key (see athlete_key): every athlete has an alias
+# for its own key, other spellings are extra aliases. See athletes.py.
+def athlete_key(name: str) -> str:
+    return " ".join(name.split()).lower()
+
+
+NOT_ALPHANUMERIC = re.compile(r"[^0-9a-z]+")
+
+
+def fold_name(name: str) -> str:
+    """Lowercase ASCII words of ``name``: "Élodie  ADAINE-JEAN" -> "elodie adaine jean"."""
+    decomposed = unicodedata.normalize("NFKD", name)
+    ascii_name = "".join(c for c in decomposed if not unicodedata.combining(c))
+    return " ".join(NOT_ALPHANUMERIC.sub(" ", ascii_name.lower()).split())
+
+
+class Athlete(SQLModel, table=True):
+    id: int | None = Field(default=None, primary_key=True)
+    name: str  # Canonical spelling, e.g. "COLLET Travis"
+    key: str = Field(unique=True)
+
+
+class AthleteAlias(SQLModel, table=True):
+    key: str = Field(primary_key=True)
+    athlete_id: int = Field(foreign_key="athlete.id", index=True)
+
+
+class AthleteCategory(SQLModel, table=True):
+    # Quiz categories ("LANCERS FEMME", ...) an athlete was seen competing in
+    athlete_id: int = Field(foreign_key="athlete.id", primary_key=True)
+    event_category: str = Field(primary_key=True)
+
+
+# --- Materialized aggregates ---
+# Cotes only depend on how many players named each value in a category, so
+# these counts are kept up to date by triggers on quizprediction (see
+# COUNT_TRIGGERS), in the same transaction as the predictions, instead of being
+# recounted on every read.
+class PredictionCount(SQLModel, table=True):
+    event_category: str = Field(primary_key=True)
+    predicted_value: str = Field(primary_key=True)
+    count: int
+
+
+class CategoryUserCount(SQLModel, table=True):
+    # Distinct users with at least one prediction in the category
+    event_category: str = Field(primary_key=True)
+    users: int
+
+
+class PagePredictionCount(SQLModel, table=True):
+    # Predictions of a user in a category: the user counts in CategoryUserCount
+    # while it is above 0
+    user_name: str = Field(primary_key=True)
+    event_category: str = Field(primary_key=True)
+    count: int
+
+
+# The triggers see the exact rows a statement added and removed (an update
+# does both), under the row locks of the write: concurrent saves cannot both
+# count the same change. A user joins a category when its page count leaves 0,
+# and leaves it when the count gets back to 0.
+_SQLITE_ADD_ROW = """
+    INSERT INTO predictioncount (event_category, predicted_value, count)
+    VALUES ({row}.event_category, {row}.predicted_value, 1)
+    ON CONFLICT (event_category, predicted_value) DO UPDATE SET count = count + 1;
+    INSERT INTO pagepredictioncount (user_name, event_category, count)
+    VALUES ({row}.user_name, {row}.event_category, 1)
+    ON CONFLICT (user_name, event_category) DO UPDATE SET count = count + 1;
+    INSERT INTO categoryusercount (event_category, users)
+    SELECT {row}.event_category, 1 WHERE (
+        SELECT count FROM pagepredictioncount
+        WHERE user_name = {row}.user_name AND event_category = {row}.event_category
+    ) = 1
+    ON CONFLICT (event_category) DO UPDATE SET users = users + 1;
+"""
+
+_SQLITE_REMOVE_ROW = """
+    UPDATE predictioncount SET count = count - 1
+    WHERE event_category = {row}.event_category
+    AND predicted_value = {row}.predicted_value;
+    DELETE FROM predictioncount
+    WHERE event_category = {row}.event_category
+    AND predicted_value = {row}.predicted_value AND count <= 0;
+    UPDATE pagepredictioncount SET count = count - 1
+    WHERE user_name = {row}.user_name AND event_category = {row}.event_category;
+    UPDATE categoryusercount SET users = users - 1
+    WHERE event_category = {row}.event_category AND EXISTS (
+        SELECT 1 FROM pagepredictioncount
+        WHERE user_name = {row}.user_name AND event_category = {row}.event_category
+        AND count <= 0
+    );
+    DELETE FROM pagepredictioncount
+    WHERE user_name = {row}.user_name AND event_category = {row}.event_category
+    AND count <= 0;
+    DELETE FROM categoryusercount
+    WHERE event_category = {row}.event_category AND users <= 0;
+"""
+
+_SQLITE_TRIGGERS = [
+    f"""CREATE TRIGGER quizprediction_counts_insert AFTER INSERT ON quizprediction
+    BEGIN {_SQLITE_ADD_ROW.format(row="NEW")} END""",
+    f"""CREATE TRIGGER quizprediction_counts_update
+    AFTER UPDATE OF user_name, event_category, predicted_value ON quizprediction
+    WHEN OLD.user_name IS NOT NEW.user_name
+    OR OLD.event_category IS NOT NEW.event_category
+    OR OLD.predicted_value IS NOT NEW.predicted_value
+    BEGIN
+    {_SQLITE_REMOVE_ROW.format(row="OLD")}
+    {_SQLITE_ADD_ROW.format(row="NEW")}
+    END""",
+    f"""CREATE TRIGGER quizprediction_counts_delete AFTER DELETE ON quizprediction
+    BEGIN {_SQLITE_REMOVE_ROW.format(row="OLD")} END""",
+]
+
+# Postgres: once per statement, over its transition tables. Rows are applied
+# in key order so that concurrent writers lock the counts in the same order.
+_POSTGRES_APPLY_CHANGES = """
+    WITH changes AS ({changes}),
+    deltas AS (
+        SELECT event_category, predicted_value, sum(delta) AS delta FROM changes
+        GROUP BY event_category, predicted_value HAVING sum(delta) <> 0
+    )
+    INSERT INTO predictioncount AS c (event_category, predicted_value, count)
+    SELECT event_category, predicted_value, delta FROM deltas
+    ORDER BY event_category, predicted_value
+    ON CONFLICT (event_category, predicted_value)
+    DO UPDATE SET count = c.count + excluded.count;
+
+    WITH changes AS ({changes}),
+    deltas AS (
+        SELECT user_name, event_category, sum(delta) AS delta FROM changes
+        GROUP BY user_name, event_category HAVING sum(delta) <> 0
+    ),
+    pages AS (
+        INSERT INTO pagepredictioncount AS p (user_name, event_category, count)
+        SELECT user_name, event_category, delta FROM deltas
+        ORDER BY user_name, event_category
+        ON CONFLICT (user_name, event_category)
+        DO UPDATE SET count = p.count + excluded.count
+        RETURNING p.user_name, p.event_category, p.count
+    ),
+    users AS (
+        SELECT pages.event_category, sum(
+            CASE
+                WHEN pages.count > 0 AND pages.count - deltas.delta <= 0 THEN 1
+                WHEN pages.count <= 0 AND pages.count - deltas.delta > 0 THEN -1
+                ELSE 0
+            END
+        ) AS delta
+        FROM pages JOIN deltas USING (user_name, event_category)
+        GROUP BY pages.event_category
+    )
+    INSERT INTO categoryusercount AS u (event_category, users)
+    SELECT event_category, delta FROM users WHERE delta <> 0
+    ORDER BY event_category
+    ON CONFLICT (event_category) DO UPDATE SET users = u.users + excluded.users;
+
+    DELETE FROM predictioncount WHERE count <= 0
+    AND (event_category, predicted_value) IN (
+        SELECT event_category, predicted_value FROM ({changes}) changes
+    );
+    DELETE FROM pagepredictioncount WHERE count <= 0
+    AND (user_name, event_category) IN (
+        SELECT user_name, event_category FROM ({changes}) changes
+    );
+    DELETE FROM categoryusercount WHERE users <= 0;
+"""
+
+_POSTGRES_ROWS = (
+    "SELECT user_name, event_category, predicted_value, {delta} AS delta FROM {rows}"
+)
+
+
+def _postgres_trigger(operation, transition_tables, changes):
+    name = f"quizprediction_counts_{operation.lower()}"
+    return [
+        f"""CREATE OR REPLACE FUNCTION {name}() RETURNS trigger
+        LANGUAGE plpgsql AS $$
+        BEGIN
+            {_POSTGRES_APPLY_CHANGES.format(changes=changes)}
+            RETURN NULL;
+        END $$""",
+        f"DROP TRIGGER IF EXISTS {name} ON quizprediction",
+        f"""CREATE TRIGGER {name} AFTER {operation} ON quizprediction
+        REFERENCING {transition_tables}
+        FOR EACH STATEMENT EXECUTE FUNCTION {name}()""",
+    ]
+
+
+_POSTGRES_TRIGGERS = [
+    *_postgres_trigger(
+        "INSERT",
+        "NEW TABLE AS new_rows",
+        _POSTGRES_ROWS.format(delta=1, rows="new_rows"),
+    ),
+    *_postgres_trigger(
+        "UPDATE",
+        "OLD TABLE AS old_rows NEW TABLE AS new_rows",
+        _POSTGRES_ROWS.format(delta=1, rows="new_rows")
+        + " UNION ALL "
+        + _POSTGRES_ROWS.format(delta=-1, rows="old_rows"),
+    ),
+    *_postgres_trigger(
+        "DELETE",
+        "OLD TABLE AS old_rows",
+        _POSTGRES_ROWS.format(delta=-1, rows="old_rows"),
+    ),
+]
+
+COUNT_TRIGGERS = {
+    "sqlite": [
+        statement
+        for trigger in _SQLITE_TRIGGERS
+        for statement in [f"DROP TRIGGER IF EXISTS {trigger.split()[2]}", trigger]
+    ],
+    "postgresql": _POSTGRES_TRIGGERS,
+}
+
+
+@event.listens_for(SQLModel.metadata, "after_create")
+def install_count_triggers(target, connection, **kw):
+    """(Re)create the triggers maintaining the counts, after create_all."""
+    for statement in COUNT_TRIGGERS[connection.dialect.name]:
+        connection.execute(text(statement))
+
+
+# The key of the caches built from the predictions, moved by every write to
+# them (see bump_predictions_revision). SQLite keeps it in a single row, on
+# Postgres it is a sequence advanced once the write committed.
+class PredictionRevision(SQLModel, table=True):
+    id: int = Field(default=1, primary_key=True)
+    revision: int = 0
 
 
-def create_db_and_tables_once():
-    global _tables_created
-    if not _tables_created:
-        print("Attempting to create database tables...")  # For debugging
-        SQLModel.metadata.create_all(engine)
-        _tables_created = True
-        print("Database tables created or verified.")
+PREDICTIONS_REVISION = Sequence("predictions_revision", metadata=SQLModel.metadata)
+
+
+# --- Schema version ---
+# Bump with every change to the tables: migrate.py brings a database up to the
+# models and records the version, the app only checks it
+SCHEMA_VERSION = 7
+
+
+class SchemaVersion(SQLModel, table=True):
+    version: int = Field(primary_key=True)
+    applied_at: datetime = Field(
+        default_factory=lambda: datetime.now(UTC), nullable=False
+    )
+
+
+# --- Writes ---
+def _dialect_insert(session: Session):
+    # INSERT ... ON CONFLICT is dialect specific in SQLAlchemy
+    dialect = session.get_bind().dialect.name
+    if dialect == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    elif dialect == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert
     else:
-        print("Database tables already managed, create_all not called again.")
+        raise NotImplementedError(f"Upserts are not supported on {dialect}.")
+    return insert
+
+
+def bump_predictions_revision(session: Session):
+    """Mark the predictions as changed, when the session commits.
+
+    Readers only see the new revision once the writes it covers are visible.
+    SQLite has one writer at a time: the revision row is bumped in the
+    transaction. On Postgres that row would hold every concurrent save until
+    the commit, the sequence is advanced after it instead (nextval takes no
+    lock writers wait on), see _advance_predictions_revision.
+    """
+    if session.get_bind().dialect.name == "postgresql":
+        session.info["predictions_changed"] = True
+        return
+    table = PredictionRevision.__table__
+    stmt = _dialect_insert(session)(table).values(id=1, revision=1)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=["id"], set_={"revision": table.c.revision + 1}
+    )
+    session.execute(stmt)
+
+
+@event.listens_for(OrmSession, "after_commit")
+def _advance_predictions_revision(session):
+    # A crash right before this leaves the caches stale until the next write
+    if session.info.pop("predictions_changed", False):
+        with session.get_bind().engine.connect() as connection:
+            connection.execute(select(PREDICTIONS_REVISION.next_value()))
+            connection.commit()
+
+
+@event.listens_for(OrmSession, "after_transaction_end")
+def _forget_predictions_changes(session, transaction):
+    if transaction.parent is None:  # Rolled back, or already advanced
+        session.info.pop("predictions_changed", None)
+
+
+def upsert_predictions(
+    session: Session,
+    user_name: str,
+    event_category: str,
+    values: dict[str, str | None],
+):
+    """Write the predictions of one page for a user.
+
+    ``values`` maps each prediction type of the page to its new value, ``None``
+    meaning the prediction was cleared. See upsert_many_predictions.
+    """
+    upsert_many_predictions(session, {(user_name, event_category): values})
+
+
+def upsert_many_predictions(
+    session: Session, pages: dict[tuple[str, str], dict[str, str | None]]
+):
+    """Write pages of predictions, of one or many users, in a single statement.
+
+    ``pages`` maps (user_name, event_category) to the page's ``values``, as for
+    upsert_predictions. Set values are written by one INSERT ... ON CONFLICT DO
+    UPDATE, executed for all the rows at once and compiled once per process;
+    only pages that clear a place also run a DELETE. Nothing is read first: the
+    triggers update the materialized counts from the rows actually written.
+    The predictions revision is bumped.
+    """
+    table = QuizPrediction.__table__
+    now = datetime.now(UTC)
+    cleared = []
+    rows = []
+    # In key order, so that concurrent writers lock the rows in the same order
+    for (user_name, event_category), values in sorted(pages.items()):
+        for ptype, value in sorted(values.items()):
+            if value is None:
+                cleared.append((user_name, event_category, ptype))
+                continue
+            rows.append(
+                {
+                    "user_name": user_name,
+                    "event_category": event_category,
+                    "prediction_type": ptype,
+                    "predicted_value": value,
+                    "athlete_key": athlete_key(value),
+                    "submission_timestamp": now,
+                }
+            )
+
+    if cleared:
+        session.execute(
+            table.delete().where(
+                tuple_(
+                    table.c.user_name, table.c.event_category, table.c.prediction_type
+                ).in_(cleared)
+            )
+        )
+    if rows:
+        session.execute(_upsert_statement(_dialect_insert(session)), rows)
+
+    bump_predictions_revision(session)
+
+
+@functools.cache
+def _upsert_statement(insert):
+    # Built once: the statement's cache key is then stable, so SQLAlchemy
+    # compiles it once and every save only binds its rows
+    table = QuizPrediction.__table__
+    aliases = AthleteAlias.__table__
+    stmt = insert(table).values(
+        # The athlete is looked up in the same statement, by key
+        athlete_id=select(aliases.c.athlete_id)
+        .where(aliases.c.key == bindparam("athlete_key"))
+        .scalar_subquery()
+    )
+    return stmt.on_conflict_do_update(
+        index_elements=["user_name", "event_category", "prediction_type"],
+        set_={
+            "predicted_value": stmt.excluded.predicted_value,
+            "athlete_id": stmt.excluded.athlete_id,
+            "submission_timestamp": stmt.excluded.submission_timestamp,
+        },
+    )
+
+
+def rebuild_prediction_counts(session: Session):
+    """Recompute the materialized counts from the predictions table."""
+    if session.get_bind().dialect.name == "postgresql":
+        # Hold page saves until the recount commits, their deltas would be lost
+        session.execute(text("LOCK TABLE quizprediction IN SHARE MODE"))
+    table = QuizPrediction.__table__
+    counts = PredictionCount.__table__
+    pages = PagePredictionCount.__table__
+    users = CategoryUserCount.__table__
+    session.execute(counts.delete())
+    session.execute(pages.delete())
+    session.execute(users.delete())
+    session.execute(
+        counts.insert().from_select(
+            ["event_category", "predicted_value", "count"],
+            select(
+                table.c.event_category, table.c.predicted_value, func.count()
+            ).group_by(table.c.event_category, table.c.predicted_value),
+        )
+    )
+    session.execute(
+        pages.insert().from_select(
+            ["user_name", "event_category", "count"],
+            select(table.c.user_name, table.c.event_category, func.count()).group_by(
+                table.c.user_name, table.c.event_category
+            ),
+        )
+    )
+    session.execute(
+        users.insert().from_select(
+            ["event_category", "users"],
+            select(pages.c.event_category, func.count()).group_by(
+                pages.c.event_category
+            ),
+        )
+    )
+    bump_predictions_revision(session)
+
+
+# --- Schema check ---
+class SchemaOutOfDate(RuntimeError):
+    pass
+
+
+def get_schema_version(bind):
+    """The latest version recorded by migrate.py, None if it never ran."""
+    try:
+        with bind.connect() as connection:
+            return connection.execute(select(func.max(SchemaVersion.version))).scalar()
+    except (OperationalError, ProgrammingError):
+        return None  # No schemaversion table
+
+
+# Cached for the whole process (all sessions, reruns and hot reloads): one
+# SELECT at startup, no DDL nor catalog queries while serving players
+@st.cache_resource(show_spinner=False)
+def check_schema():
+    engine = get_engine()
+    version = get_schema_version(engine)
+    if version is not None and version >= SCHEMA_VERSION:
+        return version  # Newer is fine, e.g. during a rolling deploy
+    if os.getenv("DB_AUTO_MIGRATE", "0") != "0":
+        # Local databases: migrate at startup instead of a deploy step
+        from migrate import upgrade
+
+        upgrade(engine)
+        return SCHEMA_VERSION
+    raise SchemaOutOfDate(
+        f"The database schema is at version {version}, this app needs version "
+        f"{SCHEMA_VERSION}. Run `python migrate.py` first."
+    )
@@ -0,0 +1,154 @@
+"""Persistent cache of athle.fr pages and of the DataFrames parsed from them.
+
+Pages are stored by URL (competition URL + frmposition) with the validators
+needed for a conditional refresh (ETag, Last-Modified). Parsed DataFrames are
+stored by the SHA-256 of the page content and the version of the parser, so a
+page downloaded again but unchanged is not parsed again, and a parser whose
+output changed does not read what an older one stored. The cache directory is
+capped in size, least recently used entries being evicted first.
+
+DataFrames are stored with pandas' pickle format: Parquet/Feather would need
+pyarrow, which is not a dependency of the app.
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+
+import pandas as pd
+
+CACHE_DIR = os.getenv("ATHLE_CACHE_DIR", os.path.join(".cache", "athle"))
+CACHE_MAX_BYTES = int(os.getenv("ATHLE_CACHE_MAX_MB", "200")) * 1024 * 1024
+
+
+def content_hash(content: bytes) -> str:
+    return hashlib.sha256(content).hexdigest()
+
+
+class PageCache:
+    def __init__(self, directory=CACHE_DIR, max_bytes=CACHE_MAX_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+    # Every file of an entry shares the same stem, eviction works per stem
+    def _path(self, stem, suffix):
+        return os.path.join(self.directory, f"{stem}.{suffix}")
+
+    @staticmethod
+    def _url_key(url):
+        return hashlib.sha256(url.encode("utf-8")).hexdigest()[:40]
+
+    def _write(self, path, data: bytes):
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+
+    @staticmethod
+    def _touch(*paths):
+        for path in paths:
+            try:
+                os.utime(path)
+            except FileNotFoundError:
+                pass
+
+    # --- Raw pages ---
+    def get_page(self, url):
+        """(html, meta) of the cached page, or (None, None) on a miss."""
+        key = self._url_key(url)
+        meta_path, html_path = self._path(key, "json"), self._path(key, "html")
+        try:
+            with open(meta_path, encoding="utf-8") as f:
+                meta = json.load(f)
+            with open(html_path, "rb") as f:
+                html = f.read()
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None, None
+        return html, meta
+
+    def put_page(self, url, html: bytes, etag=None, last_modified=None):
+        key = self._url_key(url)
+        meta = {
+            "url": url,
+            "etag": etag,
+            "last_modified": last_modified,
+            "sha256": content_hash(html),
+            "fetched_at": time.time(),
+        }
+        self._write(self._path(key, "html"), html)
+        self._write(self._path(key, "json"), json.dumps(meta).encode("utf-8"))
+
+    def revalidated(self, url):
+        # Server answered 304: the cached copy is fresh again
+        key = self._url_key(url)
+        html, meta = self.get_page(url)
+        if meta is None:
+            return None
+        meta["fetched_at"] = time.time()
+        self._write(self._path(key, "json"), json.dumps(meta).encode("utf-8"))
+        self._touch(self._path(key, "html"))
+        return html
+
+    # --- Parsed DataFrames ---
+    def _parsed_path(self, html, name, version):
+        return self._path(content_hash(html), f"{name}.v{version}.pkl")
+
+    def get_parsed(self, html: bytes, name: str, version: int):
+        path = self._parsed_path(html, name, version)
+        try:
+            df = pd.read_pickle(path)
+        except FileNotFoundError:
+            return None
+        self._touch(path)
+        return df
+
+    def put_parsed(self, html: bytes, name: str, version: int, parsed):
+        # DataFrames or plain columns ({name: list}), anything picklable
+        path = self._parsed_path(html, name, version)
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        pd.to_pickle(parsed, tmp_path)
+        os.replace(tmp_path, path)
+
+    def parsed(self, html: bytes, name: str, version: int, parse):
+        """``parse(html)``, loaded from disk when this exact content was parsed.
+
+        ``version`` identifies the output of ``parse``: bump it whenever it
+        changes.
+        """
+        df = self.get_parsed(html, name, version)
+        if df is None:
+            df = parse(html)
+            self.put_parsed(html, name, version, df)
+        return df
+
+    # --- Eviction ---
+    def evict(self):
+        """Drop least recently used entries until the cache fits in max_bytes."""
+        with self._lock:
+            entries = {}
+            for entry in os.scandir(self.directory):
+                if not entry.is_file() or entry.name.endswith(".tmp"):
+                    continue
+                stat = entry.stat()
+                stem = entry.name.split(".", 1)[0]
+                size, last_used, paths = entries.get(stem, (0, 0.0, []))
+                entries[stem] = (
+                    size + stat.st_size,
+                    max(last_used, stat.st_mtime),
+                    paths + [entry.path],
+                )
+
+            total = sum(size for size, _, _ in entries.values())
+            for size, _, paths in sorted(entries.values(), key=lambda e: e[1]):
+                if total <= self.max_bytes:
+                    break
+                for path in paths:
+                    try:
+                        os.remove(path)
+                    except FileNotFoundError:
+                        pass
+                total -= size
@@ -0,0 +1,61 @@
+import streamlit as st
+
+st.set_page_config(page_title="Admin", layout="wide")
+
+from db_pool import pool_settings, pool_status
+from models import get_engine
+from query_profiler import profile_rerun
+from repository import get_save_counter
+
+REFRESH_EVERY = 5  # Seconds
+
+
+@st.fragment(run_every=REFRESH_EVERY)
+def show_pool_metrics():
+    engine = get_engine()
+    status = pool_status(engine)
+    if status is None:
+        st.info(f"No metered connection pool for {engine.url.get_backend_name()}.")
+        return
+
+    col1, col2, col3, col4 = st.columns(4)
+    col1.metric("Pool size", status["size"])
+    col2.metric("Checked out", status["checked_out"])
+    col3.metric("Idle", status["checked_in"])
+    col4.metric("Overflow", f"{status['overflow']} / {status['max_overflow']}")
+
+    # Time spent waiting for a connection, a sign the pool is too small
+    col1, col2, col3, col4, col5 = st.columns(5)
+    col1.metric("Checkouts", status["checkouts"])
+    col2.metric("Mean wait", f"{status['mean_wait'] * 1000:.1f} ms")
+    col3.metric("p95 wait", f"{status['p95_wait'] * 1000:.1f} ms")
+    col4.metric("Max wait", f"{status['max_wait'] * 1000:.1f} ms")
+    col5.metric("Timeouts", status["timeouts"])
+
+
+def show_save_counts():
+    # Wizard page saves, unchanged pages are not written again
+    counter = get_save_counter()
+    total = counter.written + counter.skipped
+    col1, col2, col3 = st.columns(3)
+    col1.metric("Page saves written", counter.written)
+    col2.metric("Skipped (unchanged)", counter.skipped)
+    col3.metric("Skipped share", f"{counter.skipped / total:.0%}" if total else "-")
+
+
+def show_admin_page():
+    st.title("Database connection pool")
+    st.caption(
+        f"{get_engine().url.render_as_string(hide_password=True)}, refreshed every "
+        f"{REFRESH_EVERY}s. Settings come from the DB_POOL_* environment variables."
+    )
+    show_pool_metrics()
+    with st.expander("Settings"):
+        st.json(pool_settings())
+
+    st.subheader("Wizard page saves")
+    show_save_counts()
+
+
+with profile_rerun("admin"):
+    show_admin_page()
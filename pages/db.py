@@ -2,11 +2,8 @@ import streamlit as st
 
 st.set_page_config(page_title="Database View", layout="wide")
 
-from sqlmodel import Session, select
-from models import (
-    engine,
-    QuizPrediction,
-)  # Assuming models.py is in the same directory or accessible
+from queries import load_predictions_snapshot
+from query_profiler import profile_rerun
 import pandas as pd
 
 
@@ -14,40 +11,36 @@ def show_db_view():
     # st.set_page_config(page_title="Database View", layout="wide") # Removed: Should be in the main app script
     st.title("Database Content: Quiz Predictions")
 
-    with Session(engine) as session:
-        statement = select(QuizPrediction)
-        results = session.exec(statement).all()
-
-        if results:
-            # Convert to a list of dictionaries for DataFrame creation
-            data_for_df = [
-                {
-                    "ID": res.id,
-                    "User Name": res.user_name,
-                    "Event Category": res.event_category,
-                    "Prediction Type": res.prediction_type,
-                    "Predicted Value": res.predicted_value,
-                    "Submission Timestamp": res.submission_timestamp,
-                }
-                for res in results
-            ]
-            st.subheader("Database content")
-            df = pd.DataFrame(data_for_df)
-            st.dataframe(df)
-
-            st.subheader("Participants")
-            participants = df["User Name"].unique()
-            participants_df = pd.DataFrame(participants, columns=["User Name"])
-            participants_df["Missing Predictions"] = participants_df.apply(
-                lambda x: 19 - len(df[df["User Name"] == x["User Name"]]),
-                axis=1,
-            )
-            st.dataframe(
-                participants_df.sort_values(by="Missing Predictions", ascending=False)
-            )
-
-        else:
-            st.write("No predictions found in the database.")
+    snapshot = load_predictions_snapshot()
+
+    if not snapshot.empty:
+        st.subheader("Database content")
+        df = snapshot.rename(
+            columns={
+                "id": "ID",
+                "user_name": "User Name",
+                "event_category": "Event Category",
+                "prediction_type": "Prediction Type",
+                "predicted_value": "Predicted Value",
+                "athlete_id": "Athlete ID",
+                "submission_timestamp": "Submission Timestamp",
+            }
+        )
+        st.dataframe(df)
+
+        st.subheader("Participants")
+        participants = df["User Name"].unique()
+        participants_df = pd.DataFrame(participants, columns=["User Name"])
+        participants_df["Missing Predictions"] = participants_df.apply(
+            lambda x: 19 - len(df[df["User Name"] == x["User Name"]]),
+            axis=1,
+        )
+        st.dataframe(
+            participants_df.sort_values(by="Missing Predictions", ascending=False)
+        )
+
+    else:
+        st.write("No predictions found in the database.")
 
 
 # To ensure this page can be run directly for testing if needed,
@@ -55,4 +48,5 @@ def show_db_view():
 # if __name__ == "__main__":  # This condition prevents Streamlit from running it as a page
 #     show_db_view()
 
-show_db_view()  # Call the function directly to render the page
+with profile_rerun("db"):
+    show_db_view()  # Call the function directly to render the page
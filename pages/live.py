@@ -0,0 +1,42 @@
+import streamlit as st
+
+st.set_page_config(page_title="Live", layout="wide")
+
+from live_leaderboard import get_live_poller
+from query_profiler import profile_rerun
+
+# Viewers only read what the server-wide poller published: no scraping here
+REFRESH_EVERY = 5  # Seconds
+
+
+@st.fragment(run_every=REFRESH_EVERY)
+def show_live_leaderboard():
+    snapshot = get_live_poller().snapshot
+    if snapshot is None:
+        st.info("Le classement en direct n'a pas encore démarré.")
+        return
+
+    st.metric("TOTAL DE POINTS EQUIPE 1", snapshot.total_points)
+    st.caption(f"Mis à jour à {snapshot.updated_at.astimezone():%H:%M:%S}")
+
+    for sexe_str, title in (("HOMME", "Podiums Hommes"), ("FEMME", "Podiums Femmes")):
+        st.subheader(title)
+        for col, (discipline_type, label) in zip(
+            st.columns(3),
+            (("COURSES", "Courses"), ("SAUTS", "Sauts"), ("LANCERS", "Lancers")),
+        ):
+            with col:
+                st.metric(label, "")
+                st.dataframe(snapshot.podiums[f"{discipline_type} {sexe_str}"])
+
+    st.subheader("Scores des Participants")
+    st.dataframe(snapshot.leaderboard, use_container_width=True)
+
+
+def show_live_page():
+    st.title("Classement en direct")
+    show_live_leaderboard()
+
+
+with profile_rerun("live"):
+    show_live_page()
@@ -0,0 +1,129 @@
+import streamlit as st
+
+st.set_page_config(page_title="Perf", layout="wide")
+
+import pandas as pd
+
+from instrumentation import JSONL_PATH, get_prometheus_server, timings
+from query_profiler import Statement, profiler
+
+REFRESH_EVERY = 5  # Seconds
+
+
+@st.fragment(run_every=REFRESH_EVERY)
+def show_timings():
+    summary = pd.DataFrame(timings.summary())
+    if summary.empty:
+        st.info("No timings yet, use the app and come back.")
+        return
+
+    # Slowest sections first, durations in milliseconds
+    for column in ("mean", "p50", "p95", "max"):
+        summary[column] = summary[column] * 1000
+    st.subheader("Sections")
+    st.dataframe(
+        summary.rename(
+            columns={
+                "mean": "mean (ms)",
+                "p50": "p50 (ms)",
+                "p95": "p95 (ms)",
+                "max": "max (ms)",
+            }
+        ),
+        hide_index=True,
+        use_container_width=True,
+    )
+    st.bar_chart(summary.set_index("section")["p95"], y_label="p95 (ms)")
+
+    st.subheader("Latest timings")
+    recent = pd.DataFrame(
+        timings.recent()[-200:][::-1],
+        columns=["time", "section", "seconds", "failed"],
+    )
+    recent["time"] = pd.to_datetime(recent["time"], unit="s", utc=True)
+    recent["ms"] = recent.pop("seconds") * 1000
+    st.dataframe(recent, hide_index=True, use_container_width=True)
+
+
+def statements_frame(statements):
+    frame = pd.DataFrame(statements, columns=Statement._fields)
+    frame["started_at"] = pd.to_datetime(frame["started_at"], unit="s", utc=True)
+    frame["ms"] = frame.pop("seconds") * 1000
+    return frame
+
+
+@st.fragment(run_every=REFRESH_EVERY)
+def show_queries():
+    st.subheader("Queries")
+    if profiler is None:
+        st.info("The query profiler is off, start the app with QUERY_PROFILER=1.")
+        return
+    st.caption(
+        f"Budgets per rerun: {profiler.budget_statements} statements, "
+        f"{profiler.budget_ms:.0f} ms in queries, the same statement at most "
+        f"{profiler.repeat_limit} times."
+    )
+    reruns = profiler.recent_reruns()[::-1]
+    st.dataframe(
+        pd.DataFrame(
+            [
+                {
+                    "started_at": pd.to_datetime(rerun.started_at, unit="s", utc=True),
+                    "page": rerun.page,
+                    "statements": len(rerun.statements),
+                    "queries (ms)": rerun.query_seconds * 1000,
+                    "rerun (ms)": rerun.seconds * 1000,
+                    "over budget": "; ".join(rerun.flags),
+                }
+                for rerun in reruns
+            ]
+        ),
+        hide_index=True,
+        use_container_width=True,
+    )
+    for rerun in [rerun for rerun in reruns if rerun.flags][:5]:
+        with st.expander(f"{rerun.page}: {'; '.join(rerun.flags)}"):
+            st.dataframe(
+                statements_frame(rerun.statements),
+                hide_index=True,
+                use_container_width=True,
+            )
+
+    st.subheader(f"Top {profiler.top} slowest statements")
+    slowest = profiler.slowest()
+    if slowest:
+        st.dataframe(
+            statements_frame(slowest), hide_index=True, use_container_width=True
+        )
+    background = profiler.outside_reruns()
+    if background:
+        st.subheader("Statements outside page reruns")
+        st.dataframe(
+            statements_frame(background[::-1]),
+            hide_index=True,
+            use_container_width=True,
+        )
+
+
+def show_perf_page():
+    st.title("Performance")
+    exports = [f"{len(timings.records)} / {timings.records.maxlen} timings in memory"]
+    if JSONL_PATH:
+        exports.append(f"JSONL: {JSONL_PATH}")
+    prometheus_server = get_prometheus_server()
+    if prometheus_server:
+        host, port = prometheus_server.server_address[:2]
+        exports.append(f"Prometheus: http://{host}:{port}/metrics")
+    st.caption(
+        ", ".join(exports) + f". Refreshed every {REFRESH_EVERY}s, exports are "
+        "set with the PERF_* environment variables."
+    )
+    if st.button("Clear timings"):
+        timings.clear()
+        if profiler is not None:
+            profiler.clear()
+    show_timings()
+    show_queries()
+
+
+show_perf_page()
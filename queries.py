@@ -0,0 +1,158 @@
+import pandas as pd
+import streamlit as st
+from sqlalchemy import Float, Numeric, case, cast, func, text
+from sqlmodel import Session, select
+
+from models import (
+    CategoryUserCount,
+    PredictionCount,
+    PredictionRevision,
+    QuizPrediction,
+    get_engine,
+)
+
+
+def cote_expression(percentage):
+    # SQL version of the 'Cote' rule shown to the players on the login page
+    return case(
+        (percentage >= 75, 1),
+        (percentage >= 50, 2),
+        (percentage >= 25, 4),
+        else_=10,
+    )
+
+
+# --- Shared snapshot ---
+# Pages read predictions through caches keyed by a cheap "version" of the table,
+# so a rerun only costs the version probe until predictions actually change.
+# The version is the predictions revision, moved by every write once it is
+# visible: page saves, athlete links, counts rebuilds and imports (see
+# models.bump_predictions_revision).
+SNAPSHOT_COLUMNS = [
+    "id",
+    "user_name",
+    "event_category",
+    "prediction_type",
+    "predicted_value",
+    "athlete_id",
+    "submission_timestamp",
+]
+
+
+def get_predictions_version(bind=None):
+    with Session(bind or get_engine()) as session:
+        if session.get_bind().dialect.name == "postgresql":
+            # NULL until the first nextval
+            statement = text(
+                "SELECT coalesce(pg_sequence_last_value('predictions_revision'), 0)"
+            )
+            return session.execute(statement).scalar()
+        statement = select(PredictionRevision.revision).where(
+            PredictionRevision.id == 1
+        )
+        return session.exec(statement).first() or 0  # No row before any write
+
+
+def fetch_predictions() -> pd.DataFrame:
+    # Uncached full read, for code running outside of a Streamlit script run
+    statement = select(*(getattr(QuizPrediction, c) for c in SNAPSHOT_COLUMNS))
+    with Session(get_engine()) as session:
+        rows = session.exec(statement).all()
+    return pd.DataFrame(rows, columns=SNAPSHOT_COLUMNS)
+
+
+@st.cache_data(ttl="1h", max_entries=4, show_spinner=False)
+def _load_predictions(version) -> pd.DataFrame:
+    return fetch_predictions()
+
+
+def load_predictions_snapshot() -> pd.DataFrame:
+    """All predictions as a DataFrame, refetched only when the table changed."""
+    return _load_predictions(get_predictions_version())
+
+
+def load_versioned_snapshot():
+    """(version, snapshot), for callers that keep state derived from it."""
+    version = get_predictions_version()
+    return version, _load_predictions(version)
+
+
+def load_category_stats() -> pd.DataFrame:
+    """Per (event_category, predicted_value) counts, read from the counts tables.
+
+    Percentages are relative to the number of distinct users who made a
+    prediction in the category, rounded to 2 decimals before the cote is
+    derived from them.
+    """
+    return _load_category_stats(get_predictions_version())
+
+
+COUNT_COLUMNS = [
+    "event_category",
+    "predicted_value",
+    "count",
+    "users",
+    "percentage",
+    "cote",
+]
+
+
+def _count_statement(percentage):
+    # COUNT_COLUMNS rows of the materialized counts
+    return select(
+        PredictionCount.event_category,
+        PredictionCount.predicted_value,
+        PredictionCount.count,
+        CategoryUserCount.users,
+        percentage.label("percentage"),
+        cote_expression(percentage).label("cote"),
+    ).join(
+        CategoryUserCount,
+        CategoryUserCount.event_category == PredictionCount.event_category,
+    )
+
+
+@st.cache_data(ttl="1h", max_entries=4, show_spinner=False)
+def _load_category_stats(version) -> pd.DataFrame:
+    # Cast to NUMERIC so round(x, 2) exists on Postgres
+    percentage = func.round(
+        cast(
+            cast(PredictionCount.count, Float) * 100 / CategoryUserCount.users,
+            Numeric,
+        ),
+        2,
+    )
+    statement = _count_statement(percentage).order_by(
+        PredictionCount.event_category,
+        PredictionCount.count.desc(),
+        PredictionCount.predicted_value,
+    )
+
+    with Session(get_engine()) as session:
+        rows = session.exec(statement).all()
+
+    df = pd.DataFrame(rows, columns=COUNT_COLUMNS)
+    df["percentage"] = df["percentage"].astype(float)  # Decimal on Postgres
+    return df
+
+
+def fetch_prediction_counts() -> pd.DataFrame:
+    """(event_category, predicted_value, count, users) for scoring.
+
+    See scoring.cotes_from_counts: unlike the stats, the percentage is not
+    rounded before the cote is derived.
+    """
+    statement = select(
+        PredictionCount.event_category,
+        PredictionCount.predicted_value,
+        PredictionCount.count,
+        CategoryUserCount.users,
+    ).join(
+        CategoryUserCount,
+        CategoryUserCount.event_category == PredictionCount.event_category,
+    )
+    with Session(get_engine()) as session:
+        rows = session.exec(statement).all()
+    return pd.DataFrame(
+        rows, columns=["event_category", "predicted_value", "count", "users"]
+    )
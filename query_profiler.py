@@ -0,0 +1,194 @@
+"""Opt-in SQL profiler, enabled with ``QUERY_PROFILER=1``.
+
+Hooks the engines through SQLAlchemy's cursor execute events and groups the
+statements by Streamlit rerun: pages run their script inside
+``profile_rerun(page)``, statements issued by the same thread meanwhile belong
+to that rerun. Background threads (write-behind flusher, async repository,
+live poller) and fragment reruns are reported apart.
+
+Each statement is logged on the ``sra.queries`` logger at DEBUG level with its
+SQL, parameters, row count (as the driver reports it: psycopg2 does for
+SELECTs, sqlite3 only for writes) and duration. A rerun is flagged, and logged
+at WARNING level, when it goes over one of the budgets:
+
+    QUERY_BUDGET_STATEMENTS  statements per rerun (default 20)
+    QUERY_BUDGET_MS          total statement time per rerun (default 200)
+    QUERY_REPEAT_LIMIT       runs of the same SQL in a rerun before it is
+                             reported as a likely N+1 (default 5)
+    QUERY_TOP                slowest statements kept (default 20)
+"""
+
+import contextlib
+import heapq
+import itertools
+import logging
+import os
+import threading
+import time
+from collections import Counter, deque, namedtuple
+from dataclasses import dataclass, field
+
+from sqlalchemy import event
+
+ENABLED = os.getenv("QUERY_PROFILER", "0") != "0"
+BUDGET_STATEMENTS = int(os.getenv("QUERY_BUDGET_STATEMENTS", "20"))
+BUDGET_MS = float(os.getenv("QUERY_BUDGET_MS", "200"))
+REPEAT_LIMIT = int(os.getenv("QUERY_REPEAT_LIMIT", "5"))
+TOP = int(os.getenv("QUERY_TOP", "20"))
+
+logger = logging.getLogger("sra.queries")
+
+Statement = namedtuple(
+    "Statement", ["page", "sql", "parameters", "rowcount", "seconds", "started_at"]
+)
+
+
+@dataclass
+class Rerun:
+    page: str
+    started_at: float
+    statements: list = field(default_factory=list)
+    seconds: float = 0.0  # Wall time of the rerun
+    flags: list = field(default_factory=list)
+
+    @property
+    def query_seconds(self):
+        return sum(statement.seconds for statement in self.statements)
+
+
+def _parameters(parameters, limit=200):
+    text = repr(parameters)
+    return text if len(text) <= limit else text[:limit] + "..."
+
+
+class QueryProfiler:
+    def __init__(
+        self,
+        budget_statements=BUDGET_STATEMENTS,
+        budget_ms=BUDGET_MS,
+        repeat_limit=REPEAT_LIMIT,
+        top=TOP,
+        history=50,
+    ):
+        self.budget_statements = budget_statements
+        self.budget_ms = budget_ms
+        self.repeat_limit = repeat_limit
+        self.top = top
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._order = itertools.count()  # Tie-breaker for the heap
+        self.reruns = deque(maxlen=history)
+        self.background = deque(maxlen=200)
+        self._slowest = []  # Min-heap of (seconds, order, Statement)
+
+    def install(self, engine):
+        event.listen(engine, "before_cursor_execute", self._before)
+        event.listen(engine, "after_cursor_execute", self._after)
+
+    # Start times are kept on the execution context rather than on a stack in
+    # conn.info: a statement that raises never reaches _after, and its entry
+    # would be popped by the next statement of the connection
+    def _before(self, conn, cursor, statement, parameters, context, executemany):
+        context._profiler_start = (time.time(), time.perf_counter())
+
+    def _after(self, conn, cursor, statement, parameters, context, executemany):
+        started_at, start = context._profiler_start
+        rerun = getattr(self._local, "rerun", None)
+        entry = Statement(
+            rerun.page if rerun else None,
+            statement,
+            _parameters(parameters),
+            cursor.rowcount if cursor.rowcount >= 0 else None,
+            time.perf_counter() - start,
+            started_at,
+        )
+        logger.debug(
+            "%.1f ms, %s rows: %s %s",
+            entry.seconds * 1000,
+            entry.rowcount,
+            statement,
+            entry.parameters,
+        )
+        with self._lock:
+            if rerun is None:
+                self.background.append(entry)
+            if len(self._slowest) < self.top:
+                heapq.heappush(self._slowest, (entry.seconds, next(self._order), entry))
+            else:
+                heapq.heappushpop(
+                    self._slowest, (entry.seconds, next(self._order), entry)
+                )
+        if rerun is not None:
+            rerun.statements.append(entry)
+
+    @contextlib.contextmanager
+    def rerun(self, page):
+        """Attribute the statements of the calling thread to one rerun of page."""
+        rerun = Rerun(page, time.time())
+        self._local.rerun = rerun
+        start = time.perf_counter()
+        try:
+            yield rerun
+        finally:
+            self._local.rerun = None
+            rerun.seconds = time.perf_counter() - start
+            rerun.flags = self.check(rerun)
+            if rerun.flags:
+                logger.warning("%s rerun over budget: %s", page, "; ".join(rerun.flags))
+            with self._lock:
+                self.reruns.append(rerun)
+
+    def check(self, rerun):
+        """The budgets a rerun goes over, as messages."""
+        flags = []
+        if len(rerun.statements) > self.budget_statements:
+            flags.append(
+                f"{len(rerun.statements)} statements (budget {self.budget_statements})"
+            )
+        if rerun.query_seconds * 1000 > self.budget_ms:
+            flags.append(
+                f"{rerun.query_seconds * 1000:.0f} ms in queries "
+                f"(budget {self.budget_ms:.0f} ms)"
+            )
+        repeats = Counter(statement.sql for statement in rerun.statements)
+        for sql, count in repeats.most_common():
+            if count <= self.repeat_limit:
+                break
+            flags.append(f"N+1? {count}x {' '.join(sql.split())[:120]}")
+        return flags
+
+    def slowest(self):
+        """The slowest statements seen, slowest first."""
+        with self._lock:
+            return [entry for _, _, entry in sorted(self._slowest, reverse=True)]
+
+    def recent_reruns(self):
+        with self._lock:
+            return list(self.reruns)
+
+    def outside_reruns(self):
+        with self._lock:
+            return list(self.background)
+
+    def clear(self):
+        with self._lock:
+            self.reruns.clear()
+            self.background.clear()
+            self._slowest = []
+
+
+profiler = QueryProfiler() if ENABLED else None
+
+
+def install_profiler(engine):
+    """Profile ``engine`` when QUERY_PROFILER is set, returns it."""
+    if profiler is not None:
+        profiler.install(engine)
+    return engine
+
+
+def profile_rerun(page):
+    """Context manager around a page's script run, no-op when disabled."""
+    if profiler is None:
+        return contextlib.nullcontext()
+    return profiler.rerun(page)
@@ -4,13 +4,13 @@ st.set_page_config(
     page_title="Pronostics SRA", layout="wide", initial_sidebar_state="collapsed"
 )
 
-from constants import athletes  # Import the athletes list
-from models import (
-    engine,
-    QuizPrediction,
-    create_db_and_tables_once,
-)  # DB Imports, changed function name
-from sqlmodel import Session, select  # DB Imports, added select
+from concurrent.futures import wait
+
+from athlete_search import get_athlete_search
+from instrumentation import get_prometheus_server, timed
+from models import SchemaOutOfDate, check_schema
+from query_profiler import profile_rerun
+from repository import get_repository, get_save_counter
 
 # Constants for page names (can be moved to a constants.py later)
 PAGE_WELCOME = "Welcome"
@@ -44,10 +44,8 @@ APP_PAGES_ORDER = [
 # Quiz pages for progress calculation (excluding summary)
 QUIZ_PAGES_FOR_PROGRESS = APP_PAGES_ORDER[:-1]
 
-# Prepare athlete choices by adding the "Other" option
-ATHLETES_CHOICES = ["Autre"] + sorted(athletes)
-
 
+@timed("quiz.load_predictions")
 def load_predictions_from_db(user_name: str):
     loaded_answers = {}
     # Helper to map page display names (constants) to page_answer_keys
@@ -59,59 +57,57 @@ def load_predictions_from_db(user_name: str):
     # And the reverse for easier lookup from DB event_category
     answer_key_to_page_name = {v: k for k, v in page_name_to_answer_key.items()}
 
-    with Session(engine) as session:
-        db_predictions = session.exec(
-            select(QuizPrediction).where(QuizPrediction.user_name == user_name)
-        ).all()
+    db_predictions = get_repository().load(user_name)
+    for pred in db_predictions:
+        event_category_constant = (
+            pred.event_category
+        )  # This should be like PAGE_LANCER_HOMME
+        page_answer_key = page_name_to_answer_key.get(event_category_constant)
+
+        if not page_answer_key:
+            # Fallback if event_category_constant isn't directly in APP_PAGES_ORDER (e.g. old data)
+            # This case should ideally not happen with current save logic
+            print(
+                f"Warning: Could not map event_category '{event_category_constant}' to a page_answer_key."
+            )
+            # Attempt a direct conversion as a last resort, though it might not match APP_PAGES_ORDER keys
+            page_answer_key = event_category_constant.lower().replace(" ", "_")
 
-        for pred in db_predictions:
-            event_category_constant = (
-                pred.event_category
-            )  # This should be like PAGE_LANCER_HOMME
-            page_answer_key = page_name_to_answer_key.get(event_category_constant)
+        if page_answer_key not in loaded_answers:
+            loaded_answers[page_answer_key] = {}
 
-            if not page_answer_key:
-                # Fallback if event_category_constant isn't directly in APP_PAGES_ORDER (e.g. old data)
-                # This case should ideally not happen with current save logic
+        if pred.prediction_type == PREDICTION_TYPE_POINTS:
+            try:
+                loaded_answers[page_answer_key]["points"] = int(pred.predicted_value)
+            except ValueError:
                 print(
-                    f"Warning: Could not map event_category '{event_category_constant}' to a page_answer_key."
+                    f"Warning: Could not convert points value '{pred.predicted_value}' to int for {page_answer_key}"
                 )
-                # Attempt a direct conversion as a last resort, though it might not match APP_PAGES_ORDER keys
-                page_answer_key = event_category_constant.lower().replace(" ", "_")
-
-            if page_answer_key not in loaded_answers:
-                loaded_answers[page_answer_key] = {}
-
-            if pred.prediction_type == PREDICTION_TYPE_POINTS:
-                try:
-                    loaded_answers[page_answer_key]["points"] = int(
-                        pred.predicted_value
-                    )
-                except ValueError:
-                    print(
-                        f"Warning: Could not convert points value '{pred.predicted_value}' to int for {page_answer_key}"
-                    )
-                    loaded_answers[page_answer_key]["points"] = (
-                        0  # Default to 0 or handle as error
-                    )
-            elif pred.prediction_type == PREDICTION_TYPE_PLACE_1:
-                loaded_answers[page_answer_key]["place1"] = pred.predicted_value
-            elif pred.prediction_type == PREDICTION_TYPE_PLACE_2:
-                loaded_answers[page_answer_key]["place2"] = pred.predicted_value
-            elif pred.prediction_type == PREDICTION_TYPE_PLACE_3:
-                loaded_answers[page_answer_key]["place3"] = pred.predicted_value
+                loaded_answers[page_answer_key]["points"] = (
+                    0  # Default to 0 or handle as error
+                )
+        elif pred.prediction_type == PREDICTION_TYPE_PLACE_1:
+            loaded_answers[page_answer_key]["place1"] = pred.predicted_value
+        elif pred.prediction_type == PREDICTION_TYPE_PLACE_2:
+            loaded_answers[page_answer_key]["place2"] = pred.predicted_value
+        elif pred.prediction_type == PREDICTION_TYPE_PLACE_3:
+            loaded_answers[page_answer_key]["place3"] = pred.predicted_value
 
     st.session_state.answers = loaded_answers
+    # What the database holds for each page, to skip saving unchanged pages
+    persisted = {page: {} for page in QUIZ_PAGES_FOR_PROGRESS}
+    for pred in db_predictions:
+        persisted.setdefault(pred.event_category, {})[pred.prediction_type] = (
+            pred.predicted_value
+        )
+    st.session_state.persisted = persisted
     # After loading, we need to ensure that the Streamlit widget states themselves are updated
     # for the current page if it's already rendered. This is a bit tricky as Streamlit reruns.
     # The existing logic in get_podium_input and show_points_page should handle initializing
     # widget states from st.session_state.answers when they run.
 
 
-def main():
-    # Create database tables if they don't exist (now uses _once version)
-    create_db_and_tables_once()
-
+def init_session_state():
     # Initialize session state variables if they don't exist
     if "logged_in" not in st.session_state:
         st.session_state.logged_in = False
@@ -122,6 +118,26 @@ def main():
         st.session_state.current_page_index = 0
     if "answers" not in st.session_state:
         st.session_state.answers = {}
+    # Page saves still running (async repository) and the ones that failed
+    if "pending_saves" not in st.session_state:
+        st.session_state.pending_saves = {}
+    if "failed_saves" not in st.session_state:
+        st.session_state.failed_saves = {}
+    if "persisted" not in st.session_state:
+        st.session_state.persisted = {}
+    if "save_counts" not in st.session_state:
+        st.session_state.save_counts = {"written": 0, "skipped": 0}
+
+
+def main():
+    # Once per server process, the schema itself is managed by migrate.py
+    try:
+        check_schema()
+    except SchemaOutOfDate as e:
+        st.error(str(e))
+        st.stop()
+    get_prometheus_server()  # Started once, by the first rerun (PERF_PROMETHEUS_PORT)
+    init_session_state()
 
     if not st.session_state.logged_in:
         st.session_state.current_page = PAGE_WELCOME
@@ -134,6 +150,7 @@ def main():
         else:
             st.session_state.current_page_index = len(APP_PAGES_ORDER) - 1
             st.session_state.current_page = APP_PAGES_ORDER[-1]
+        check_pending_saves()
         render_wizard_layout()
 
 
@@ -214,10 +231,13 @@ def show_login_page():
                 for i in range(1, 4):
                     select_k = f"{page_key}_place{i}_select"
                     other_k = f"{page_key}_place{i}_other"
+                    search_k = f"{page_key}_place{i}_search"
                     if select_k in st.session_state:
                         del st.session_state[select_k]
                     if other_k in st.session_state:
                         del st.session_state[other_k]
+                    if search_k in st.session_state:
+                        del st.session_state[search_k]
             if "points_input" in st.session_state:
                 del st.session_state["points_input"]
 
@@ -362,15 +382,17 @@ def render_wizard_layout():
             pass
 
 
-def get_podium_input(page_key_prefix):
+def get_podium_input(page_key_prefix, category=None):
     podium = {}
     st.subheader("Podium")
     page_answers = st.session_state.answers.get(page_key_prefix, {})
+    search = get_athlete_search()
 
     for i in range(1, 4):
         place_key = f"place{i}"
         select_widget_key = f"{page_key_prefix}_{place_key}_select"
         other_widget_key = f"{page_key_prefix}_{place_key}_other"
+        search_widget_key = f"{page_key_prefix}_{place_key}_search"
 
         current_saved_value_for_place = page_answers.get(
             place_key
@@ -379,9 +401,9 @@ def get_podium_input(page_key_prefix):
         # Initialize selectbox state
         if select_widget_key not in st.session_state:
             if current_saved_value_for_place:
-                if current_saved_value_for_place in ATHLETES_CHOICES:
+                if current_saved_value_for_place in search:
                     st.session_state[select_widget_key] = current_saved_value_for_place
-                else:  # It's an "other" value not in ATHLETES_CHOICES list (e.g. custom text)
+                else:  # It's an "other" value not in the registry (e.g. custom text)
                     st.session_state[select_widget_key] = "Autre"
             else:
                 st.session_state[select_widget_key] = None  # Let placeholder show
@@ -396,13 +418,28 @@ def get_podium_input(page_key_prefix):
             else:
                 st.session_state[other_widget_key] = ""  # Default to empty string
 
-        st.selectbox(
-            f"{i}e Place:",
-            options=ATHLETES_CHOICES,
-            key=select_widget_key,  # Let Streamlit manage value via session state
-            # index=None, # Removed: value now controlled by st.session_state[select_widget_key]
-            placeholder="Choisissez un athlète ou 'Autre'",
-        )
+        # Only the best matches of the search are sent to the browser, plus
+        # the current choice. Streamlit 1.45 makes a new widget when the
+        # options change, which would reset the pick: it is written back.
+        selected = st.session_state.get(select_widget_key)
+        st.session_state[select_widget_key] = selected
+        col_search, col_select = st.columns([1, 2])
+        with col_search:
+            query = st.text_input(
+                f"Rechercher ({i}e Place):",
+                key=search_widget_key,
+                placeholder="Nom ou prénom",
+            )
+        matches = search.search(query, category)
+        if selected and selected != "Autre" and selected not in matches:
+            matches.insert(0, selected)
+        with col_select:
+            st.selectbox(
+                f"{i}e Place:",
+                options=["Autre"] + matches,
+                key=select_widget_key,  # Let Streamlit manage value via session state
+                placeholder="Choisissez un athlète ou 'Autre'",
+            )
 
         if st.session_state.get(select_widget_key) == "Autre":
             st.text_input(
@@ -446,7 +483,7 @@ def show_event_page(page_name):
         st.write(
             "Donne le classement des 3 meilleures coureuses de l'équipe 1 sur la compétition."
         )
-    get_podium_input(page_answer_key)
+    get_podium_input(page_answer_key, page_name)
 
 
 def show_points_page():
@@ -508,7 +545,17 @@ def show_summary_page():
             st.write(str(data))
         st.markdown("---")
 
+    save_counts = st.session_state.save_counts
+    st.caption(
+        f"{save_counts['written']} enregistrement(s), "
+        f"{save_counts['skipped']} page(s) inchangée(s) non réenregistrée(s)"
+    )
+
     if st.button("Terminer", key="restart_quiz_summary"):
+        # Every page must be saved before leaving
+        wait(st.session_state.pending_saves.values())
+        if not check_pending_saves():
+            return
         # Reset relevant session state variables to restart the quiz
         st.session_state.logged_in = False  # Go back to login
         st.session_state.user_name = ""
@@ -518,6 +565,7 @@ def show_summary_page():
         st.rerun()
 
 
+@timed("quiz.save_page")
 def save_page_data_to_db(page_name_constant: str, data: dict):
     user_name = st.session_state.user_name
     if not user_name:
@@ -527,72 +575,62 @@ def save_page_data_to_db(page_name_constant: str, data: dict):
 
     event_category = page_name_constant  # e.g., PAGE_LANCER_HOMME
 
-    with Session(engine) as session:
-        # Delete existing predictions for this user and event_category to avoid duplicates/outdated entries
-        if event_category == PAGE_POINTS:
-            stmt = QuizPrediction.__table__.delete().where(
-                (QuizPrediction.user_name == user_name)
-                & (QuizPrediction.event_category == event_category)
-                & (QuizPrediction.prediction_type == PREDICTION_TYPE_POINTS)
-            )
-            session.execute(stmt)
-        else:  # For event pages (podium)
-            stmt_place1 = QuizPrediction.__table__.delete().where(
-                (QuizPrediction.user_name == user_name)
-                & (QuizPrediction.event_category == event_category)
-                & (QuizPrediction.prediction_type == PREDICTION_TYPE_PLACE_1)
-            )
-            session.execute(stmt_place1)
-            stmt_place2 = QuizPrediction.__table__.delete().where(
-                (QuizPrediction.user_name == user_name)
-                & (QuizPrediction.event_category == event_category)
-                & (QuizPrediction.prediction_type == PREDICTION_TYPE_PLACE_2)
-            )
-            session.execute(stmt_place2)
-            stmt_place3 = QuizPrediction.__table__.delete().where(
-                (QuizPrediction.user_name == user_name)
-                & (QuizPrediction.event_category == event_category)
-                & (QuizPrediction.prediction_type == PREDICTION_TYPE_PLACE_3)
-            )
-            session.execute(stmt_place3)
-
-        predictions_to_add = []
-        if event_category == PAGE_POINTS:
-            points_value = data.get("points")
-            if points_value is not None:
-                prediction = QuizPrediction(
-                    user_name=user_name,
-                    event_category=event_category,
-                    prediction_type=PREDICTION_TYPE_POINTS,
-                    predicted_value=str(points_value),
-                )
-                predictions_to_add.append(prediction)
-        else:  # Event page (podium)
-            for place_key, athlete_name in data.items():
-                prediction_type = ""
-                if place_key == "place1":
-                    prediction_type = PREDICTION_TYPE_PLACE_1
-                elif place_key == "place2":
-                    prediction_type = PREDICTION_TYPE_PLACE_2
-                elif place_key == "place3":
-                    prediction_type = PREDICTION_TYPE_PLACE_3
-
-                if (
-                    prediction_type and athlete_name
-                ):  # athlete_name might be None/empty if cleared
-                    prediction = QuizPrediction(
-                        user_name=user_name,
-                        event_category=event_category,
-                        prediction_type=prediction_type,
-                        predicted_value=str(athlete_name),
-                    )
-                    predictions_to_add.append(prediction)
-
-        if predictions_to_add:
-            session.add_all(predictions_to_add)
-
-        session.commit()
+    # Map every prediction type of the page to its new value (None = cleared)
+    if event_category == PAGE_POINTS:
+        points_value = data.get("points")
+        values = {
+            PREDICTION_TYPE_POINTS: None if points_value is None else str(points_value)
+        }
+    else:  # Event page (podium)
+        values = {}
+        for place_key, prediction_type in (
+            ("place1", PREDICTION_TYPE_PLACE_1),
+            ("place2", PREDICTION_TYPE_PLACE_2),
+            ("place3", PREDICTION_TYPE_PLACE_3),
+        ):
+            athlete_name = data.get(place_key)  # None/empty if cleared
+            values[prediction_type] = str(athlete_name) if athlete_name else None
+
+    # Nothing to write when the page still matches the last persisted values
+    snapshot = {ptype: value for ptype, value in values.items() if value is not None}
+    written = snapshot != st.session_state.persisted.get(event_category)
+    st.session_state.save_counts["written" if written else "skipped"] += 1
+    get_save_counter().record(written)
+    if not written:
+        return
+    st.session_state.persisted[event_category] = snapshot
+
+    # Returns right away with the async repository, checked on a later rerun
+    future = get_repository().save(user_name, event_category, values)
+    st.session_state.pending_saves[event_category] = future
+
+
+def check_pending_saves():
+    """Confirm finished page saves and show the ones that failed.
+
+    Returns False while a page could not be saved: its answers are still in the
+    session and are written again when the player leaves that page again.
+    """
+    for page_name, future in list(st.session_state.pending_saves.items()):
+        if not future.done():
+            continue
+        del st.session_state.pending_saves[page_name]
+        if future.exception() is None:
+            st.session_state.failed_saves.pop(page_name, None)
+            st.toast(f"{page_name} : pronostics enregistrés")
+        else:
+            st.session_state.failed_saves[page_name] = str(future.exception())
+            # Unknown database state: the next save of the page must write
+            st.session_state.persisted.pop(page_name, None)
+
+    for page_name, error in st.session_state.failed_saves.items():
+        st.error(
+            f"Tes pronostics {page_name} n'ont pas pu être enregistrés ({error}). "
+            "Retourne sur la page pour réessayer."
+        )
+    return not st.session_state.failed_saves
 
 
 if __name__ == "__main__":
-    main()
+    with profile_rerun("quiz"):
+        main()
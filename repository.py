@@ -0,0 +1,194 @@
+"""Reads and writes of a player's predictions for the quiz wizard.
+
+``PredictionRepository`` runs the queries on the calling (script) thread. With
+``DB_ASYNC=1`` and an async driver installed (asyncpg for Postgres, aiosqlite
+for SQLite, both need greenlet: ``pip install "sra[async]"``),
+``AsyncPredictionRepository`` runs them with
+SQLAlchemy asyncio on an event loop in a background thread instead. With
+``WRITE_BEHIND=1``, ``WriteBehindRepository`` batches the page saves of all
+sessions (see write_behind.py). Page saves then return right away, the wizard
+checks the returned Future on a later rerun and reports failed writes.
+
+All the repositories write through ``models.upsert_many_predictions``, so the
+predictions and the materialized counts stay identical whatever the backend.
+"""
+
+import asyncio
+import importlib.util
+import os
+import threading
+import weakref
+from collections import namedtuple
+from concurrent.futures import Future
+
+import streamlit as st
+from sqlalchemy import select
+from sqlalchemy.engine import make_url
+from sqlalchemy.exc import SQLAlchemyError
+from sqlmodel import Session
+
+from db_pool import async_engine_options
+from models import QuizPrediction, database_url, get_engine, upsert_predictions
+from query_profiler import install_profiler
+from write_behind import WriteBehindBuffer
+
+ASYNC_DRIVERS = {"postgresql": "asyncpg", "sqlite": "aiosqlite"}
+
+PredictionRow = namedtuple(
+    "PredictionRow", ["event_category", "prediction_type", "predicted_value"]
+)
+
+
+def _load(session, user_name):
+    # Only select the columns needed so the lookup stays on the index
+    return session.execute(
+        select(
+            QuizPrediction.event_category,
+            QuizPrediction.prediction_type,
+            QuizPrediction.predicted_value,
+        ).where(QuizPrediction.user_name == user_name)
+    ).all()
+
+
+class PredictionRepository:
+    """Synchronous repository: ``save`` returns an already finished Future."""
+
+    def __init__(self, engine):
+        self.engine = engine
+
+    def load(self, user_name):
+        """(event_category, prediction_type, predicted_value) rows of a user."""
+        with Session(self.engine) as session:
+            return _load(session, user_name)
+
+    def save(self, user_name, event_category, values) -> Future:
+        """Write one page of predictions, see models.upsert_predictions."""
+        future = Future()
+        try:
+            with Session(self.engine) as session:
+                upsert_predictions(session, user_name, event_category, values)
+                session.commit()
+        except SQLAlchemyError as e:
+            future.set_exception(e)
+        else:
+            future.set_result(None)
+        return future
+
+
+class AsyncPredictionRepository(PredictionRepository):
+    """Repository running its queries on a background asyncio event loop."""
+
+    def __init__(self, url):
+        from sqlalchemy.ext.asyncio import create_async_engine
+
+        engine = create_async_engine(url, **async_engine_options(url))
+        install_profiler(engine.sync_engine)
+        super().__init__(engine)
+        self._loop = asyncio.new_event_loop()
+        # user_name -> asyncio.Lock, so that the saves of a player apply in order.
+        # Only held by the saves using it: a lock goes away with a player's
+        # last save, and a new one is made for the next.
+        self._locks = weakref.WeakValueDictionary()
+        threading.Thread(
+            target=self._loop.run_forever, name="db-async", daemon=True
+        ).start()
+
+    def _submit(self, coroutine) -> Future:
+        return asyncio.run_coroutine_threadsafe(coroutine, self._loop)
+
+    def load(self, user_name):
+        # The login needs the answers before rendering, wait for them
+        return self._submit(self._load(user_name)).result()
+
+    def save(self, user_name, event_category, values) -> Future:
+        return self._submit(self._save(user_name, event_category, values))
+
+    async def _load(self, user_name):
+        from sqlalchemy.ext.asyncio import AsyncSession
+
+        async with AsyncSession(self.engine) as session:
+            return await session.run_sync(_load, user_name)
+
+    async def _save(self, user_name, event_category, values):
+        from sqlalchemy.ext.asyncio import AsyncSession
+
+        lock = self._locks.get(user_name)
+        if lock is None:  # Only the loop's thread runs this, no race
+            lock = self._locks[user_name] = asyncio.Lock()
+        async with lock, AsyncSession(self.engine) as session:
+            await session.run_sync(
+                upsert_predictions, user_name, event_category, values
+            )
+            await session.commit()
+
+
+class WriteBehindRepository(PredictionRepository):
+    """Synchronous reads, page saves batched by a server-wide WriteBehindBuffer."""
+
+    def __init__(self, engine):
+        super().__init__(engine)
+        self.buffer = WriteBehindBuffer(engine)
+
+    def load(self, user_name):
+        # Buffered saves are newer than the database. Read them first: if they
+        # are committed in between, the database already has the same values.
+        pending = self.buffer.pending(user_name)
+        rows = {
+            (row.event_category, row.prediction_type): row.predicted_value
+            for row in super().load(user_name)
+        }
+        for event_category, values in pending.items():
+            for prediction_type, value in values.items():
+                if value is None:
+                    rows.pop((event_category, prediction_type), None)
+                else:
+                    rows[event_category, prediction_type] = value
+        return [PredictionRow(*key, value) for key, value in rows.items()]
+
+    def save(self, user_name, event_category, values) -> Future:
+        return self.buffer.save(user_name, event_category, values)
+
+
+class SaveCounter:
+    """Page saves written and skipped as unchanged, since the server started."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.written = 0
+        self.skipped = 0
+
+    def record(self, written):
+        with self._lock:
+            if written:
+                self.written += 1
+            else:
+                self.skipped += 1
+
+
+@st.cache_resource
+def get_save_counter():
+    return SaveCounter()
+
+
+def async_database_url(url):
+    """``url`` with its async driver, None when that driver is not installed."""
+    url = make_url(url)
+    driver = ASYNC_DRIVERS.get(url.get_backend_name())
+    if driver is None or not all(
+        importlib.util.find_spec(module) for module in (driver, "greenlet")
+    ):
+        return None
+    return url.set(drivername=f"{url.get_backend_name()}+{driver}")
+
+
+@st.cache_resource
+def get_repository():
+    # One repository (and event loop or buffer) for the whole server
+    if os.getenv("WRITE_BEHIND", "0") != "0":
+        return WriteBehindRepository(get_engine())
+    if os.getenv("DB_ASYNC", "0") != "0":
+        url = async_database_url(database_url())
+        if url is not None:
+            return AsyncPredictionRepository(url)
+        print("DB_ASYNC is set but no async driver is installed, staying sync.")
+    return PredictionRepository(get_engine())
@@ -0,0 +1,311 @@
+"""From parsed athle.fr results to club podiums and the quiz leaderboard.
+
+The results table is a sequence of discipline blocks, each starting with a
+"... | Finale" header row. ``ResultsTracker`` remembers the blocks it already
+processed so that, during a live competition, a refresh only reprocesses the
+blocks that appeared or changed, and only rebuilds the podiums and scores of
+the categories they belong to.
+"""
+
+import hashlib
+import threading
+
+import numpy as np
+import pandas as pd
+
+from athletes import AthleteIndex
+from scoring import (
+    compute_cotes,
+    cotes_from_counts,
+    leaderboard,
+    podium_table,
+    score_podium_predictions,
+    score_total_points_predictions,
+    with_athlete_ids,
+)
+
+CLUB_PREFIX = "stade rennais athletisme"
+
+DISCIPLINE_TYPES = ["COURSES", "SAUTS", "LANCERS"]
+SEXES = {"M": "HOMME", "F": "FEMME"}
+CATEGORIES = [
+    f"{discipline_type} {sexe_str}"
+    for sexe_str in SEXES.values()
+    for discipline_type in DISCIPLINE_TYPES
+]
+
+# Field events list entrants without a valid mark, they are not ranked
+FIELD_EVENTS = [
+    "Javelot",
+    "Hauteur",
+    "Perche",
+    "Triple",
+    "Longueur",
+    "Poids",
+    "Disque",
+    "Marteau",
+]
+
+PODIUM_COLUMNS = [
+    "Discipline",
+    "Performance",
+    "Athlète",
+    "Club",
+    "Points",
+    "Sexe",
+    "Discipline_Type",
+]
+
+
+# Remplacer la colonne "Discipline" par "LANCER", "COURSE" ou "SAUT"
+def categorize_discipline(discipline):
+    discipline_clean = (
+        discipline.split("/")[0].strip().upper()
+    )  # Use only event name part
+    if any(x in discipline_clean for x in ["JAVELOT", "DISQUE", "MARTEAU", "POIDS"]):
+        return "LANCERS"
+    elif any(
+        x in discipline_clean for x in ["HAUTEUR", "LONGUEUR", "TRIPLE", "PERCHE"]
+    ):
+        return "SAUTS"
+    else:
+        # Assume everything else is a race, excluding relays handled earlier
+        return "COURSES"
+
+
+def discipline_category(sport):
+    """Quiz category ("SAUTS FEMME", ...) of a discipline, None for relays."""
+    if "4 X" in sport:
+        return None
+    # Gender is the 3rd letter of the category code, e.g. "100m / TCM"
+    parts = sport.split("/")
+    sexe = parts[1].strip()[2:3] if len(parts) > 1 else ""
+    if sexe not in SEXES:
+        return None
+    return f"{categorize_discipline(sport)} {SEXES[sexe]}"
+
+
+def iter_blocks(df):
+    """Yield (key, sport, start, stop) for each discipline block of the results.
+
+    The block's rows are ``df.iloc[start:stop]``. ``key`` identifies the block
+    across refreshes: its header text, numbered when the same header appears
+    more than once.
+    """
+    clubs = df["Club"]
+    headers = np.flatnonzero(clubs.str.contains("Finale", na=False).to_numpy())
+    stops = np.append(headers[1:], len(df))
+    seen = {}
+    for position, stop, header in zip(headers, stops, clubs.to_numpy()[headers]):
+        seen[header] = seen.get(header, 0) + 1
+        yield (header, seen[header]), header.split("|")[0], position + 1, stop
+
+
+def row_hashes(df):
+    # Hashed once for the whole table, blocks fingerprint their slice of it
+    return pd.util.hash_pandas_object(df, index=False).to_numpy()
+
+
+def block_fingerprint(hashes, start, stop):
+    return hashlib.sha1(hashes[start:stop].tobytes()).hexdigest()
+
+
+def club_performances(df, blocks):
+    """Club athletes' results of the given discipline blocks, ready for podiums.
+
+    ``blocks`` are (key, sport, start, stop) tuples from ``iter_blocks``. All
+    the blocks are filtered and labelled in a single pass over their rows; the
+    result has a "block" column with the position of each row's block in
+    ``blocks``.
+    """
+    blocks = list(blocks)
+    if not blocks:
+        return pd.DataFrame(columns=PODIUM_COLUMNS + ["block"])
+    _, sports, starts, stops = (
+        np.array(column, dtype=object) for column in zip(*blocks)
+    )
+    lengths = (stops - starts).astype(int)
+    block = np.repeat(np.arange(len(blocks)), lengths)
+    positions = np.concatenate(
+        [np.arange(start, stop) for start, stop in zip(starts, stops)]
+    ).astype(int)
+    results = df.iloc[positions]
+
+    is_relay = np.array(["4 X" in sport for sport in sports])[block]
+    is_field_event = np.array(
+        [any(event in sport for event in FIELD_EVENTS) for sport in sports]
+    )[block]
+    keep = (
+        ~is_relay
+        & ~(is_field_event & results.Performance.isna().to_numpy())
+        & results.Club.str.lower()
+        .str.startswith(CLUB_PREFIX, na=False)
+        .to_numpy(dtype=bool)
+    )
+
+    perfs_club = results.loc[keep].drop(columns=["Cotation"])
+    block = block[keep]
+    perfs_club["Discipline"] = sports[block]
+    perfs_club.Points = perfs_club.Points.fillna(0)
+    perfs_club.Points = perfs_club.Points.astype(int)
+
+    # Extract gender (assuming format "Event / G"), once per block
+    sexes = pd.Series(sports).str.split("/").str.get(1).str.strip().str.get(2)
+    discipline_types = np.array([categorize_discipline(sport) for sport in sports])
+    perfs_club["Sexe"] = sexes.to_numpy()[block]
+    perfs_club["Discipline_Type"] = discipline_types[block]
+    perfs_club["block"] = block
+    return perfs_club
+
+
+class ResultsTracker:
+    """Podiums and leaderboard of one competition, refreshed incrementally."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.athletes = AthleteIndex()
+        self._clear()
+
+    def reset(self):
+        with self._lock:
+            self._clear()
+
+    def _clear(self):
+        # block key -> (fingerprint, category, club performances)
+        self.blocks = {}
+        self.podiums = {
+            category: pd.DataFrame(columns=PODIUM_COLUMNS) for category in CATEGORIES
+        }
+        self.total_points = None
+        self.predictions_version = None
+        self.predictions = None
+        self.users = []
+        self.cotes = None
+        self.category_points = {}  # category -> per-prediction points
+        self.bonus_points = None
+
+    def update(
+        self,
+        df,
+        total_points,
+        predictions,
+        predictions_version,
+        load_counts=None,
+        athletes=None,
+    ):
+        """Bring the tracker up to date, returning the categories that changed.
+
+        ``df`` is the parsed results table (see athle.parse_results_pages),
+        ``predictions`` the prediction snapshot and ``predictions_version`` its
+        version (see queries.load_versioned_snapshot). ``load_counts`` returns
+        the prediction counts the cotes derive from when the predictions
+        changed (see queries.fetch_prediction_counts); the cotes are computed
+        from the snapshot when it is not given. ``athletes`` is the registry's
+        AthleteIndex (see athletes.load_athlete_index); without it athletes
+        are matched by name.
+        """
+        with self._lock:
+            changed = set()
+            blocks = {}
+            new_blocks = []
+            hashes = row_hashes(df)
+            for key, sport, start, stop in iter_blocks(df):
+                fingerprint = block_fingerprint(hashes, start, stop)
+                previous = self.blocks.get(key)
+                if previous is not None and previous[0] == fingerprint:
+                    blocks[key] = previous
+                    continue
+                new_blocks.append((key, sport, start, stop))
+                changed.add(discipline_category(sport))
+                if previous is not None:
+                    changed.add(previous[1])
+            for key in self.blocks.keys() - blocks.keys():  # Blocks gone
+                changed.add(self.blocks[key][1])
+
+            # New and changed blocks are processed together, then split up
+            perfs_by_block = dict(
+                tuple(club_performances(df, new_blocks).groupby("block"))
+            )
+            empty = pd.DataFrame(columns=PODIUM_COLUMNS)
+            for i, (key, sport, start, stop) in enumerate(new_blocks):
+                perfs_club = perfs_by_block.get(i)
+                blocks[key] = (
+                    block_fingerprint(hashes, start, stop),
+                    discipline_category(sport),
+                    empty if perfs_club is None else perfs_club.drop(columns="block"),
+                )
+            self.blocks = blocks
+            changed &= set(CATEGORIES)
+
+            for category in changed:
+                self.podiums[category] = self._build_podium(category)
+
+            # Cotes depend on all the predictions: rescore everything when they
+            # or the athlete registry changed, otherwise only the categories
+            # whose podium moved
+            rescored = changed
+            new_athletes = athletes is not None and athletes is not self.athletes
+            if predictions_version != self.predictions_version or new_athletes:
+                if athletes is not None:
+                    self.athletes = athletes
+                self.predictions_version = predictions_version
+                self.predictions = with_athlete_ids(predictions, self.athletes)
+                self.users = predictions["user_name"].unique()
+                self.cotes = self._cotes(load_counts)
+                self.bonus_points = None
+                rescored = set(CATEGORIES)
+            for category in rescored:
+                self.category_points[category] = score_podium_predictions(
+                    self.predictions[self.predictions["event_category"] == category],
+                    podium_table({category: self.podiums[category]}, self.athletes),
+                    self.cotes,
+                )
+
+            if self.bonus_points is None or total_points != self.total_points:
+                self.total_points = total_points
+                self.bonus_points = score_total_points_predictions(
+                    self.predictions, total_points
+                )
+            return changed
+
+    def _cotes(self, load_counts):
+        if load_counts is None:
+            return compute_cotes(self.predictions)
+        counts = load_counts()
+        counts = counts[counts["event_category"].isin(CATEGORIES)]
+        return cotes_from_counts(
+            counts.assign(athlete_id=self.athletes.resolve(counts["predicted_value"]))
+        )
+
+    def _build_podium(self, category):
+        perfs = [
+            perfs_club
+            for _, block_category, perfs_club in self.blocks.values()
+            if block_category == category and not perfs_club.empty
+        ]
+        if not perfs:
+            return pd.DataFrame(columns=PODIUM_COLUMNS)
+        perfs_club = pd.concat(perfs)
+        return perfs_club.sort_values(by="Points", ascending=False).head(3)
+
+    def leaderboard(self):
+        with self._lock:
+            return self._leaderboard()
+
+    def _leaderboard(self):
+        points = pd.concat(
+            [*self.category_points.values(), self.bonus_points], ignore_index=True
+        )
+        return leaderboard(points, self.users)
+
+    def snapshot(self):
+        """(podiums, predictions, leaderboard) of the same update.
+
+        Read under the lock, so that a session rendering them never sees
+        another session's update half done. Updates replace the podium
+        frames rather than modify them, copying the dict is enough.
+        """
+        with self._lock:
+            if self.predictions is None:  # Never updated
+                return dict(self.podiums), None, None
+            return dict(self.podiums), self.predictions, self._leaderboard()
@@ -0,0 +1,216 @@
+"""Scoring of the quiz predictions against the actual podiums.
+
+Everything is computed with column operations on the prediction table so the
+cost stays linear in the number of predictions. Athletes are compared by id
+(see athletes.py): predictions carry their athlete_id, podium names are
+resolved through an AthleteIndex once per distinct name.
+"""
+
+import numpy as np
+import pandas as pd
+
+from athletes import AthleteIndex
+
+PLACE_MARKER = "Place "
+
+# Points for a podium prediction, before the cote multiplier
+EXACT_PLACE_POINTS = 3
+ON_PODIUM_POINTS = 1
+
+
+# Helper function to calculate 'Cote'
+def calculate_cote(percentage):
+    if percentage >= 75:
+        return 1
+    elif 50 <= percentage < 75:
+        return 2
+    elif 25 <= percentage < 50:
+        return 4
+    else:  # < 25%
+        return 10
+
+
+def cotes_from_percentages(percentages: pd.Series) -> np.ndarray:
+    # Vectorized calculate_cote
+    return np.select(
+        [percentages >= 75, percentages >= 50, percentages >= 25], [1, 2, 4], 10
+    )
+
+
+def with_athlete_ids(predictions: pd.DataFrame, athletes: AthleteIndex):
+    """``predictions`` with the athlete_id of every podium prediction filled.
+
+    Values saved before their athlete was registered (and the negative ids
+    of names outside the registry) are resolved through ``athletes``; the
+    other predictions get 0.
+    """
+    ids = np.zeros(len(predictions), dtype=np.int64)
+    places = (
+        predictions["prediction_type"]
+        .str.contains(PLACE_MARKER, regex=False)
+        .to_numpy(dtype=bool)
+    )
+    if "athlete_id" in predictions:
+        stored = predictions["athlete_id"]
+        linked = places & (stored > 0).to_numpy()
+        ids[linked] = stored[linked].to_numpy(dtype=np.int64)
+    else:
+        linked = np.zeros(len(predictions), dtype=bool)
+    unlinked = places & ~linked
+    ids[unlinked] = athletes.resolve(predictions.loc[unlinked, "predicted_value"])
+    return predictions.assign(athlete_id=ids)
+
+
+def cotes_from_counts(counts: pd.DataFrame) -> pd.DataFrame:
+    """(event_category, athlete_id, cote) from prediction and user counts.
+
+    ``counts`` has event_category, athlete_id, count (predictions naming the
+    athlete) and users (distinct users with a podium prediction in the
+    category) columns; counts of other spellings of an athlete add up.
+    """
+    cotes = (
+        counts.groupby(["event_category", "athlete_id"], sort=False)
+        .agg(count=("count", "sum"), users=("users", "first"))
+        .reset_index()
+    )
+    cotes["cote"] = cotes_from_percentages(cotes["count"] / cotes["users"] * 100)
+    return cotes[["event_category", "athlete_id", "cote"]]
+
+
+def compute_cotes(predictions: pd.DataFrame) -> pd.DataFrame:
+    """Cote of each predicted athlete per event category.
+
+    The percentage is the number of podium predictions naming the athlete over
+    the number of distinct users with a podium prediction in the category.
+    ``predictions`` needs the athlete_id column of with_athlete_ids.
+    """
+    places = predictions[
+        predictions["prediction_type"].str.contains(PLACE_MARKER, regex=False)
+    ]
+    counts = places.groupby(["event_category", "athlete_id"]).size()
+    users = places.groupby("event_category")["user_name"].nunique()
+    counts = counts.rename("count").reset_index()
+    counts["users"] = counts["event_category"].map(users)
+    return cotes_from_counts(counts)
+
+
+def podium_table(podiums: dict, athletes: AthleteIndex) -> pd.DataFrame:
+    """Flatten {event_category: podium DataFrame} to (category, place, athlete_id)."""
+    frames = [
+        pd.DataFrame(
+            {
+                "event_category": event_category,
+                "place": np.arange(1, len(podium) + 1),
+                "athlete_id": athletes.resolve(podium["Athlète"]),
+            }
+        )
+        for event_category, podium in podiums.items()
+        if podium is not None and not podium.empty
+    ]
+    if not frames:
+        return pd.DataFrame(
+            {
+                "event_category": pd.Series(dtype=object),
+                "place": pd.Series(dtype=int),
+                "athlete_id": pd.Series(dtype=np.int64),
+            }
+        )
+    return pd.concat(frames, ignore_index=True)
+
+
+def score_podium_predictions(
+    predictions: pd.DataFrame, podiums: pd.DataFrame, cotes: pd.DataFrame
+) -> pd.DataFrame:
+    """Points of every podium prediction, as (user_name, event_category, points).
+
+    An athlete at the predicted place is worth 3 points, an athlete elsewhere on
+    the podium 1 point, both multiplied by the athlete's cote. ``predictions``
+    needs the athlete_id column of with_athlete_ids.
+    """
+    places = predictions[
+        predictions["prediction_type"].str.contains(PLACE_MARKER, regex=False)
+    ]
+    place_str = places["prediction_type"].str.split(" ").str.get(1)
+    valid = place_str.str.isdigit().fillna(False).astype(bool)
+    places = places[valid].assign(place=place_str[valid].astype(int))
+    places = places.merge(cotes, on=["event_category", "athlete_id"], how="left")
+
+    predicted = pd.MultiIndex.from_frame(
+        places[["event_category", "place", "athlete_id"]]
+    )
+    actual = pd.MultiIndex.from_frame(
+        podiums[["event_category", "place", "athlete_id"]]
+    )
+    exact = predicted.isin(actual)
+    on_podium = predicted.droplevel("place").isin(actual.droplevel("place"))
+
+    base_points = np.where(
+        exact, EXACT_PLACE_POINTS, np.where(on_podium, ON_PODIUM_POINTS, 0)
+    )
+    return pd.DataFrame(
+        {
+            "user_name": places["user_name"].to_numpy(),
+            "event_category": places["event_category"].to_numpy(),
+            "points": base_points * places["cote"].fillna(1).to_numpy(),
+        }
+    )
+
+
+def score_total_points_predictions(
+    predictions: pd.DataFrame, total_points: int
+) -> pd.DataFrame:
+    """Bonus for the team total question: 10 points, minus 1 per 500 points off."""
+    totals = predictions[
+        ~predictions["prediction_type"].str.contains(PLACE_MARKER, regex=False)
+    ]
+    predicted_total = pd.to_numeric(totals["predicted_value"], errors="coerce")
+    distance = (total_points - predicted_total).abs() // 500
+    return pd.DataFrame(
+        {
+            "user_name": totals["user_name"].to_numpy(),
+            "event_category": totals["event_category"].to_numpy(),
+            "points": (10 - distance).clip(lower=0).fillna(0).to_numpy(),
+        }
+    )
+
+
+def score_predictions(
+    predictions: pd.DataFrame, podiums: dict, total_points: int, athletes=None
+) -> pd.DataFrame:
+    """Leaderboard (Utilisateur, Score) of every user with a prediction.
+
+    ``predictions`` needs user_name, event_category, prediction_type and
+    predicted_value columns (athlete_id is optional); ``podiums`` maps event
+    categories to the actual podium DataFrames (with an "Athlète" column, in
+    finishing order). Without an AthleteIndex names only match themselves.
+    """
+    if athletes is None:
+        athletes = AthleteIndex()
+    predictions = with_athlete_ids(predictions, athletes)
+    points = pd.concat(
+        [
+            score_podium_predictions(
+                predictions,
+                podium_table(podiums, athletes),
+                compute_cotes(predictions),
+            ),
+            score_total_points_predictions(predictions, total_points),
+        ],
+        ignore_index=True,
+    )
+    return leaderboard(points, predictions["user_name"].unique())
+
+
+def leaderboard(points: pd.DataFrame, users) -> pd.DataFrame:
+    """Sum per-prediction ``points`` into (Utilisateur, Score), best first.
+
+    Every user in ``users`` is listed, with 0 if none of their predictions scored.
+    """
+    scores = (
+        points.groupby("user_name", sort=False)["points"]
+        .sum()
+        .reindex(users, fill_value=0)
+        .astype(int)
+    )
+    scores_df = pd.DataFrame({"Utilisateur": scores.index, "Score": scores.to_numpy()})
+    return scores_df.sort_values(by="Score", ascending=False)
@@ -0,0 +1,46 @@
+import os
+import tempfile
+
+import pytest
+from sqlmodel import create_engine
+
+# The app's engine (models.get_engine) is built once per process: every test
+# going through it shares this database, migrated at first use
+os.environ.setdefault(
+    "DATABASE_URL",
+    f"sqlite:///{os.path.join(tempfile.mkdtemp(prefix='sra-test-'), 'test.db')}",
+)
+os.environ.setdefault("DB_AUTO_MIGRATE", "1")
+
+
+@pytest.fixture
+def engine(tmp_path):
+    """An engine on an empty SQLite database of its own."""
+    engine = create_engine(f"sqlite:///{tmp_path / 'test.db'}")
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture(params=["sqlite", "postgres"])
+def any_engine(request):
+    """The engine, then the postgres_engine."""
+    return request.getfixturevalue(
+        "engine" if request.param == "sqlite" else "postgres_engine"
+    )
+
+
+@pytest.fixture
+def postgres_engine():
+    """An engine on an emptied Postgres database, from TEST_POSTGRES_URL.
+
+    Concurrency and Postgres-only SQL are only tested when it is set.
+    """
+    url = os.getenv("TEST_POSTGRES_URL")
+    if not url:
+        pytest.skip("TEST_POSTGRES_URL is not set")
+    engine = create_engine(url)
+    with engine.begin() as connection:
+        connection.exec_driver_sql("DROP SCHEMA public CASCADE")
+        connection.exec_driver_sql("CREATE SCHEMA public")
+    yield engine
+    engine.dispose()
@@ -0,0 +1,117 @@
+import csv
+import importlib.util
+
+import pytest
+from sqlalchemy import select
+from sqlmodel import Session, create_engine
+
+from archive import EXPORT_COLUMNS, export_predictions, import_predictions
+from migrate import upgrade
+from models import PredictionCount, QuizPrediction, upsert_many_predictions
+
+CATEGORY = "LANCERS HOMME"
+
+
+def read_predictions(engine):
+    table = QuizPrediction.__table__
+    with Session(engine) as session:
+        return sorted(
+            session.execute(
+                select(*(table.c[column] for column in EXPORT_COLUMNS))
+            ).all()
+        )
+
+
+def read_counts(engine):
+    with Session(engine) as session:
+        return set(session.execute(select(PredictionCount.__table__)).all())
+
+
+def write_csv(path, rows):
+    with open(path, "w", newline="") as file:
+        writer = csv.writer(file)
+        writer.writerow(EXPORT_COLUMNS)
+        writer.writerows(rows)
+
+
+@pytest.fixture
+def saved_engine(any_engine):
+    upgrade(any_engine)
+    with Session(any_engine) as session:
+        upsert_many_predictions(
+            session,
+            {
+                ("a", CATEGORY): {"Place 1": "X", "Place 2": "Y"},
+                ("b", CATEGORY): {"Place 1": "Y"},
+                ("b", "SAUTS FEMME"): {"Place 1": "Z"},
+            },
+        )
+        session.commit()
+    return any_engine
+
+
+@pytest.mark.parametrize("suffix", ["csv", "parquet"])
+def test_round_trip(saved_engine, tmp_path, suffix):
+    if suffix == "parquet":
+        pytest.importorskip("pyarrow")
+    path = tmp_path / f"predictions.{suffix}"
+    target = create_engine(f"sqlite:///{tmp_path / 'target.db'}")
+    upgrade(target)
+
+    assert export_predictions(path, bind=saved_engine) == 4
+    assert import_predictions(path, bind=target) == 4
+
+    assert read_predictions(target) == read_predictions(saved_engine)
+    assert read_counts(target) == read_counts(saved_engine)
+    target.dispose()
+
+
+def test_import_keeps_the_latest_submission(engine, tmp_path):
+    upgrade(engine)
+    path = tmp_path / "predictions.csv"
+    write_csv(
+        path,
+        [
+            ("a", CATEGORY, "Place 1", "X", "2025-05-01 10:00:00+00:00"),
+            ("a", CATEGORY, "Place 2", "Y", "2025-05-01 10:00:00"),
+        ],
+    )
+    assert import_predictions(path, bind=engine) == 2
+
+    # Older for Place 1, newer (in another time zone) for Place 2
+    write_csv(
+        path,
+        [
+            ("a", CATEGORY, "Place 1", "Z", "2025-05-01 09:00:00+00:00"),
+            ("a", CATEGORY, "Place 2", "Z", "2025-05-01 12:30:00+02:00"),
+            ("b", CATEGORY, "Place 1", "Z", "2025-05-01 10:00:00"),
+        ],
+    )
+    assert import_predictions(path, bind=engine) == 3
+
+    values = {
+        (user_name, prediction_type): predicted_value
+        for user_name, _, prediction_type, predicted_value, _ in read_predictions(
+            engine
+        )
+    }
+    assert values == {
+        ("a", "Place 1"): "X",
+        ("a", "Place 2"): "Z",
+        ("b", "Place 1"): "Z",
+    }
+    assert read_counts(engine) == {(CATEGORY, "X", 1), (CATEGORY, "Z", 2)}
+
+    # --replace starts from the file alone
+    assert import_predictions(path, replace=True, bind=engine) == 3
+
+
+def test_parquet_without_pyarrow(engine, tmp_path, monkeypatch):
+    find_spec = importlib.util.find_spec
+    monkeypatch.setattr(
+        importlib.util,
+        "find_spec",
+        lambda name, *args: None if name == "pyarrow" else find_spec(name, *args),
+    )
+    with pytest.raises(ImportError, match=r"sra\[parquet\]"):
+        export_predictions(tmp_path / "predictions.parquet", bind=engine)
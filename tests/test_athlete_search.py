@@ -0,0 +1,63 @@
+import random
+
+from athlete_search import AthleteSearch
+from models import fold_name
+
+NAMES = {
+    1: "PHILIPPE Clara",
+    2: "LE CALVE Clara",
+    3: "CLARAC Hugo",
+    4: "MOSER Manon",
+    5: "COLLET Travis",
+}
+
+
+def test_a_category_searches_its_athletes_first():
+    search = AthleteSearch(NAMES, [(1, "SAUTS FEMME"), (2, "LANCERS FEMME")])
+
+    assert search.search("clara", "LANCERS FEMME") == ["LE CALVE Clara"]
+    assert search.search("clara") == ["LE CALVE Clara", "PHILIPPE Clara", "CLARAC Hugo"]
+
+
+def test_the_fallback_keeps_to_the_page_gender():
+    search = AthleteSearch(
+        NAMES, [(1, "SAUTS FEMME"), (3, "LANCERS HOMME"), (5, "SAUTS HOMME")]
+    )
+
+    # No thrower of FEMME matches: jumpers, and the athletes of no category
+    assert search.search("clara", "LANCERS FEMME") == [
+        "LE CALVE Clara",
+        "PHILIPPE Clara",
+    ]
+    assert search.search("travis", "LANCERS FEMME") == []
+    assert search.search("manon", "COURSES HOMME") == ["MOSER Manon"]
+
+
+def test_without_categories_the_whole_roster_is_searched():
+    search = AthleteSearch(NAMES)
+
+    assert search.search("clara", "LANCERS FEMME") == search.search("clara")
+    assert len(search.search("clara")) == 3
+
+
+def test_word_starts_come_first_then_any_substring():
+    rng = random.Random(0)
+    names = {
+        i: " ".join(
+            "".join(rng.choice("abcdefgh") for _ in range(rng.randint(2, 6)))
+            for _ in range(2)
+        )
+        for i in range(500)
+    }
+    search = AthleteSearch(names)
+    for query in ["a", "ab", "bca", "h g", "zz"]:
+        anywhere = [n for n in search.names if query in fold_name(n)]
+        starts = {n for n in anywhere if f" {query}" in f" {fold_name(n)}"}
+        for limit in (1, 5, 1000):
+            found = search.search(query, limit=limit)
+            assert len(set(found)) == len(found) == min(limit, len(anywhere))
+            assert set(found) <= set(anywhere)
+            if limit <= len(starts):
+                assert set(found) <= starts
+            else:
+                assert set(found[: len(starts)]) == starts
@@ -0,0 +1,29 @@
+from pathlib import Path
+
+import pandas as pd
+
+from athle import parse_results_pages
+from benchmarks.blocks import legacy_club_performances, one_pass_club_performances
+from benchmarks.fixtures import make_meeting
+
+FIXTURES = Path(__file__).parent / "fixtures" / "athle"
+
+
+def assert_same_performances(df):
+    pd.testing.assert_frame_equal(
+        one_pass_club_performances(df).reset_index(drop=True),
+        legacy_club_performances(df).reset_index(drop=True),
+        check_dtype=False,
+    )
+
+
+def test_one_pass_matches_the_concat_loop():
+    # Every event, field events without a mark, relays, repeated headers
+    assert_same_performances(
+        parse_results_pages(make_meeting(disciplines=45, entries=10, pages=3))
+    )
+
+
+def test_one_pass_matches_the_concat_loop_on_saved_pages():
+    pages = sorted(FIXTURES.glob("interclubs-*.html"))
+    assert_same_performances(parse_results_pages([p.read_bytes() for p in pages]))
@@ -0,0 +1,79 @@
+import random
+import threading
+
+from sqlalchemy import select, text
+from sqlmodel import Session
+
+from migrate import upgrade
+from models import (
+    CategoryUserCount,
+    PagePredictionCount,
+    PredictionCount,
+    rebuild_prediction_counts,
+    upsert_many_predictions,
+    upsert_predictions,
+)
+
+PLACES = ["Place 1", "Place 2", "Place 3"]
+
+
+def read_counts(session):
+    return [
+        set(session.execute(select(model.__table__)).all())
+        for model in (PredictionCount, PagePredictionCount, CategoryUserCount)
+    ]
+
+
+def assert_counts_match_a_recount(engine):
+    with Session(engine) as session:
+        maintained = read_counts(session)
+        rebuild_prediction_counts(session)
+        assert read_counts(session) == maintained
+        session.rollback()
+
+
+def test_counts_follow_saves_clears_and_edits(any_engine):
+    upgrade(any_engine)
+    rng = random.Random(0)
+    for _ in range(30):
+        pages = {}
+        for _ in range(rng.randint(1, 4)):
+            page = (f"user{rng.randint(1, 5)}", rng.choice(["A", "B"]))
+            pages[page] = {place: rng.choice(["X", "Y", "Z", None]) for place in PLACES}
+        with Session(any_engine) as session:
+            upsert_many_predictions(session, pages)
+            session.commit()
+    with any_engine.begin() as connection:
+        # Writes from outside the app: an edit moving a row, a bulk delete
+        connection.execute(
+            text(
+                "UPDATE quizprediction SET user_name = user_name || '_renamed' "
+                "WHERE id % 7 = 0"
+            )
+        )
+        connection.execute(text("DELETE FROM quizprediction WHERE id % 5 = 0"))
+    assert_counts_match_a_recount(any_engine)
+
+
+def test_concurrent_first_saves_of_a_page_count_the_user_once(postgres_engine):
+    upgrade(postgres_engine)
+    barrier = threading.Barrier(2)
+
+    def save(place):
+        with Session(postgres_engine) as session:
+            session.execute(text("SELECT 1"))  # Open both transactions first
+            barrier.wait()
+            upsert_predictions(session, "a", "LANCERS HOMME", {place: "X"})
+            session.commit()
+
+    threads = [threading.Thread(target=save, args=(p,)) for p in PLACES[:2]]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    with Session(postgres_engine) as session:
+        users = session.execute(select(CategoryUserCount.users)).scalar()
+        count = session.execute(select(PredictionCount.count)).scalar()
+    assert (users, count) == (1, 2)
+    assert_counts_match_a_recount(postgres_engine)
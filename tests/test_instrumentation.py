@@ -0,0 +1,36 @@
+import json
+import urllib.request
+
+import instrumentation
+from instrumentation import Timings, get_prometheus_server
+
+
+def test_jsonl_lines_are_written_in_order(tmp_path):
+    path = tmp_path / "timings.jsonl"
+    timings = Timings(jsonl_path=str(path))
+    for n in range(100):
+        timings.record(f"section{n % 3}", n / 1000, failed=n == 7)
+    timings.close()  # Writes what is still queued
+
+    lines = [json.loads(line) for line in path.read_text().splitlines()]
+    assert [line["seconds"] for line in lines] == [n / 1000 for n in range(100)]
+    assert [line["name"] for line in lines if line["failed"]] == ["section1"]
+
+
+def test_the_metrics_server_starts_once(monkeypatch):
+    monkeypatch.setattr(instrumentation, "PROMETHEUS_PORT", "0")  # Any free port
+    get_prometheus_server.clear()
+    try:
+        server = get_prometheus_server()
+        assert get_prometheus_server() is server  # As after a module reload
+        instrumentation.timings.record("test.section", 0.01)
+
+        host, port = server.server_address[:2]
+        assert host == instrumentation.PROMETHEUS_HOST
+        with urllib.request.urlopen(f"http://{host}:{port}/metrics") as response:
+            body = response.read().decode()
+        assert 'sra_section_seconds_count{section="test.section"}' in body
+    finally:
+        server.shutdown()
+        server.server_close()
+        get_prometheus_server.clear()
@@ -0,0 +1,116 @@
+import pytest
+from sqlalchemy import inspect, text
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.schema import CreateIndex
+from sqlmodel import Session
+
+from migrate import invalid_indexes, upgrade
+from models import (
+    SCHEMA_VERSION,
+    Athlete,
+    QuizPrediction,
+    get_schema_version,
+)
+
+
+def old_database(engine, rows):
+    # A predictions table from before the unique index and the counts
+    Athlete.__table__.create(engine)  # Its foreign key needs the table on Postgres
+    QuizPrediction.__table__.create(engine)
+    with engine.begin() as connection:
+        connection.execute(text("DROP INDEX uq_quizprediction_user_category_type"))
+        connection.execute(
+            QuizPrediction.__table__.insert(),
+            [
+                {
+                    "user_name": user,
+                    "event_category": "LANCERS HOMME",
+                    "prediction_type": prediction_type,
+                    "predicted_value": value,
+                }
+                for user, prediction_type, value in rows
+            ],
+        )
+
+
+def test_upgrade_counts_without_the_removed_duplicates(engine):
+    old_database(
+        engine,
+        [
+            ("a", "Place 1", "X"),
+            ("a", "Place 1", "X"),
+            ("a", "Place 1", "X"),
+            ("a", "Place 2", "Y"),
+        ],
+    )
+
+    upgrade(engine)
+
+    with Session(engine) as session:
+        assert (
+            session.execute(text("SELECT count(*) FROM quizprediction")).scalar() == 2
+        )
+        counts = session.execute(
+            text("SELECT predicted_value, count FROM predictioncount")
+        ).all()
+        users = session.execute(text("SELECT users FROM categoryusercount")).scalar()
+    assert sorted(counts) == [("X", 1), ("Y", 1)]
+    assert users == 1
+    assert get_schema_version(engine) == SCHEMA_VERSION
+
+
+def test_upgrade_drops_the_user_name_index(engine):
+    old_database(engine, [("a", "Place 1", "X")])
+    with engine.begin() as connection:
+        connection.execute(
+            text(
+                "CREATE INDEX ix_quizprediction_user_name ON quizprediction (user_name)"
+            )
+        )
+
+    upgrade(engine)
+
+    names = {index["name"] for index in inspect(engine).get_indexes("quizprediction")}
+    assert "ix_quizprediction_user_name" not in names
+    assert "uq_quizprediction_user_category_type" in names
+
+
+def test_upgrade_a_new_database(engine):
+    upgrade(engine)
+    upgrade(engine)  # Nothing left to do
+
+    assert get_schema_version(engine) == SCHEMA_VERSION
+
+
+def test_upgrade_leaves_the_model_indexes_plain(postgres_engine):
+    old_database(postgres_engine, [("a", "Place 1", "X")])
+
+    upgrade(postgres_engine)
+
+    # create_all and the archive import build them inside a transaction
+    for index in QuizPrediction.__table__.indexes:
+        ddl = str(CreateIndex(index).compile(dialect=postgres_engine.dialect))
+        assert "CONCURRENTLY" not in ddl
+
+
+def test_upgrade_rebuilds_an_invalid_index(postgres_engine):
+    old_database(postgres_engine, [("a", "Place 1", "X"), ("a", "Place 1", "Y")])
+    autocommit = postgres_engine.execution_options(isolation_level="AUTOCOMMIT")
+    with autocommit.connect() as connection, pytest.raises(IntegrityError):
+        # Fails on the duplicates, and leaves the index INVALID
+        connection.execute(
+            text(
+                "CREATE UNIQUE INDEX CONCURRENTLY uq_quizprediction_user_category_type "
+                "ON quizprediction (user_name, event_category, prediction_type)"
+            )
+        )
+    assert invalid_indexes(postgres_engine) == {"uq_quizprediction_user_category_type"}
+
+    upgrade(postgres_engine)
+
+    assert invalid_indexes(postgres_engine) == set()
+    names = {
+        index["name"]
+        for index in inspect(postgres_engine).get_indexes("quizprediction")
+    }
+    assert "uq_quizprediction_user_category_type" in names
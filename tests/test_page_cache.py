@@ -0,0 +1,11 @@
+from page_cache import PageCache
+
+
+def test_parsed_pages_are_keyed_by_parser_version(tmp_path):
+    cache = PageCache(str(tmp_path))
+    html = b"<table><tr><td>1</td></tr></table>"
+
+    assert cache.parsed(html, "rows", 1, lambda h: "old") == "old"
+    assert cache.parsed(html, "rows", 1, lambda h: "new") == "old"
+    assert cache.parsed(html, "rows", 2, lambda h: "new") == "new"
+    assert cache.get_parsed(html, "rows", 1) == "old"
@@ -0,0 +1,48 @@
+"""parse_results_pages against the former pd.read_html parsing.
+
+tests/fixtures/athle holds meetings in the bases.athle.fr page layout, one
+file per page named <meeting>-<frmposition>.html, starting at frmposition=0
+(the first page has one more header row). interclubs-*.html are written by
+hand after that layout, with invented results, the club's athletes of
+constants.py and invented names for the others: banner and pagination rows,
+separator cells, links around the athletes, field events without a mark, and
+relays whose place and time span the runners' row. Pages saved from the site
+can be added next to them:
+
+    curl -o tests/fixtures/athle/304693-0.html \
+        "https://bases.athle.fr/asp.net/liste.aspx?frmbase=resultats&frmmode=1&frmespace=0&frmcompetition=304693&frmposition=0"
+"""
+
+from itertools import groupby
+from pathlib import Path
+
+import pytest
+
+from benchmarks.fixtures import make_meeting
+from benchmarks.parse import check
+
+
+def _page_key(path):
+    meeting, position = path.stem.rsplit("-", 1)
+    return meeting, int(position)
+
+
+SAVED_MEETINGS = {
+    meeting: list(paths)
+    for meeting, paths in groupby(
+        sorted(
+            (Path(__file__).parent / "fixtures" / "athle").glob("*.html"),
+            key=_page_key,
+        ),
+        key=lambda path: _page_key(path)[0],
+    )
+}
+
+
+def test_synthetic_meeting_parses_like_read_html():
+    check(make_meeting(disciplines=20, pages=3))
+
+
+@pytest.mark.parametrize("meeting", sorted(SAVED_MEETINGS))
+def test_saved_pages_parse_like_read_html(meeting):
+    check([path.read_bytes() for path in SAVED_MEETINGS[meeting]])
@@ -0,0 +1,64 @@
+from sqlalchemy import text
+from sqlmodel import Session
+
+from athletes import add_alias, link_predictions
+from migrate import upgrade
+from models import rebuild_prediction_counts, upsert_predictions
+from queries import get_predictions_version
+
+
+def save(engine, value):
+    with Session(engine) as session:
+        upsert_predictions(session, "a", "LANCERS HOMME", {"Place 1": value})
+        session.commit()
+
+
+def test_every_write_changes_the_version(any_engine):
+    engine = any_engine
+    upgrade(engine)
+    versions = [get_predictions_version(engine)]
+
+    save(engine, "Jean Inconnu")
+    versions.append(get_predictions_version(engine))
+    # Same row and id, only the timestamp may go back (clock skew, imports)
+    save(engine, "Jean Inconnu")
+    versions.append(get_predictions_version(engine))
+
+    with Session(engine) as session:
+        add_alias(session, "COLLET Travis", "Jean Inconnu")
+        assert link_predictions(session) == 1  # Only sets athlete_id
+        session.commit()
+    versions.append(get_predictions_version(engine))
+
+    with Session(engine) as session:
+        rebuild_prediction_counts(session)
+        session.commit()
+    versions.append(get_predictions_version(engine))
+
+    assert versions == sorted(set(versions))
+
+
+def test_uncommitted_writes_keep_the_version(any_engine):
+    engine = any_engine
+    upgrade(engine)
+    save(engine, "COLLET Travis")
+    version = get_predictions_version(engine)
+
+    with Session(engine) as session:
+        upsert_predictions(session, "a", "LANCERS HOMME", {"Place 1": "X"})
+        session.rollback()
+
+    assert get_predictions_version(engine) == version
+
+
+def test_saves_do_not_wait_on_each_other(postgres_engine):
+    upgrade(postgres_engine)
+    with Session(postgres_engine) as first, Session(postgres_engine) as second:
+        upsert_predictions(first, "a", "LANCERS HOMME", {"Place 1": "X"})
+        # Nothing else is shared: would block on the revision row while the
+        # first save is open
+        second.execute(text("SET lock_timeout = '1s'"))
+        upsert_predictions(second, "b", "SAUTS FEMME", {"Place 1": "Y"})
+        second.commit()
+        first.commit()
+    assert get_predictions_version(postgres_engine) == 2
@@ -0,0 +1,23 @@
+import pytest
+from sqlalchemy import create_engine, text
+from sqlalchemy.exc import OperationalError
+
+from query_profiler import QueryProfiler
+
+
+def test_failed_statements_leave_nothing_behind(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'profiled.db'}")
+    profiler = QueryProfiler()
+    profiler.install(engine)
+
+    with engine.connect() as connection:
+        info = dict(connection.info)
+        for _ in range(3):
+            with pytest.raises(OperationalError):
+                connection.execute(text("SELECT * FROM missing"))
+        with profiler.rerun("page") as rerun:
+            connection.execute(text("SELECT 1"))
+
+        assert connection.info == info
+    (statement,) = rerun.statements
+    assert statement.sql == "SELECT 1"
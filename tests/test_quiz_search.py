@@ -0,0 +1,38 @@
+from pathlib import Path
+
+from streamlit.testing.v1 import AppTest
+
+QUIZ_APP = str(Path(__file__).parent.parent / "quiz_app.py")
+SEARCH = "lancers_femme_place1_search"
+SELECT = "lancers_femme_place1_select"
+
+
+def logged_in_app():
+    at = AppTest.from_file(QUIZ_APP, default_timeout=60).run()
+    at.text_input(key="name_input_login").set_value("Search Test")
+    at.text_input(key="code_input_login").set_value("1234")
+    at.button(key="login_button").click().run()
+    return at
+
+
+def test_search_only_sends_matches():
+    at = logged_in_app()
+    at.text_input(key=SEARCH).set_value("clara").run()
+    assert at.selectbox(key=SELECT).options == [
+        "Autre",
+        "LE CALVE Clara",
+        "PHILIPPE Clara",
+    ]
+
+
+def test_search_after_a_pick_keeps_it():
+    at = logged_in_app()
+    at.text_input(key=SEARCH).set_value("clara").run()
+    at.selectbox(key=SELECT).set_value("PHILIPPE Clara").run()
+
+    at.text_input(key=SEARCH).set_value("br").run()
+    assert at.selectbox(key=SELECT).value == "PHILIPPE Clara"
+    assert at.selectbox(key=SELECT).options[:2] == ["Autre", "PHILIPPE Clara"]
+    at.text_input(key=SEARCH).set_value("").run()
+    assert at.selectbox(key=SELECT).value == "PHILIPPE Clara"
+    assert not at.exception
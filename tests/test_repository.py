@@ -0,0 +1,81 @@
+import gc
+
+import pytest
+from sqlalchemy.exc import IntegrityError
+
+from migrate import upgrade
+from repository import (
+    AsyncPredictionRepository,
+    PredictionRepository,
+    WriteBehindRepository,
+    async_database_url,
+)
+
+CATEGORY = "LANCERS HOMME"
+
+
+def rows(repository, user_name):
+    return sorted(tuple(row) for row in repository.load(user_name))
+
+
+@pytest.fixture
+def async_repository(engine):
+    url = async_database_url(engine.url)
+    if url is None:
+        pytest.skip("aiosqlite and greenlet are not installed (sra[async])")
+    upgrade(engine)
+    return AsyncPredictionRepository(url)
+
+
+def test_saves_and_loads(engine):
+    upgrade(engine)
+    repository = PredictionRepository(engine)
+
+    repository.save("a", CATEGORY, {"Place 1": "X", "Place 2": "Y"}).result()
+    repository.save("a", CATEGORY, {"Place 2": None}).result()
+
+    assert rows(repository, "a") == [(CATEGORY, "Place 1", "X")]
+    assert rows(repository, "b") == []
+
+
+def test_a_failed_save_is_in_its_future(engine):
+    upgrade(engine)
+    repository = PredictionRepository(engine)
+
+    future = repository.save("a", CATEGORY, {None: "X"})  # prediction_type NULL
+
+    assert isinstance(future.exception(), IntegrityError)
+
+
+def test_the_async_repository_applies_a_players_saves_in_order(async_repository):
+    futures = [
+        async_repository.save("a", CATEGORY, {"Place 1": value})
+        for value in ["X", "Y", "Z"]
+    ]
+    futures.append(async_repository.save("b", CATEGORY, {"Place 1": "W"}))
+    for future in futures:
+        future.result(timeout=10)
+
+    assert rows(async_repository, "a") == [(CATEGORY, "Place 1", "Z")]
+    assert rows(async_repository, "b") == [(CATEGORY, "Place 1", "W")]
+
+
+def test_the_async_repository_forgets_idle_players(async_repository):
+    for n in range(20):
+        async_repository.save(f"user{n}", CATEGORY, {"Place 1": "X"}).result(10)
+    gc.collect()
+
+    assert len(async_repository._locks) == 0
+
+
+def test_write_behind_loads_overlay_the_pending_saves(engine):
+    upgrade(engine)
+    repository = WriteBehindRepository(engine)
+    repository.buffer.max_delay = 60
+    PredictionRepository(engine).save("a", CATEGORY, {"Place 1": "X", "Place 2": "Y"})
+
+    repository.save("a", CATEGORY, {"Place 1": "Z", "Place 2": None})
+
+    assert rows(repository, "a") == [(CATEGORY, "Place 1", "Z")]
+    repository.buffer.close()
+    assert rows(PredictionRepository(engine), "a") == [(CATEGORY, "Place 1", "Z")]
@@ -0,0 +1,42 @@
+from athle import parse_results_pages
+from benchmarks.fixtures import make_meeting
+from benchmarks.scoring import make_predictions
+from results_pipeline import ResultsTracker
+
+
+def test_snapshot_of_a_new_tracker():
+    podiums, predictions, leaderboard = ResultsTracker().snapshot()
+
+    assert all(podium.empty for podium in podiums.values())
+    assert predictions is None and leaderboard is None
+
+
+def test_snapshot_is_not_wiped_by_a_reset():
+    tracker = ResultsTracker()
+    df = parse_results_pages(make_meeting(disciplines=6, pages=1))
+    tracker.update(df, 50000, make_predictions(20, seed=0), "v1")
+
+    podiums, predictions, leaderboard = tracker.snapshot()
+    tracker.reset()
+
+    assert not all(podium.empty for podium in podiums.values())
+    assert all(podium.empty for podium in tracker.podiums.values())
+    assert len(leaderboard) == predictions["user_name"].nunique()
+
+
+def test_incremental_refreshes_match_from_scratch():
+    predictions = make_predictions(40, seed=0)
+    final = parse_results_pages(make_meeting(disciplines=12, pages=2))
+    # Results published up to each discipline header, one after the other
+    headers = final.index[final.Club.str.contains("Finale", na=False)].tolist()
+    incremental = ResultsTracker()
+    for n, cutoff in enumerate(headers[1:] + [len(final)], start=1):
+        df = final.iloc[:cutoff].reset_index(drop=True)
+        changed = incremental.update(df, 50000, predictions, "v1")
+        full = ResultsTracker()
+        full.update(df, 50000, predictions, "v1")
+
+        expected = full.leaderboard().set_index("Utilisateur").sort_index()
+        actual = incremental.leaderboard().set_index("Utilisateur").sort_index()
+        assert actual.equals(expected), f"after {n} disciplines"
+        assert len(changed) <= 1  # Only the new discipline's category
@@ -0,0 +1,16 @@
+from benchmarks.scoring import legacy_score, make_podiums, make_predictions
+from scoring import score_predictions
+
+
+def scores(leaderboard):
+    return leaderboard.set_index("Utilisateur")["Score"].sort_index()
+
+
+def test_vectorized_scores_match_the_loop():
+    # Short and empty podiums, an athlete placed twice, free-text entries
+    predictions = make_predictions(60, seed=0)
+    podiums = make_podiums(seed=0)
+    for total_points in (35000, 65000):
+        expected = legacy_score(predictions, podiums, total_points)
+        actual = score_predictions(predictions, podiums, total_points)
+        assert scores(actual).equals(scores(expected))
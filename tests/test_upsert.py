@@ -0,0 +1,32 @@
+from sqlalchemy import event, text
+from sqlmodel import Session
+
+from migrate import upgrade
+from models import upsert_predictions
+
+
+def test_a_page_save_is_one_statement(any_engine):
+    upgrade(any_engine)
+    statements = []
+    event.listen(
+        any_engine,
+        "before_cursor_execute",
+        lambda conn, cursor, statement, *args: statements.append(statement),
+    )
+    with Session(any_engine) as session:
+        upsert_predictions(
+            session, "a", "LANCERS HOMME", {"Place 1": "X", "Place 2": "Y"}
+        )
+        upsert_predictions(
+            session, "a", "LANCERS HOMME", {"Place 1": "Z", "Place 2": None}
+        )
+        session.commit()
+        writes = [s for s in statements if "quizprediction" in s]
+        rows = session.execute(
+            text("SELECT prediction_type, predicted_value FROM quizprediction")
+        )
+        assert rows.all() == [("Place 1", "Z")]
+
+    assert not [s for s in writes if s.startswith("SELECT")]  # Nothing read first
+    # One upsert per page, and a DELETE for the page that clears a place
+    assert [s.split()[0] for s in writes] == ["INSERT", "DELETE", "INSERT"]
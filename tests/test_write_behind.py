@@ -0,0 +1,116 @@
+import pytest
+from sqlalchemy import text
+from sqlalchemy.exc import IntegrityError
+
+from migrate import upgrade
+from write_behind import WriteBehindBuffer
+
+CATEGORY = "LANCERS HOMME"
+
+
+@pytest.fixture
+def buffer(engine):
+    upgrade(engine)
+    buffers = []
+
+    def make(**options):
+        buffers.append(WriteBehindBuffer(engine, **options))
+        return buffers[-1]
+
+    yield make
+    for made in buffers:
+        made.close()
+
+
+def saved(engine):
+    with engine.connect() as connection:
+        return set(
+            connection.execute(
+                text(
+                    "SELECT user_name, event_category, prediction_type, "
+                    "predicted_value FROM quizprediction"
+                )
+            ).all()
+        )
+
+
+def test_saves_of_a_burst_share_one_commit(engine, buffer):
+    writer = buffer(max_delay=0.5)
+    futures = [
+        writer.save(f"user{n}", CATEGORY, {"Place 1": "X", "Place 2": "Y"})
+        for n in range(10)
+    ]
+    for future in futures:
+        future.result(timeout=5)
+
+    assert writer.flushes == 1
+    assert writer.flushed_rows == 20
+    assert len(saved(engine)) == 20
+
+
+def test_a_full_buffer_flushes_before_the_delay(engine, buffer):
+    writer = buffer(max_delay=60, max_rows=4)
+    writer.save("a", CATEGORY, {"Place 1": "X", "Place 2": "Y"})
+    writer.save("b", CATEGORY, {"Place 1": "X", "Place 2": "Y"}).result(timeout=5)
+
+    assert len(saved(engine)) == 4
+
+
+def test_the_last_write_of_a_place_wins(engine, buffer):
+    writer = buffer(max_delay=0.5)
+    writer.save("a", CATEGORY, {"Place 1": "X", "Place 2": "Y"})
+    writer.save("a", CATEGORY, {"Place 1": "Z", "Place 2": None}).result(timeout=5)
+
+    assert saved(engine) == {("a", CATEGORY, "Place 1", "Z")}
+    assert writer.flushed_rows == 2
+
+
+def test_pending_overlays_what_is_not_committed(engine, buffer):
+    writer = buffer(max_delay=60)
+    writer.save("a", CATEGORY, {"Place 1": "X"})
+    writer.save("a", "SAUTS HOMME", {"Place 2": "Y"})
+    writer.save("b", CATEGORY, {"Place 1": "Z"})
+
+    assert writer.pending("a") == {
+        CATEGORY: {"Place 1": "X"},
+        "SAUTS HOMME": {"Place 2": "Y"},
+    }
+    assert saved(engine) == set()
+
+    writer.close()  # Flushes what is buffered
+    assert writer.pending("a") == {}
+    assert len(saved(engine)) == 3
+
+
+def test_a_failing_page_does_not_fail_the_batch(engine, buffer):
+    writer = buffer(max_delay=0.5)
+    good = writer.save("a", CATEGORY, {"Place 1": "X"})
+    bad = writer.save("b", CATEGORY, {None: "Y"})  # prediction_type is NOT NULL
+
+    good.result(timeout=5)
+    assert isinstance(bad.exception(timeout=5), IntegrityError)
+    assert saved(engine) == {("a", CATEGORY, "Place 1", "X")}
+
+
+def test_durable_saves_return_once_committed(engine, buffer):
+    writer = buffer(max_delay=0.05, durable=True)
+    future = writer.save("a", CATEGORY, {"Place 1": "X"})
+
+    assert future.done() and future.exception() is None
+    assert saved(engine) == {("a", CATEGORY, "Place 1", "X")}
+
+
+# The writer thread dies with the error, as it should
+@pytest.mark.filterwarnings("ignore::pytest.PytestUnhandledThreadExceptionWarning")
+def test_a_bug_fails_the_saves_instead_of_leaving_them_waiting(engine, buffer):
+    writer = buffer(max_delay=0.05)
+
+    def broken(pages):
+        raise ValueError("not a database error")
+
+    writer._write = broken
+    future = writer.save("a", CATEGORY, {"Place 1": "X"})
+
+    assert isinstance(future.exception(timeout=5), ValueError)
+    with pytest.raises(RuntimeError):
+        writer.save("a", CATEGORY, {"Place 1": "X"})
@@ -0,0 +1,160 @@
+"""Server-wide write-behind buffer for the wizard's page saves.
+
+Page saves of every session are collected for up to ``max_delay`` seconds or
+``max_rows`` predictions, then written by a background thread in one
+transaction with models.upsert_many_predictions. A burst of players clicking
+"Suivant" then costs one commit per batch instead of one per click.
+
+Within a batch the last write of a (user, category, type) wins. Whatever is
+buffered is flushed when the process exits normally. ``durable`` makes
+``save`` wait until its batch is committed; otherwise it returns a Future that
+resolves at the flush, and a crash loses the saves not flushed yet.
+
+    WRITE_BEHIND_MS       longest time a save waits in the buffer (default 50)
+    WRITE_BEHIND_ROWS     flush as soon as this many predictions wait (default 500)
+    WRITE_BEHIND_DURABLE  1 to acknowledge saves only once committed (default 0)
+"""
+
+import atexit
+import os
+import threading
+import time
+import traceback
+from concurrent.futures import Future
+
+from sqlalchemy.exc import SQLAlchemyError
+from sqlmodel import Session
+
+from models import upsert_many_predictions
+
+FLUSH_DELAY = int(os.getenv("WRITE_BEHIND_MS", "50")) / 1000
+FLUSH_ROWS = int(os.getenv("WRITE_BEHIND_ROWS", "500"))
+DURABLE = os.getenv("WRITE_BEHIND_DURABLE", "0") != "0"
+
+
+class WriteBehindBuffer:
+    def __init__(
+        self, engine, max_delay=FLUSH_DELAY, max_rows=FLUSH_ROWS, durable=DURABLE
+    ):
+        self.engine = engine
+        self.max_delay = max_delay
+        self.max_rows = max_rows
+        self.durable = durable
+        self.flushes = 0
+        self.flushed_rows = 0
+        self._lock = threading.Lock()
+        self._wake = threading.Condition(self._lock)
+        self._closed = False
+        self._reset()
+        self._flushing = {}  # Pages of the batch being written
+        self._thread = threading.Thread(
+            target=self._run, name="write-behind", daemon=True
+        )
+        self._thread.start()
+        atexit.register(self.close)
+
+    def _reset(self):
+        self._pages = {}  # (user_name, event_category) -> {prediction_type: value}
+        self._futures = {}  # (user_name, event_category) -> [Future]
+        self._rows = 0
+        self._first_at = None
+
+    def save(self, user_name, event_category, values) -> Future:
+        """Buffer one page save (see models.upsert_predictions)."""
+        future = Future()
+        key = (user_name, event_category)
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("The write-behind buffer is closed.")
+            page = self._pages.setdefault(key, {})
+            rows = len(page)
+            page.update(values)  # Last write wins per prediction type
+            self._rows += len(page) - rows
+            self._futures.setdefault(key, []).append(future)
+            if self._first_at is None:
+                self._first_at = time.monotonic()
+                self._wake.notify()
+            elif self._rows >= self.max_rows:
+                self._wake.notify()
+        if self.durable:
+            future.exception()  # Wait for the commit, errors stay in the future
+        return future
+
+    def pending(self, user_name):
+        """{event_category: {prediction_type: value}} not committed yet for a user."""
+        with self._lock:
+            pending = {}
+            for pages in (self._flushing, self._pages):
+                for (page_user, event_category), values in pages.items():
+                    if page_user == user_name:
+                        pending.setdefault(event_category, {}).update(values)
+            return pending
+
+    def _run(self):
+        while True:
+            with self._lock:
+                while not self._pages and not self._closed:
+                    self._wake.wait()
+                if not self._pages:
+                    return  # Closed and flushed
+                deadline = self._first_at + self.max_delay
+                while self._rows < self.max_rows and not self._closed:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._wake.wait(remaining)
+                pages, futures = self._pages, self._futures
+                self._flushing = pages
+                self._reset()
+            try:
+                self._flush(pages, futures)
+            except BaseException as e:
+                # Not a database error but a bug: fail the waiting saves, and
+                # the later ones, instead of leaving them pending forever
+                with self._lock:
+                    self._closed = True
+                    waiting = [*futures.values(), *self._futures.values()]
+                    self._flushing = {}
+                    self._reset()
+                for future in (f for group in waiting for f in group):
+                    if not future.done():
+                        future.set_exception(e)
+                raise
+            with self._lock:
+                self._flushing = {}
+
+    def _write(self, pages):
+        with Session(self.engine) as session:
+            upsert_many_predictions(session, pages)
+            session.commit()
+
+    def _flush(self, pages, futures):
+        try:
+            self._write(pages)
+        except SQLAlchemyError:
+            # Retry page by page so that one bad save does not fail the others
+            traceback.print_exc()
+            for key, values in pages.items():
+                try:
+                    self._write({key: values})
+                except SQLAlchemyError as e:
+                    for future in futures[key]:
+                        future.set_exception(e)
+                else:
+                    self._done(futures[key])
+        else:
+            self._done(future for key in pages for future in futures[key])
+        self.flushes += 1
+        self.flushed_rows += sum(len(values) for values in pages.values())
+
+    @staticmethod
+    def _done(futures):
+        for future in futures:
+            future.set_result(None)
+
+    def close(self):
+        """Flush what is buffered and stop the background thread."""
+        with self._lock:
+            self._closed = True
+            self._wake.notify()
+        self._thread.join()